@@ -1,6 +1,33 @@
 import fs from 'fs';
 import path from 'path';
 
+// Job table written by rev_perf/job_worker.py
+const JOBS_FILE = path.resolve(process.cwd(), process.env.REV_PERF_JOBS_DIR || '.rev_perf_jobs', 'jobs.json');
+const RECENT_JOBS = 20;
+
+function readJobs() {
+  if (!fs.existsSync(JOBS_FILE)) {
+    return { available: false };
+  }
+  let table;
+  try {
+    table = JSON.parse(fs.readFileSync(JOBS_FILE, 'utf8'));
+  } catch (error) {
+    return { available: false, error: error.message };
+  }
+  const counts = {};
+  for (const job of table.jobs) {
+    counts[job.status] = (counts[job.status] || 0) + 1;
+  }
+  return {
+    available: true,
+    updatedAt: table.updated_at,
+    workers: table.workers,
+    counts,
+    recent: table.jobs.slice(-RECENT_JOBS).reverse()
+  };
+}
+
 export default function handler(req, res) {
   if (req.method !== 'GET') {
     return res.status(405).json({ error: 'Method not allowed' });
@@ -35,6 +62,7 @@ export default function handler(req, res) {
           lastModified: jsonStats ? jsonStats.mtime : null
         }
       },
+      jobs: readJobs(),
       urls: {
         excel: '/data/revenue-data.xlsx',
         json: '/data/revenue-data.json',
@@ -8,6 +8,16 @@ export const config = {
   },
 };
 
+// Uploads are source reports for rev_perf/job_worker.py, which models each one
+// and publishes the result to data/revenue-data.xlsx for the dashboard.
+const UPLOAD_DIR = path.resolve(process.cwd(), process.env.REV_PERF_UPLOAD_DIR || path.join('data', 'uploads'));
+
+// Keep the workbook's own name (it names the job and its outputs), minus anything path-like
+function uploadName(originalFilename) {
+  const name = path.basename(originalFilename || '').replace(/[^\w .()-]/g, '_');
+  return name.toLowerCase().endsWith('.xlsx') && !name.startsWith('~$') ? name : null;
+}
+
 export default async function handler(req, res) {
   if (req.method !== 'POST') {
     return res.status(405).json({ error: 'Method not allowed' });
@@ -25,19 +35,24 @@ export default async function handler(req, res) {
         return res.status(500).json({ error: 'Upload failed' });
       }
 
-      const file = files.file;
+      const file = Array.isArray(files.file) ? files.file[0] : files.file;
       if (!file) {
         return res.status(400).json({ error: 'No file uploaded' });
       }
+      const filename = uploadName(file.originalFilename);
+      if (!filename) {
+        fs.rmSync(file.filepath, { force: true });
+        return res.status(400).json({ error: 'Expected an .xlsx source report' });
+      }
 
-      // Move file to data folder with correct name
-      const newPath = path.join(process.cwd(), 'data', 'revenue-data.xlsx');
-      fs.renameSync(file.filepath, newPath);
+      // Written whole into data/ first, so the worker never sees a partial upload
+      fs.mkdirSync(UPLOAD_DIR, { recursive: true });
+      fs.renameSync(file.filepath, path.join(UPLOAD_DIR, filename));
 
       res.status(200).json({ 
         success: true, 
-        message: 'File uploaded successfully',
-        filename: 'revenue-data.xlsx'
+        message: 'File uploaded successfully; it is modeled by the job worker (see /health)',
+        filename
       });
     });
   } catch (error) {
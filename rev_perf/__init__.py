@@ -0,0 +1,11 @@
+# rev_perf
+# The revenue performance pipeline as a package; run it from the repo root:
+#   python -m rev_perf summarize | benchmark | merge | model | drill | export [options]
+#   python -m rev_perf.job_worker | rev_perf.master_pipeline | ...   (module entry points)
+# or import it, e.g. from the dashboard backend:
+#   from rev_perf import drill, model
+
+from .cli import benchmark, build_parser, drill, export, main, merge, model, model_output, summarize
+
+__all__ = ["benchmark", "build_parser", "drill", "export", "main", "merge", "model", "model_output",
+           "summarize"]
@@ -0,0 +1,6 @@
+# __main__.py
+# python -m rev_perf <command> [options]  (see cli.py)
+
+from .cli import main
+
+main()
@@ -0,0 +1,163 @@
+# baselines.py
+
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from .group_keys import GroupKeys, align_rows, parse_unique
+
+BASELINE_KEYS = ["Payer", "Group_EM", "Group_EM2"]
+# What each group-week is compared with (--baseline / REV_PERF_BASELINE):
+#   all         the group's mean over all of history (including the week itself)
+#   trailing:N  the group's mean over the N calendar weeks before the week
+#   yoy[:N]     the group's value in the same ISO week of the previous (N) year(s)
+BASELINE_WINDOW = os.environ.get("REV_PERF_BASELINE", "all")
+WINDOW_KINDS = ("all", "trailing", "yoy")
+
+
+def parse_window(spec: str) -> tuple:
+    """("all" | "trailing" | "yoy", length) from a BASELINE_WINDOW string."""
+    kind, _, length = str(spec).strip().lower().partition(":")
+    if kind not in WINDOW_KINDS or (kind == "trailing" and not length) or (kind == "all" and length):
+        raise ValueError(f"Unknown baseline {spec!r}; expected all, trailing:N or yoy[:N]")
+    try:
+        n = int(length or 1)
+    except ValueError:
+        raise ValueError(f"Baseline window length must be an integer: {spec!r}")
+    if n < 1:
+        raise ValueError(f"Baseline window length must be at least 1: {spec!r}")
+    return kind, n
+
+
+def week_index(rows: pd.DataFrame) -> np.ndarray:
+    """Consecutive week number of each row's (Year, ISO Week), so weeks subtract across years."""
+    def monday(pairs: pd.Series) -> pd.Series:
+        # Week 1 contains January 4th; weeks past a year's last one run on into the next
+        return pd.Series([
+            (date(int(y), 1, 4).toordinal() - date(int(y), 1, 4).weekday() + 7 * (int(w) - 1)) // 7
+            for y, w in (p.split(":") for p in pairs)
+        ], dtype=np.int64)
+    pairs = rows["Year"].astype(str) + ":" + rows["Week"].astype(str)
+    return parse_unique(pairs, monday).to_numpy()
+
+
+class RunningBaseline:
+    """
+    Per (Payer, Group_EM, Group_EM2) running sums and non-null counts of
+    group-week metric values; the baseline is their historical mean.
+
+    Rows are accumulated one at a time in (Year, Week) order, so adding new
+    weeks to a saved state gives the same sums as accumulating all of history
+    at once. Revising an already-counted week (`update(..., sign=-1)` with
+    the old rows) is exact up to floating-point rounding.
+    """
+
+    def __init__(self, metrics, null_self_pay=(), sums: pd.DataFrame = None,
+                 counts: pd.DataFrame = None):
+        self.metrics = list(metrics)
+        self.null_self_pay = [m for m in self.metrics if m in set(null_self_pay)]
+        empty = pd.MultiIndex.from_arrays([[]] * len(BASELINE_KEYS), names=BASELINE_KEYS)
+        self.sums = sums if sums is not None else pd.DataFrame(0.0, index=empty, columns=self.metrics)
+        self.counts = counts if counts is not None else pd.DataFrame(0, index=empty, columns=self.metrics)
+
+    def update(self, rows: pd.DataFrame, sign: int = 1):
+        """Add (or with `sign=-1`, remove) group-week `rows` from the running totals."""
+        rows = rows.sort_values(["Year", "Week"], kind="mergesort")
+        vals = _values(rows, self.metrics, self.null_self_pay)
+
+        keys = pd.MultiIndex.from_frame(rows[BASELINE_KEYS])
+        index = self.sums.index.append(keys.difference(self.sums.index))
+        sums = self.sums.reindex(index, fill_value=0.0).to_numpy(dtype=float, copy=True)
+        counts = self.counts.reindex(index, fill_value=0).to_numpy(dtype=np.int64, copy=True)
+        pos = index.get_indexer(keys)
+        for j in range(len(self.metrics)):
+            ok = ~np.isnan(vals[:, j])
+            np.add.at(sums[:, j], pos[ok], sign * vals[ok, j])
+            np.add.at(counts[:, j], pos[ok], sign)
+        self.sums = pd.DataFrame(sums, index=index, columns=self.metrics)
+        self.counts = pd.DataFrame(counts, index=index, columns=self.metrics)
+        return self
+
+    def means(self, rename: dict = None) -> pd.DataFrame:
+        """Baseline frame: the group keys plus one mean column per metric."""
+        counts = self.counts.to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, self.sums.to_numpy() / counts, np.nan)
+        out = pd.DataFrame(means, index=self.sums.index, columns=self.metrics).reset_index()
+        return out.rename(columns=rename) if rename else out
+
+    def to_frames(self):
+        return self.sums.reset_index(), self.counts.reset_index()
+
+    @classmethod
+    def from_frames(cls, metrics, sums: pd.DataFrame, counts: pd.DataFrame,
+                    null_self_pay=()):
+        return cls(metrics, null_self_pay,
+                   sums.set_index(BASELINE_KEYS)[list(metrics)],
+                   counts.set_index(BASELINE_KEYS)[list(metrics)])
+
+
+def baseline_rows(base: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """Per-group baselines (BASELINE_KEYS + metrics) repeated onto each row of `rows`."""
+    pos = align_rows(base, rows, BASELINE_KEYS)
+    return base.drop(columns=BASELINE_KEYS).reindex(pos).set_axis(rows.index)
+
+
+def _values(rows: pd.DataFrame, metrics: list, null_self_pay=()) -> np.ndarray:
+    vals = rows[metrics].to_numpy(dtype=float, copy=True)
+    nulled = [metrics.index(m) for m in metrics if m in set(null_self_pay)]
+    if nulled:
+        self_pay = (rows["Payer"].str.upper() == "SELF PAY").to_numpy()
+        vals[np.ix_(self_pay, nulled)] = np.nan
+    return vals
+
+
+def windowed_means(rows: pd.DataFrame, metrics, window, null_self_pay=()) -> pd.DataFrame:
+    """
+    Each group-week row's baseline over a trailing or year-over-year window
+    of its own group (see BASELINE_WINDOW), indexed like `rows`.
+
+    Rows are sorted by (group, week) once; a trailing window is then the
+    difference of two prefix sums located by binary search, so the cost is
+    O(n log n) however long the history.
+    """
+    kind, n = parse_window(window) if isinstance(window, str) else window
+    metrics = list(metrics)
+    if kind == "all":
+        return baseline_rows(RunningBaseline(metrics, null_self_pay).update(rows).means(), rows)
+
+    vals = _values(rows, metrics, null_self_pay)
+    ok = ~np.isnan(vals)
+    group = GroupKeys(rows, BASELINE_KEYS).ids
+    week = week_index(rows)
+    week = week - (week.min() if len(week) else 0)
+
+    if kind == "trailing":
+        order = np.lexsort((week, group))
+        span = int(week.max()) + n + 2 if len(week) else 1
+        key = group[order] * span + week[order]
+        zero = np.zeros((1, len(metrics)))
+        sums = np.vstack([zero, np.cumsum(np.where(ok, vals, 0.0)[order], axis=0)])
+        counts = np.vstack([zero, np.cumsum(ok[order], axis=0)])
+        # Rows of the same group in weeks [week - n, week)
+        end = np.searchsorted(key, key, side="left")
+        start = np.searchsorted(key, key - n, side="left")
+        total, count = np.empty_like(vals), np.empty_like(vals)
+        total[order] = sums[end] - sums[start]
+        count[order] = counts[end] - counts[start]
+    else:
+        year = pd.to_numeric(rows["Year"]).to_numpy(dtype=np.int64)
+        iso_week = rows["Week"].to_numpy(dtype=np.int64)
+        index = pd.MultiIndex.from_arrays([group, year, iso_week])
+        total, count = np.zeros_like(vals), np.zeros_like(vals)
+        for lag in range(1, n + 1):
+            pos = index.get_indexer(pd.MultiIndex.from_arrays([group, year - lag, iso_week]))
+            found = (pos >= 0)[:, None] & ok[np.maximum(pos, 0)]
+            total += np.where(found, vals[np.maximum(pos, 0)], 0.0)
+            count += found
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where((count > 0) & (group >= 0)[:, None], total / count, np.nan)
+    return pd.DataFrame(means, index=rows.index, columns=metrics)
@@ -0,0 +1,195 @@
+# batch_runner.py
+# Run the v12w weekly model over many clinics' source workbooks in a process pool
+
+import argparse
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .exporter import ExportTarget, export
+from .frame_store import read_frame
+from .regression import SEGMENT_MODES
+from .source_cache import load_source
+from .weekly_model import build_weekly, export_frame, export_weekly, invoice_cols, prepare_source
+
+INVOICE_CSV = "invoice_with_weekly_summary_joined.csv"
+OUTPUT_SUFFIX = "_LR_Final_NoPayer.xlsx"
+# Workbooks analyzed at once (--workers / REV_PERF_BATCH_WORKERS)
+BATCH_WORKERS = int(os.environ.get("REV_PERF_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+# Summed per clinic and week for the cross-clinic file
+CLINIC_TOTALS = ["Visit Count", "Charge Amount", "Payment Amount*", "Expected Payments",
+                 "Missed Revenue (RF)", "NRV Gap Sum ($)"]
+DIAGNOSTIC_COL = "Performance Diagnostic (RF)"
+
+
+@dataclass
+class Workbook:
+    """One clinic's source workbook and the invoice drill index it is modeled with."""
+    name: str
+    source: str
+    invoices: str = INVOICE_CSV
+
+
+def is_source(name: str) -> bool:
+    """Whether a file name is a source workbook (not a model output or an Office lock file)."""
+    return name.endswith(".xlsx") and not name.endswith(OUTPUT_SUFFIX) and not name.startswith("~$")
+
+
+def workbook(path: str, invoices: str = INVOICE_CSV) -> Workbook:
+    """The Workbook for one .xlsx, with its `<stem>.invoices.csv` drill index when present."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    own = os.path.join(os.path.dirname(path), f"{stem}.invoices.csv")
+    return Workbook(stem, path, own if os.path.isfile(own) else invoices)
+
+
+def discover(path: str, invoices: str = INVOICE_CSV) -> list:
+    """
+    Workbooks from a directory (every .xlsx that is not a model output or an
+    Office lock file, with a `<stem>.invoices.csv` next to it used when
+    present) or a JSON manifest: [{"name", "source", "invoices"?}, ...].
+    """
+    if os.path.isdir(path):
+        books = []
+        for f in sorted(os.listdir(path)):
+            if is_source(f):
+                books.append(workbook(os.path.join(path, f), invoices))
+    else:
+        base = os.path.dirname(os.path.abspath(path))
+        with open(path) as fh:
+            entries = json.load(fh)
+        books = [Workbook(e.get("name") or os.path.splitext(os.path.basename(e["source"]))[0],
+                          os.path.join(base, e["source"]),
+                          os.path.join(base, e.get("invoices", invoices))) for e in entries]
+    names = [b.name for b in books]
+    dupes = sorted({n for n in names if names.count(n) > 1})
+    if dupes:
+        raise ValueError(f"Duplicate workbook names: {dupes}")
+    return books
+
+
+def run_workbook(book: Workbook, out_dir: str, formats=None, segments: str = None) -> dict:
+    """
+    The v12w analysis (Steps 3–14) of one workbook into `out_dir`/<name>/.
+    Failures are returned, not raised, so one bad report does not stop the batch.
+    """
+    start = time.perf_counter()
+    result = {"name": book.name, "source": book.source, "status": "ok", "error": None,
+              "rows": 0, "weekly_rows": 0, "outputs": [], "frame": None}
+    try:
+        df = prepare_source(load_source(book.source, sheet_name=0))
+        inv = read_frame(book.invoices, columns=invoice_cols)
+        weekly = build_weekly(df, inv, segments=segments)
+        book_dir = os.path.join(out_dir, book.name)
+        os.makedirs(book_dir, exist_ok=True)
+        out_file = os.path.join(book_dir, os.path.basename(book.source).replace(".xlsx", OUTPUT_SUFFIX))
+        result["outputs"] = export_weekly(weekly, out_file, formats)
+        result["frame"] = clinic_weeks(export_frame(weekly))
+        result["rows"], result["weekly_rows"] = len(df), len(weekly)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def clinic_weeks(frame: pd.DataFrame) -> pd.DataFrame:
+    """One row per Year/Week: CLINIC_TOTALS summed, % Error (RF) and diagnostic counts."""
+    grouped = frame.groupby(["Year", "Week"], sort=True)
+    weeks = grouped[CLINIC_TOTALS].sum()
+    weeks["% Error (RF)"] = weeks["Missed Revenue (RF)"] / weeks["Expected Payments"] * 100
+    counts = pd.crosstab([frame["Year"], frame["Week"]], frame[DIAGNOSTIC_COL])
+    for label in ("Over Performed", "Under Performed", "Average Performance"):
+        weeks[f"{label} Groups"] = counts[label] if label in counts.columns else 0
+    return weeks.reset_index()
+
+
+def consolidate(results: list) -> dict:
+    """The per-workbook status table (with totals) and every clinic's weeks stacked."""
+    status = pd.DataFrame([{k: r.get(k) for k in ("name", "status", "rows", "weekly_rows", "seconds",
+                                                   "error", "source")} for r in results])
+    totals = pd.DataFrame([r["frame"].drop(columns=["Year", "Week", "% Error (RF)"]).sum()
+                           if r["frame"] is not None else pd.Series(dtype=float) for r in results],
+                          index=status.index)
+    weekly = pd.concat([r["frame"].assign(Clinic=r["name"]) for r in results if r["frame"] is not None]
+                       or [pd.DataFrame(columns=["Clinic"])], ignore_index=True)
+    weekly = weekly[["Clinic"] + [c for c in weekly.columns if c != "Clinic"]]
+    return {"summary": pd.concat([status, totals], axis=1), "weekly": weekly}
+
+
+def run_batch(books: list, out_dir: str, workers: int = BATCH_WORKERS, formats=None,
+              segments: str = None) -> list:
+    """
+    Analyze `books` in a pool of `workers` processes, then write
+    batch_summary.csv and cross_clinic_weekly.csv to `out_dir`. Returns the
+    per-workbook results in input order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results = {}
+    if workers <= 1:
+        for book in books:
+            results[book.name] = run_workbook(book, out_dir, formats, segments)
+            _report(results[book.name])
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(books))) as pool:
+            futures = {pool.submit(run_workbook, book, out_dir, formats, segments): book for book in books}
+            for future in as_completed(futures):
+                book = futures[future]
+                try:
+                    results[book.name] = future.result()
+                except BrokenProcessPool as e:
+                    # The worker died (e.g. out of memory); the pool fails the rest too
+                    results[book.name] = {"name": book.name, "source": book.source, "status": "failed",
+                                          "error": f"worker process died: {e}", "rows": 0, "weekly_rows": 0,
+                                          "outputs": [], "frame": None, "seconds": None}
+                _report(results[book.name])
+    ordered = [results[b.name] for b in books]
+
+    tables = consolidate(ordered)
+    export(tables, [ExportTarget(os.path.join(out_dir, "batch_summary.csv"), "summary"),
+                    ExportTarget(os.path.join(out_dir, "cross_clinic_weekly.csv"), "weekly")])
+    with open(os.path.join(out_dir, "batch_errors.json"), "w") as fh:
+        json.dump({r["name"]: r.get("traceback") or r["error"] for r in ordered if r["status"] != "ok"},
+                  fh, indent=1)
+    return ordered
+
+
+def _report(result: dict):
+    if result["status"] == "ok":
+        print(f"✅ {result['name']}: {result['weekly_rows']} weekly rows in {result['seconds']}s")
+    else:
+        print(f"❌ {result['name']}: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the weekly model over many source workbooks.")
+    parser.add_argument("sources", help="directory of workbooks or a JSON manifest")
+    parser.add_argument("--out", default="batch_output", help="output directory")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS,
+                        help="workbooks analyzed at once (default: CPUs)")
+    parser.add_argument("--invoices", default=INVOICE_CSV,
+                        help="invoice drill index for workbooks without their own")
+    parser.add_argument("--export-formats", default=None, help="e.g. xlsx,csv.gz (see exporter.py)")
+    parser.add_argument("--segments", default=os.environ.get("REV_PERF_SEGMENTS") or None,
+                        choices=sorted(SEGMENT_MODES))
+    args = parser.parse_args()
+
+    books = discover(args.sources, args.invoices)
+    if not books:
+        raise FileNotFoundError(f"No source workbooks found in {args.sources}")
+    formats = args.export_formats.split(",") if args.export_formats else None
+    results = run_batch(books, args.out, args.workers, formats, args.segments)
+    failed = [r["name"] for r in results if r["status"] != "ok"]
+    print(f"{len(results) - len(failed)}/{len(results)} workbooks done; summary in {args.out}")
+    if failed:
+        raise SystemExit(f"Failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# benchmark_suite.py
+# Times and memory-profiles each pipeline step on synthetic data (see synthetic_data.py)
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from . import final_rev_perf_weekly_model_generator_v12v_updated as summary
+from . import interactive_benchmark_code_v2 as benchmark
+from . import merge_invoice_summary_alignment as alignment
+from . import synthetic_data
+from .frame_store import write_frame
+from .group_keys import GroupKeys
+from .metric_registry import GROUP_KEYS
+from .source_cache import normalize_source
+from .step_trace import span, tracer
+from .weekly_model import attach_narratives, build_results, export_weekly, invoice_cols, prepare_source
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.environ.get("REV_PERF_BENCH_DIR", "benchmark_results")
+PIPELINES = ["tagging", "summary", "v12w", "standalone"]
+EXCEL_MAX_ROWS = 1_048_575  # the standalone script reads the source from a workbook
+
+
+def _step_records(records: list, pipelines) -> list:
+    """
+    Benchmark rows from step_trace records: each pipeline's span as its
+    "total", and every span under it as a step. Spans the pipeline code opens
+    itself are indented under the step that ran them.
+    """
+    owner, depth, rows = {}, {}, []
+    # Parents close after their children, so walk backwards
+    for r in reversed(records):
+        parent = r["parent"]
+        owner[r["name"]] = r["name"] if parent is None else owner.get(parent)
+        depth[r["name"]] = 0 if parent is None else depth.get(parent, 0) + 1
+        if owner[r["name"]] in pipelines:
+            step = "total" if parent is None else "  " * (depth[r["name"]] - 1) + r["name"]
+            rows.append((r["start_s"], {"pipeline": owner[r["name"]], "step": step, "seconds": r["wall_s"],
+                                        "peak_mb": r["peak_traced_mb"], "peak_rss_mb": r["peak_rss_mb"]}))
+    rows.sort(key=lambda row: row[0])
+    return [row for _, row in rows]
+
+
+def bench_tagging(invoices: pd.DataFrame, work_dir: str, chunksize: int = 0):
+    """interactive_benchmark_code_v2.py; returns the tagged invoices."""
+    with span("Steps 1–2: standardize_invoices"):
+        df_inv = benchmark.standardize_invoices(invoices.copy())
+    with span("Step 4: group_benchmarks"):
+        benchmark_df = benchmark.group_benchmarks(df_inv)
+    with span("Step 5: merge benchmarks"):
+        df_inv = df_inv.merge(benchmark_df, on=benchmark.group_keys, how='left')
+    with span("Step 6: add_tags"):
+        df_inv = benchmark.add_tags(df_inv)
+    with span("Step 7: write_frame"):
+        write_frame(df_inv, os.path.join(work_dir, benchmark.OUTPUT_CSV), csv=False)
+    if chunksize > 0:
+        path = os.path.join(work_dir, "invoices.csv")
+        invoices.to_csv(path, index=False)
+        with span(f"Steps 1–7: tag_invoices_streaming (chunksize {chunksize})"):
+            benchmark.tag_invoices_streaming(path, os.path.join(work_dir, "streamed.csv"), chunksize)
+    return df_inv
+
+
+def bench_summary(report: pd.DataFrame, tagged: pd.DataFrame, work_dir: str):
+    """v12v weekly summary and the invoice/summary merge; returns the merged invoices."""
+    with span("Step 1: normalize_source"):
+        df = normalize_source(report.copy())
+    with span("Step 2: weekly_summary"):
+        weekly = summary.weekly_summary(df)
+    with span("merge_alignment"):
+        merged = alignment.merge_alignment(tagged, weekly[alignment.keys + ['Payment Amount*']])
+    with span("write_frame"):
+        write_frame(merged, os.path.join(work_dir, alignment.OUTPUT_CSV), csv=False)
+    return merged
+
+
+def bench_v12w(report: pd.DataFrame, merged: pd.DataFrame, work_dir: str):
+    """final_rev_perf_weekly_model_generator v12w.py, step by step as `model` runs it (text narratives)."""
+    inv = merged[invoice_cols]
+    with span("Step 3: normalize_source"):
+        df = normalize_source(report.copy())
+    with span("Step 4: prepare_source"):
+        df = prepare_source(df)
+    with span("Steps 5–13: build_results"):
+        weekly, findings = build_results(df, inv)
+    with span("Steps 10–13: attach_narratives"):
+        weekly = attach_narratives(weekly, findings)
+    with span("Step 14: export_weekly"):
+        export_weekly(weekly, os.path.join(work_dir, "weekly_model.xlsx"))
+    return weekly
+
+
+def bench_standalone(report: pd.DataFrame, work_dir: str) -> list:
+    """
+    standalone_pipeline.py in a child process; returns its benchmark rows.
+    Steps are delimited by the script's progress lines ("... ..."); memory
+    is the child's peak RSS.
+    """
+    p = "standalone"
+    if len(report) > EXCEL_MAX_ROWS:
+        print(f"Skipping standalone: {len(report)} rows do not fit in one worksheet")
+        return []
+    records = []
+    report.to_excel(os.path.join(work_dir, "v2 Rev Perf Report with Second Group Layer.xlsx"),
+                    index=False)
+    env = {**os.environ, "PYTHONPATH": ROOT_DIR, "PYTHONUNBUFFERED": "1", "REV_PERF_CACHE": "0"}
+    start = last = time.perf_counter()
+    step = "interpreter start & imports"
+    proc = subprocess.Popen([sys.executable, "-m", "rev_perf.standalone_pipeline"],
+                            cwd=work_dir, env=env, stdout=subprocess.PIPE, text=True)
+    for line in proc.stdout:
+        line = line.strip()
+        if line.endswith("..."):
+            now = time.perf_counter()
+            records.append({"pipeline": p, "step": step, "seconds": now - last,
+                            "peak_mb": None, "peak_rss_mb": None})
+            step, last = line.lstrip("🚀📊🔄💰📈🔍🤖💾 "), now
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    end = time.perf_counter()
+    if proc.returncode:
+        raise RuntimeError(f"standalone_pipeline.py exited with status {proc.returncode}")
+    records.append({"pipeline": p, "step": step, "seconds": end - last,
+                    "peak_mb": None, "peak_rss_mb": None})
+    records.append({"pipeline": p, "step": "total", "seconds": end - start,
+                    "peak_mb": None, "peak_rss_mb": usage.ru_maxrss / 1024})
+    return records
+
+
+def _git_revision() -> str:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    try:
+        rev = git("rev-parse", "--short", "HEAD")
+        return rev + ("-dirty" if git("status", "--porcelain", "--untracked-files=no") else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _summarize(runs: list) -> list:
+    """Per step over repeated runs: fastest time, largest memory figures."""
+    steps = {}
+    for records in runs:
+        for r in records:
+            best = steps.setdefault((r["pipeline"], r["step"]),
+                                    dict(r, seconds=None, peak_mb=None, peak_rss_mb=None))
+            for k, pick in (("seconds", min), ("peak_mb", max), ("peak_rss_mb", max)):
+                if r[k] is not None:
+                    best[k] = r[k] if best[k] is None else pick(best[k], r[k])
+    return list(steps.values())
+
+
+def _run_once(report: pd.DataFrame, assignments: pd.DataFrame, pipelines, chunksize: int,
+              trace_memory: bool) -> list:
+    # Each pipeline is a step_trace span with its steps (and the spans of the
+    # pipeline code itself) nested under it
+    enabled, first = tracer.enabled, len(tracer.records)
+    tracer.enabled = True
+    if trace_memory:
+        tracemalloc.start()
+    standalone = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="rev_perf_bench_") as work_dir:
+            with span("tagging"):
+                tagged = bench_tagging(assignments, work_dir, chunksize)
+            if {"summary", "v12w"} & set(pipelines):
+                with span("summary"):
+                    merged = bench_summary(report, tagged, work_dir)
+                if "v12w" in pipelines:
+                    with span("v12w"):
+                        bench_v12w(report, merged, work_dir)
+            if "standalone" in pipelines:
+                standalone = bench_standalone(report, work_dir)
+    finally:
+        tracer.enabled = enabled
+        if trace_memory:
+            tracemalloc.stop()
+    # Prerequisite pipelines run regardless; keep only the requested ones
+    records = _step_records(tracer.records[first:], pipelines) + standalone
+    del tracer.records[first:]
+    if trace_memory:
+        # tracemalloc slows allocation-heavy steps several times over
+        for r in records:
+            r["seconds"] = None
+    return records
+
+
+def run_suite(params: dict, pipelines=PIPELINES, repeat: int = 1, chunksize: int = 0,
+              trace_memory: bool = True) -> dict:
+    """
+    Generate data for `params` (see synthetic_data.generate_invoices) and
+    benchmark `pipelines`: `repeat` timed runs, then one run under
+    tracemalloc for the per-step allocation peaks.
+    """
+    invoices = synthetic_data.generate_invoices(**params)
+    report = synthetic_data.report_layout(invoices)
+    assignments = synthetic_data.invoice_assignments(invoices)
+    del invoices
+
+    runs = [_run_once(report, assignments, pipelines, chunksize, False) for _ in range(repeat)]
+    if trace_memory:
+        in_process = [p for p in pipelines if p != "standalone"]
+        runs.append(_run_once(report, assignments, in_process, chunksize, True))
+
+    return {
+        "revision": _git_revision(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "params": params,
+        "rows": {"source": len(report), "groups": int(GroupKeys(assignments.rename(
+            columns=synthetic_data.SOURCE_COLUMNS), GROUP_KEYS).n)},
+        "repeat": repeat,
+        "trace_memory": trace_memory,
+        "results": _summarize(runs),
+    }
+
+
+def print_results(results: dict):
+    print(f"{results['revision']}: {results['rows']['source']} rows, "
+          f"{results['rows']['groups']} groups, best of {results['repeat']}")
+    print(f"{'pipeline':<11} {'step':<48} {'seconds':>9} {'peak MB':>9} {'RSS MB':>9}")
+    for r in results["results"]:
+        peak = "" if r["peak_mb"] is None else f"{r['peak_mb']:.1f}"
+        rss = "" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.0f}"
+        seconds = "" if r["seconds"] is None else f"{r['seconds']:.3f}"
+        print(f"{r['pipeline']:<11} {r['step'][:48]:<48} {seconds:>9} {peak:>9} {rss:>9}")
+
+
+def compare(base_path: str, new_path: str):
+    """Step-by-step time and memory ratios of two result files (new / base)."""
+    with open(base_path) as fh:
+        base = json.load(fh)
+    with open(new_path) as fh:
+        new = json.load(fh)
+    if base["params"] != new["params"]:
+        print(f"Warning: different data parameters: {base['params']} vs {new['params']}")
+    before = {(r["pipeline"], r["step"]): r for r in base["results"]}
+    print(f"{base['revision']} -> {new['revision']}")
+    print(f"{'pipeline':<11} {'step':<48} {'base s':>9} {'new s':>9} {'time':>7} {'memory':>7}")
+    for r in new["results"]:
+        b = before.get((r["pipeline"], r["step"]))
+        if b is None or not (r["seconds"] and b["seconds"]):
+            continue
+        time_ratio = r["seconds"] / b["seconds"]
+        mem = "" if not (r["peak_mb"] and b["peak_mb"]) else f"{r['peak_mb'] / b['peak_mb']:.2f}x"
+        print(f"{r['pipeline']:<11} {r['step'][:48]:<48} {b['seconds']:>9.3f} "
+              f"{r['seconds']:>9.3f} {time_ratio:>6.2f}x {mem:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the revenue pipelines on synthetic data.")
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--weeks", type=int, default=27)
+    parser.add_argument("--payers", type=int, default=14)
+    parser.add_argument("--em-groups", type=int, default=4)
+    parser.add_argument("--invoices-per-week", type=int, default=260)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply invoices per week (10 = ten times the checked-in volume)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pipelines", default=",".join(PIPELINES),
+                        help=f"comma-separated subset of {','.join(PIPELINES)}")
+    parser.add_argument("--repeat", type=int, default=1, help="report the fastest of N runs")
+    parser.add_argument("--chunksize", type=int, default=0,
+                        help="also time streaming tagging with this batch size")
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="skip the tracemalloc pass (process RSS only)")
+    parser.add_argument("--out", help="results file (default: benchmark_results/<revision>-<params>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"),
+                        help="compare two results files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    pipelines = [p for p in args.pipelines.split(",") if p]
+    unknown = set(pipelines) - set(PIPELINES)
+    if unknown:
+        raise ValueError(f"Unknown pipelines: {sorted(unknown)}")
+    params = {
+        "years": args.years, "weeks": args.weeks, "payers": args.payers,
+        "em_groups": args.em_groups, "invoices_per_week": int(args.invoices_per_week * args.scale),
+        "seed": args.seed,
+    }
+    results = run_suite(params, pipelines, args.repeat, args.chunksize, not args.no_trace_memory)
+    print_results(results)
+
+    out = args.out or os.path.join(RESULTS_DIR, "{}-y{years}-w{weeks}-p{payers}-e{em_groups}-i{invoices_per_week}.json"
+                                   .format(results["revision"], **params))
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as fh:
+        json.dump(results, fh, indent=1)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# cli.py
+# One entry point for the pipeline, as subcommands and as library functions:
+#   python -m rev_perf summarize | benchmark | merge | model | drill | export [options]
+#   from rev_perf import drill, model
+#
+# Each command imports only the modules it uses, so drill-through, export and
+# summary-only runs never load the model code.
+
+import argparse
+import os
+import sys
+
+SOURCE_FILE = "v2 Rev Perf Report with Second Group Layer.xlsx"
+INVOICE_CSV = "invoice_with_weekly_summary_joined.csv"
+DRILL_INDEX = "invoice_level_index.csv"
+KEY_COLUMNS = ["Year", "Week", "Payer", "Group_EM", "Group_EM2"]
+
+
+def summarize(source: str = None) -> str:
+    """Weekly summary with the second E/M layer (v12v Steps 1–3); returns the path written."""
+    from . import final_rev_perf_weekly_model_generator_v12v_updated as summary
+    return summary.run(source or summary.SOURCE_FILE)
+
+
+def benchmark(chunksize: int = None, rule: str = None, mad_k: float = None,
+              sketch_capacity: int = None, path: str = None) -> str:
+    """Invoice benchmarks and tags (the drill index); returns the path written."""
+    from . import interactive_benchmark_code_v2 as bench
+    return bench.run(bench.CHUNKSIZE if chunksize is None else chunksize, rule or bench.TAG_RULE,
+                     bench.MAD_K if mad_k is None else mad_k,
+                     bench.SKETCH_CAPACITY if sketch_capacity is None else sketch_capacity,
+                     path or bench.INVOICE_INPUT)
+
+
+def merge(years=None, weeks=None) -> str:
+    """Invoices joined to their weekly summary rows, optionally only some weeks; returns the path written."""
+    from . import merge_invoice_summary_alignment as alignment
+    return alignment.run({k: v for k, v in (("Year", years), ("Week", weeks)) if v})
+
+
+def model(source: str = SOURCE_FILE, invoices: str = INVOICE_CSV, incremental: bool = None,
+          state_dir: str = None, baseline: str = None, model_path: str = None, save_model: str = None,
+          segments: str = None, export_formats=None, narratives: str = None,
+          dashboard_feed: str = None, query_files: bool = None) -> list:
+    """
+    The v12w weekly model (Steps 3–14) for `source`; returns the paths
+    written. Unset options fall back to their REV_PERF_* settings.
+    """
+    from .baselines import BASELINE_WINDOW, parse_window
+    from .dashboard_feed import FEED_DIR, write_feed
+    from .frame_store import read_frame, write_frame
+    from .regression import SEGMENT_MODES, load_model
+    from .source_cache import load_source
+    from .step_trace import span
+    from .weekly_model import (
+        NARRATIVE_MODES, NARRATIVES, QUERY_FILES, attach_narratives, build_results, export_frame,
+        export_weekly, invoice_cols, prepare_source, query_frames
+    )
+
+    # === Step 0: File Paths & Options ===
+    if not os.path.isfile(source):
+        raise FileNotFoundError(f"Error: File not found: {source}")
+    if incremental is None:
+        incremental = os.environ.get("REV_PERF_INCREMENTAL") == "1"
+    # Incremental mode reuses the partitions and baselines saved by the last run
+    state_dir = state_dir or os.path.join(os.environ.get("REV_PERF_STATE_DIR", ".rev_perf_state"),
+                                          os.path.splitext(os.path.basename(source))[0])
+    segments = segments or os.environ.get("REV_PERF_SEGMENTS") or None
+    if segments and segments not in SEGMENT_MODES:
+        raise ValueError(f"Unknown --segments {segments!r}; expected one of {sorted(SEGMENT_MODES)}")
+    baseline = baseline or BASELINE_WINDOW
+    parse_window(baseline)
+    narratives = narratives or NARRATIVES
+    if narratives not in NARRATIVE_MODES:
+        raise ValueError(f"Unknown --narratives {narratives!r}; expected one of {NARRATIVE_MODES}")
+    dashboard_feed = dashboard_feed or FEED_DIR
+    query_files = QUERY_FILES if query_files is None else query_files
+    model_args = {
+        "model": load_model(model_path) if model_path else None,
+        "save_model": save_model,
+        "segments": segments,
+    }
+
+    # === Step 3: Load & Clean Source Data ===
+    with span("Step 3: Load & Clean Source Data") as s:
+        df = load_source(source, sheet_name=0)
+        s.rows_out = len(df)
+
+    # === Step 4: Zero-Payment Handling ===
+    with span("Step 4: Zero-Payment Handling", rows_in=len(df)) as s:
+        df = prepare_source(df)
+        s.rows_out = len(df)
+
+    # === Steps 5–13: Weekly Summary, Model & Diagnostics (see weekly_model.py) ===
+    with span("Step 7: Load Invoice Drill Index") as s:
+        inv = read_frame(invoices, columns=invoice_cols)
+        s.rows_out = len(inv)
+    with span("Steps 5–13: Weekly Summary, Model & Diagnostics", rows_in=len(df)) as s:
+        if incremental:
+            from .incremental_refresh import refresh_results
+            weekly, findings = refresh_results(df, inv, state_dir, baseline=baseline, **model_args)
+        else:
+            weekly, findings = build_results(df, inv, baseline=baseline, **model_args)
+        if narratives == "text":
+            weekly, findings = attach_narratives(weekly, findings), None
+        s.rows_out = len(weekly)
+
+    # === Step 14: Export Validation & Final Export ===
+    out_file = model_output(source)
+    with span("Step 14: Export Validation & Final Export", rows_in=len(weekly)):
+        written = export_weekly(weekly, out_file, export_formats, findings)
+        if query_files:
+            # Keyed numeric results and week narratives for query_service.py
+            written += [write_frame(frame, path) for path, frame in query_frames(weekly, out_file).items()]
+        if dashboard_feed:
+            write_feed(export_frame(weekly), dashboard_feed)
+            written.append(dashboard_feed)
+    return written
+
+
+def model_output(source: str = SOURCE_FILE) -> str:
+    return source.replace(".xlsx", "_LR_Final_NoPayer.xlsx")
+
+
+def drill(keys, index: str = DRILL_INDEX, out: str = None, split: bool = False):
+    """
+    Invoices behind (Year, Week, Payer, Group_EM, Group_EM2) `keys` (tuples or
+    a frame with those columns), in request order. Only the keys' weeks are
+    loaded, so a partitioned index opens just those partitions. With `out`
+    they are exported as drill_through_invoice_explainer.py does.
+    """
+    import pandas as pd
+    from .drill_through_invoice_explainer import DrillThroughExplainer
+
+    frame = keys[KEY_COLUMNS] if isinstance(keys, pd.DataFrame) else pd.DataFrame(list(keys), columns=KEY_COLUMNS)
+    frame = frame.astype({"Year": int, "Week": int})
+    explainer = DrillThroughExplainer(index, filters={"Year": sorted(set(frame["Year"])),
+                                                      "Week": sorted(set(frame["Week"]))})
+    if out:
+        explainer.export_invoice_details_bulk(frame, out, split)
+    return explainer.get_invoice_details_batch(frame)
+
+
+def export(path: str, formats=("csv",), filters: dict = None, out: str = None) -> list:
+    """
+    Copies of an intermediate (by its CSV, Arrow or dataset manifest name) in
+    `formats` (see exporter.py), named `out` + suffix (next to the
+    intermediate by default), optionally only the rows matching `filters`.
+    """
+    from .exporter import SUFFIXES, write_export
+    from .frame_store import BINARY_SUFFIX, read_frame, resolve
+    from .partition_store import MANIFEST, dataset_dir
+
+    source = resolve(path)
+    frame = read_frame(source, filters=filters)
+    stem = out or dataset_dir(path)
+    written = [write_export(frame, stem + SUFFIXES[f]) for f in formats]
+    if source.endswith((BINARY_SUFFIX, MANIFEST)):
+        os.utime(source)  # keep the binary copy the preferred read
+    return written
+
+
+def _filters(pairs) -> dict:
+    # ["Year=2025", "Week=3", "Week=4"] -> {"Year": ["2025"], "Week": ["3", "4"]}
+    filters = {}
+    for pair in pairs or ():
+        column, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected COLUMN=VALUE, got {pair!r}")
+        filters.setdefault(column, []).append(value)
+    return filters
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from .step_trace import add_arguments
+
+    parser = argparse.ArgumentParser(prog="rev_perf", description="Revenue performance pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("summarize", help="weekly summary with the second E/M layer")
+    p.add_argument("--source", default=None)
+
+    p = commands.add_parser("benchmark", help="tag invoices against their group benchmarks")
+    p.add_argument("--source", default=None, help="invoice workbook")
+    p.add_argument("--chunksize", type=int, default=None, help="stream the invoices in batches")
+    p.add_argument("--tag-rule", default=None, help="mean|percentile|mad")
+    p.add_argument("--mad-k", type=float, default=None)
+    p.add_argument("--sketch-capacity", type=int, default=None)
+
+    p = commands.add_parser("merge", help="join invoices to their weekly summary rows")
+    p.add_argument("--year", type=int, nargs="*", help="only re-merge these years (partitioned output)")
+    p.add_argument("--week", type=int, nargs="*", help="only re-merge these weeks (partitioned output)")
+
+    p = commands.add_parser("model", help="the v12w weekly model and final export")
+    p.add_argument("--source", default=SOURCE_FILE)
+    p.add_argument("--invoices", default=INVOICE_CSV)
+    p.add_argument("--incremental", action="store_true", default=None)
+    p.add_argument("--state-dir", default=None)
+    p.add_argument("--baseline", default=None, help="all|trailing:N|yoy[:N]")
+    p.add_argument("--model", default=None, help="score with this saved model instead of refitting")
+    p.add_argument("--save-model", default=None)
+    p.add_argument("--segments", default=None, help="payer|payer_em")
+    p.add_argument("--export-formats", default=None, help="e.g. xlsx,csv.gz (see exporter.py)")
+    p.add_argument("--narratives", default=None, help="text|findings")
+    p.add_argument("--dashboard-feed", default=None, metavar="DIR")
+    p.add_argument("--query-files", action="store_true", default=None,
+                   help="also write the files query_service.py serves")
+
+    p = commands.add_parser("drill", help="invoices behind summary groups")
+    p.add_argument("key", nargs="*", help="YEAR WEEK PAYER GROUP_EM GROUP_EM2")
+    p.add_argument("--keys", default=None, help="CSV of keys to drill into at once")
+    p.add_argument("--index", default=DRILL_INDEX)
+    p.add_argument("--out", default=None, help="CSV (or directory with --split); stdout when omitted")
+    p.add_argument("--split", action="store_true", help="one CSV per group")
+
+    p = commands.add_parser("export", help="copies of an intermediate in other formats")
+    p.add_argument("path", nargs="+")
+    p.add_argument("--formats", default="csv", help="e.g. csv,xlsx,parquet")
+    p.add_argument("--filter", action="append", metavar="COLUMN=VALUE",
+                   help="keep only matching rows (repeatable)")
+    p.add_argument("--out", default=None, metavar="STEM", help="name the copies STEM.<format>")
+
+    for p in commands.choices.values():
+        add_arguments(p)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    from .step_trace import configure_from_args, tracer
+    configure_from_args(args)
+
+    if args.command == "summarize":
+        out = summarize(args.source)
+        print(f"Weekly summary with second E/M layer exported to {out}")
+        written = [out]
+    elif args.command == "benchmark":
+        out = benchmark(args.chunksize, args.tag_rule, args.mad_k, args.sketch_capacity, args.source)
+        print(f"Invoice-level index written to {out}")
+        written = [out]
+    elif args.command == "merge":
+        out = merge(args.year, args.week)
+        print(f"Merged invoice-to-summary output written to {out}")
+        written = [out]
+    elif args.command == "model":
+        written = model(args.source, args.invoices, args.incremental, args.state_dir, args.baseline,
+                        args.model, args.save_model, args.segments,
+                        args.export_formats.split(",") if args.export_formats else None,
+                        args.narratives, args.dashboard_feed, args.query_files)
+        for path in written:
+            print(f"✅ Export complete: {path}")
+        written = [model_output(args.source)]
+    elif args.command == "drill":
+        if args.keys:
+            import pandas as pd
+            keys = pd.read_csv(args.keys)
+        elif len(args.key) == len(KEY_COLUMNS):
+            keys = [tuple(args.key)]
+        else:
+            parser.error(f"drill needs {' '.join(KEY_COLUMNS)} or --keys")
+        details = drill(keys, args.index, args.out, args.split)
+        if not args.out:
+            details.to_csv(sys.stdout, index=False)
+        written = [args.out] if args.out else []
+    else:
+        if args.out and len(args.path) > 1:
+            parser.error("--out names the copies of a single path")
+        written = [p for path in args.path
+                   for p in export(path, args.formats.split(","), _filters(args.filter), args.out)]
+        for path in written:
+            print(f"Exported {path}")
+
+    for out in written[:1]:
+        for path in tracer.write(out):
+            print(f"Trace written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# dashboard_feed.py
+# Columnar, precompressed dashboard data written straight from the weekly results
+#
+# Layout of a feed directory:
+#   manifest.json                    -- always revalidated; lists the chunks below
+#   weekly-2025-W01.<hash>.json      -- one chunk per Year/Week, cacheable forever
+#   weekly-2025-W01.<hash>.json.gz   -- precompressed variants of the same bytes
+#   weekly-2025-W01.<hash>.json.br      (brotli only when the module is installed)
+#
+# A chunk is {"rows": n, "columns": {name: [values]}, "dicts": {name: [strings]}}:
+# one array per column, and text columns hold indexes into their "dicts" entry
+# (null for missing values). Missing and non-finite numbers are null.
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Chunk key columns and the file name prefix
+CHUNK_KEYS = ["Year", "Week"]
+FEED_PREFIX = "weekly"
+MANIFEST = "manifest.json"
+FEED_VERSION = 1
+# Feed directory written after the final export (--dashboard-feed / REV_PERF_DASHBOARD_FEED)
+FEED_DIR = os.environ.get("REV_PERF_DASHBOARD_FEED") or None
+
+
+def _column(col: pd.Series):
+    """The JSON array for one column, and its dictionary for text columns."""
+    if pd.api.types.is_bool_dtype(col.dtype):
+        return col.astype(object).where(col.notna(), None).tolist(), None
+    if pd.api.types.is_integer_dtype(col.dtype) and not col.hasnans:
+        return col.tolist(), None
+    if pd.api.types.is_numeric_dtype(col.dtype):
+        values = col.to_numpy(dtype=float)
+        out = values.astype(object)
+        out[~np.isfinite(values)] = None
+        return out.tolist(), None
+    codes, uniques = pd.factorize(col.astype(object), use_na_sentinel=True)
+    out = codes.astype(object)
+    out[codes < 0] = None
+    return out.tolist(), [str(u) for u in uniques]
+
+
+def encode_chunk(frame: pd.DataFrame) -> bytes:
+    """Compact columnar JSON for `frame` (see the module header)."""
+    columns, dicts = {}, {}
+    for name in frame.columns:
+        columns[name], dictionary = _column(frame[name])
+        if dictionary is not None:
+            dicts[name] = dictionary
+    body = {"rows": len(frame), "columns": columns, "dicts": dicts}
+    return json.dumps(body, separators=(",", ":"), ensure_ascii=False,
+                      allow_nan=False).encode("utf-8")
+
+
+def _write(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _chunk_name(key) -> str:
+    year, week = key
+    return f"{FEED_PREFIX}-{int(year)}-W{int(week):02d}"
+
+
+def write_feed(frame: pd.DataFrame, out_dir: str) -> dict:
+    """
+    Write `frame` as one chunk per CHUNK_KEYS value plus gzip (and brotli)
+    variants, named by content hash so unchanged weeks keep their URLs.
+    Chunks no longer listed are removed. Returns the manifest.
+    """
+    missing = [c for c in CHUNK_KEYS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing cols: {missing}")
+    os.makedirs(out_dir, exist_ok=True)
+    chunks = []
+    for key, part in frame.groupby(CHUNK_KEYS, sort=True):
+        data = encode_chunk(part)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        name = f"{_chunk_name(key)}.{digest}.json"
+        entry = {"year": int(key[0]), "week": int(key[1]), "rows": len(part),
+                 "file": name, "bytes": len(data), "encodings": {}}
+        path = os.path.join(out_dir, name)
+        # Each file is checked on its own, so variants missing after an
+        # interrupted run (or added once brotli is installed) are filled in
+        if not os.path.isfile(path):
+            _write(path, data)
+        if not os.path.isfile(path + ".gz"):
+            # mtime=0 keeps the .gz bytes a function of the content alone
+            _write(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None and not os.path.isfile(path + ".br"):
+            _write(path + ".br", brotli.compress(data, quality=11))
+        for enc, suffix in (("gzip", ".gz"), ("br", ".br")):
+            if os.path.isfile(path + suffix):
+                entry["encodings"][enc] = os.path.getsize(path + suffix)
+        chunks.append(entry)
+
+    manifest = {"version": FEED_VERSION, "keys": CHUNK_KEYS, "columns": list(frame.columns),
+                "rows": len(frame), "chunks": chunks}
+    _write(os.path.join(out_dir, MANIFEST),
+           json.dumps(manifest, indent=1, ensure_ascii=False).encode("utf-8"))
+
+    current = {c["file"] for c in chunks}
+    for f in os.listdir(out_dir):
+        if f.startswith(FEED_PREFIX + "-") and f.split(".json")[0] + ".json" not in current:
+            os.remove(os.path.join(out_dir, f))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the dashboard feed from a weekly results file.")
+    parser.add_argument("source", help="weekly results (.xlsx, .csv or .arrow)")
+    parser.add_argument("out_dir")
+    args = parser.parse_args()
+
+    from .frame_store import read_frame
+    manifest = write_feed(read_frame(args.source), args.out_dir)
+    total = sum(c["bytes"] for c in manifest["chunks"])
+    gz = sum(c["encodings"].get("gzip", 0) for c in manifest["chunks"])
+    print(f"{len(manifest['chunks'])} chunks ({manifest['rows']} rows, {total} bytes, "
+          f"{gz} gzipped) written to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# drill_through_invoice_explainer.py
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from .frame_store import read_frame
+from .group_keys import GroupKeys
+
+KEY_COLUMNS = ['Year', 'Week', 'Payer', 'Group_EM', 'Group_EM2']
+
+
+class DrillThroughExplainer:
+    """
+    Utility for drilling from summary-level metrics to invoice-level data.
+
+    The composite (Year, Week, Payer, Group_EM, Group_EM2) key is indexed once
+    at load: each group gets an integer id (see group_keys.GroupKeys), invoice
+    positions are sorted by id, and a lookup is a slice between two group
+    offsets.
+
+    `filters` ({column: value or values}) loads only those invoices, e.g.
+    {"Year": 2025, "Week": 14}; a partitioned index opens only the matching
+    weeks.
+    """
+
+    def __init__(self, invoice_index_path: str, filters: dict = None):
+        self.df_inv = read_frame(invoice_index_path, filters=filters)
+        self._build_index()
+
+    def _build_index(self):
+        self._keys = GroupKeys(self.df_inv, KEY_COLUMNS)
+        codes = self._keys.ids
+        order = np.argsort(codes, kind='stable')
+        order = order[codes[order] >= 0]  # rows with a missing key never match
+        self._order = order
+        self._offsets = np.searchsorted(codes[order], np.arange(self._keys.n + 1))
+        self._codes = {key: i for i, key in enumerate(self._keys.table.itertuples(index=False, name=None))}
+
+    def _slices(self, keys):
+        if isinstance(keys, pd.DataFrame):
+            codes = self._keys.encode(keys)
+        else:
+            codes = np.array([self._codes.get(tuple(k), -1) for k in keys], dtype=np.int64)
+        codes = codes[codes >= 0]
+        return self._offsets[codes], self._offsets[codes + 1]
+
+    def get_invoice_details(self, year: int, week: int, payer: str,
+                            group_em: str, group_em2: str) -> pd.DataFrame:
+        code = self._codes.get((year, week, payer, group_em, group_em2))
+        if code is None:
+            return self.df_inv.iloc[:0]
+        return self.df_inv.iloc[self._order[self._offsets[code]:self._offsets[code + 1]]]
+
+    def get_invoice_details_batch(self, keys) -> pd.DataFrame:
+        """
+        Invoices for many (year, week, payer, group_em, group_em2) keys in one
+        take, in request order. `keys` may be an iterable of tuples or a frame
+        with the key columns.
+        """
+        starts, ends = self._slices(keys)
+        lengths = ends - starts
+        # Expand each [start, end) slice into positions without a Python loop
+        positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+        return self.df_inv.iloc[self._order[positions]]
+
+    def export_invoice_details(self, year: int, week: int, payer: str,
+                               group_em: str, group_em2: str,
+                               output_csv: str):
+        df_details = self.get_invoice_details(year, week, payer, group_em, group_em2)
+        df_details.to_csv(output_csv, index=False)
+        print(f"Exported {len(df_details)} invoices to {output_csv}")
+
+    def export_invoice_details_bulk(self, keys, output_path: str, split: bool = False):
+        """
+        Export the invoices of many groups. By default all groups go to one
+        CSV at `output_path`; with `split=True`, `output_path` is a directory
+        receiving one CSV per group.
+        """
+        if isinstance(keys, pd.DataFrame):
+            keys = list(keys[KEY_COLUMNS].itertuples(index=False, name=None))
+        if not split:
+            df_details = self.get_invoice_details_batch(keys)
+            df_details.to_csv(output_path, index=False)
+            print(f"Exported {len(df_details)} invoices to {output_path}")
+            return
+
+        os.makedirs(output_path, exist_ok=True)
+        total = files = 0
+        for key in keys:
+            df_details = self.get_invoice_details(*key)
+            if df_details.empty:
+                continue
+            name = re.sub(r'[^\w.-]+', '_', '_'.join(str(k) for k in key))
+            df_details.to_csv(os.path.join(output_path, f"{name}.csv"), index=False)
+            total += len(df_details)
+            files += 1
+        print(f"Exported {total} invoices in {files} files to {output_path}")
@@ -0,0 +1,154 @@
+# exporter.py
+# Step 14 exports: one spec of output files, validated up front and written concurrently
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# File suffix per export format
+SUFFIXES = {"xlsx": ".xlsx", "csv": ".csv", "csv.gz": ".csv.gz", "arrow": ".arrow",
+            "parquet": ".parquet"}
+# Formats written for the final weekly results (--export-formats / REV_PERF_EXPORT_FORMATS)
+EXPORT_FORMATS = [f for f in os.environ.get("REV_PERF_EXPORT_FORMATS", "xlsx").split(",") if f]
+# Output files written at once (REV_PERF_EXPORT_WORKERS)
+EXPORT_WORKERS = int(os.environ.get("REV_PERF_EXPORT_WORKERS", "4"))
+# Rows converted to cell values at a time by the streaming xlsx writer
+XLSX_BATCH_ROWS = 5_000
+
+
+@dataclass
+class ExportTarget:
+    """
+    One output file: `columns` of the frame named `frame` (every column when
+    None) followed by whichever `optional` columns are present. The format
+    follows the suffix of `path`.
+    """
+    path: str
+    frame: str
+    columns: list = None
+    optional: list = field(default_factory=list)
+
+
+def export_format(path: str) -> str:
+    for fmt, suffix in sorted(SUFFIXES.items(), key=lambda kv: -len(kv[1])):
+        if path.endswith(suffix):
+            return fmt
+    raise ValueError(f"Unsupported export format: {path}")
+
+
+def format_paths(path: str, formats) -> list:
+    """`path` re-suffixed for each of `formats`."""
+    stem = path[:-len(SUFFIXES[export_format(path)])]
+    unknown = [f for f in formats if f not in SUFFIXES]
+    if unknown:
+        raise ValueError(f"Unknown export formats {unknown}; expected some of {sorted(SUFFIXES)}")
+    return [stem + SUFFIXES[f] for f in formats]
+
+
+def select(frame: pd.DataFrame, target: ExportTarget) -> pd.DataFrame:
+    """The columns `target` exports; raises ValueError when required ones are missing."""
+    if target.columns is None:
+        return frame
+    missing = [c for c in target.columns if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing cols: {missing}")
+    return frame[list(target.columns) + [c for c in target.optional if c in frame.columns]]
+
+
+def _cell_values(col: pd.Series) -> list:
+    # Same cell values as DataFrame.to_excel: missing values are left blank
+    # and infinities are written as "inf" / "-inf"
+    if pd.api.types.is_float_dtype(col.dtype):
+        values = col.to_numpy(dtype=float)
+        out = values.astype(object)
+        out[np.isnan(values)] = None
+        out[np.isposinf(values)] = "inf"
+        out[np.isneginf(values)] = "-inf"
+        return out.tolist()
+    if pd.api.types.is_integer_dtype(col.dtype) and not col.hasnans:
+        return col.tolist()
+    return col.astype(object).where(col.notna(), None).tolist()
+
+
+def _rows(frame: pd.DataFrame):
+    for start in range(0, len(frame), XLSX_BATCH_ROWS):
+        batch = frame.iloc[start:start + XLSX_BATCH_ROWS]
+        yield from zip(*(_cell_values(batch[c]) for c in batch.columns))
+
+
+def write_xlsx(frame: pd.DataFrame, path: str, sheet_name: str = "Sheet1"):
+    """
+    Write `frame` (without its index) as a workbook, streaming rows to disk
+    in batches: xlsxwriter's constant-memory mode when installed, otherwise
+    openpyxl's write-only mode.
+    """
+    header = [str(c) for c in frame.columns]
+    if xlsxwriter is not None:
+        wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+        ws = wb.add_worksheet(sheet_name)
+        ws.write_row(0, 0, header, wb.add_format({"bold": True}))
+        for i, row in enumerate(_rows(frame), start=1):
+            ws.write_row(i, 0, row)
+        wb.close()
+        return
+
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    bold = Font(bold=True)
+    cells = []
+    for name in header:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = bold
+        cells.append(cell)
+    ws.append(cells)
+    for row in _rows(frame):
+        ws.append(row)
+    wb.save(path)
+
+
+def write_export(frame: pd.DataFrame, path: str) -> str:
+    """Write `frame` in the format of `path`'s suffix, atomically; returns `path`."""
+    fmt = export_format(path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        if fmt == "xlsx":
+            write_xlsx(frame, tmp)
+        elif fmt == "csv":
+            frame.to_csv(tmp, index=False)
+        elif fmt == "csv.gz":
+            frame.to_csv(tmp, index=False, compression="gzip")
+        elif fmt == "arrow":
+            import pyarrow.feather as feather
+            feather.write_feather(frame.reset_index(drop=True), tmp, compression="zstd")
+        else:
+            frame.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def export(frames: dict, spec: list, workers: int = EXPORT_WORKERS) -> list:
+    """
+    Write every target in `spec` from `frames` (name -> DataFrame). All
+    targets are validated before anything is written; independent files are
+    then written concurrently. Returns the paths in spec order.
+    """
+    jobs = [(select(frames[t.frame], t), t.path) for t in spec]
+    if workers <= 1 or len(jobs) <= 1:
+        return [write_export(frame, path) for frame, path in jobs]
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(lambda job: write_export(*job), jobs))
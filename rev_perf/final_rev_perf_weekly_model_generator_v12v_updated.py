@@ -0,0 +1,53 @@
+# === final_rev_perf_weekly_model_generator_v12v_updated.py ===
+import os
+import pandas as pd
+from .frame_store import write_frame
+from .metric_registry import aggregate
+from .source_cache import load_source
+from .step_trace import span, tracer
+
+# === Step 0: File Paths ===
+SOURCE_FILE = "v2 Rev Perf Report with Second Group Layer(1).xlsx"
+OUTPUT_CSV = 'weekly_summary_with_layer2.csv'
+
+
+# === Step 2: Aggregate Weekly Summary ===
+def weekly_summary(df: pd.DataFrame) -> pd.DataFrame:
+    # Aggregation rules come from the shared metric registry
+    return aggregate(df, {"weekly": [
+        'Charge Amount',                    # Total billed charges
+        'Payment Amount*',                  # Total payments collected
+        'Zero Balance Collection Rate',     # Avg. zero-balance collection rate
+        'NRV Zero Balance*',                # Avg. net realizable value on zero balances
+        'Visit Count'                       # Count of visits
+    ]})["weekly"]
+
+
+def run(source_file: str = SOURCE_FILE) -> str:
+    """Steps 1–3 for `source_file`; returns the path written."""
+    if not os.path.isfile(source_file):
+        raise FileNotFoundError(f"Error: File not found: {source_file}")
+
+    # === Step 1: Read & Normalize Data ===
+    with span("Step 1: Read & Normalize Data") as s:
+        df = load_source(source_file, sheet_name='Sheet 1')
+        s.rows_out = len(df)
+
+    with span("Step 2: Aggregate Weekly Summary", rows_in=len(df)) as s:
+        weekly = weekly_summary(df)
+        s.rows_out = len(weekly)
+
+    # === Step 3: Export Weekly Summary ===
+    with span("Step 3: Export Weekly Summary", rows_in=len(weekly)):
+        return write_frame(weekly, OUTPUT_CSV)
+
+
+def main(source_file: str = SOURCE_FILE):
+    out = run(source_file)
+    print(f"Weekly summary with second E/M layer exported to {out}")
+    for path in tracer.write(OUTPUT_CSV):
+        print(f"Trace written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# frame_store.py
+
+import os
+import sys
+
+import pandas as pd
+
+from .exporter import write_export
+from .partition_store import (
+    MANIFEST, PartitionWriter, dataset_dir, filter_rows, is_partitioned, manifest_path, normalize_filters,
+    read_dataset, write_dataset
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = feather = None
+
+# Intermediates are Arrow IPC (Feather v2) files next to the CSV name they
+# replace: `invoice_level_index.csv` -> `invoice_level_index.arrow`.
+BINARY_SUFFIX = ".arrow"
+BINARY_ENABLED = os.environ.get("REV_PERF_BINARY", "1") != "0" and feather is not None
+EXPORT_CSV = os.environ.get("REV_PERF_EXPORT_CSV") == "1"
+
+# Uncompressed so reads can memory-map the file instead of decompressing it
+ARROW_COMPRESSION = "uncompressed"
+
+# Repeated text keys are stored dictionary-encoded
+CATEGORY_COLUMNS = ["Payer", "Group_EM", "Group_EM2"]
+
+
+def binary_path(path: str) -> str:
+    return os.path.splitext(path)[0] + BINARY_SUFFIX
+
+
+def _newer(path: str, other: str) -> bool:
+    return not os.path.isfile(other) or os.stat(path).st_mtime_ns >= os.stat(other).st_mtime_ns
+
+
+def resolve(path: str) -> str:
+    """
+    The file to read for `path`: the manifest of its partitioned dataset or
+    its binary sibling when that exists and is at least as new as the flat
+    files, otherwise `path` itself.
+    """
+    if feather is None or path.endswith((BINARY_SUFFIX, MANIFEST, ".xlsx")):
+        return path
+    alt, manifest = binary_path(path), manifest_path(path)
+    if os.path.isfile(manifest) and _newer(manifest, path) and _newer(manifest, alt):
+        return manifest
+    if not os.path.isfile(alt):
+        return path
+    if os.path.isfile(path) and os.stat(path).st_mtime_ns > os.stat(alt).st_mtime_ns:
+        return path  # CSV was replaced after the binary copy was written
+    return alt
+
+
+def exists(path: str) -> bool:
+    return os.path.isfile(resolve(path))
+
+
+def read_frame(path: str, columns: list = None, categories: bool = False,
+               filters: dict = None) -> pd.DataFrame:
+    """
+    Read an intermediate by its CSV name. Binary files are memory-mapped and
+    only `columns` are materialized. Dictionary-encoded keys come back as
+    plain strings unless `categories=True`.
+
+    `filters` ({column: value or values}, e.g. {"Year": 2025, "Week": [3, 4]})
+    keeps only matching rows; partitioned datasets open only the partitions
+    that can match.
+    """
+    path = resolve(path)
+    if path.endswith(MANIFEST):
+        df = read_dataset(path, columns, filters)
+    else:
+        wanted = columns
+        if filters and columns is not None:
+            wanted = list(dict.fromkeys(list(columns) + list(normalize_filters(filters))))
+        if path.endswith(BINARY_SUFFIX):
+            df = feather.read_table(path, columns=wanted, memory_map=True).to_pandas()
+        elif path.endswith(".xlsx"):
+            df = pd.read_excel(path, usecols=wanted)
+        else:
+            df = pd.read_csv(path, usecols=wanted)
+        if filters:
+            df = filter_rows(df, filters)
+            df = df[list(columns)] if columns is not None else df
+    if not categories:
+        for c in df.columns:
+            if isinstance(df[c].dtype, pd.CategoricalDtype):
+                df[c] = df[c].astype(df[c].cat.categories.dtype)
+    return df
+
+
+def write_frame(frame: pd.DataFrame, path: str, csv: bool = EXPORT_CSV,
+                mode: str = "overwrite") -> str:
+    """
+    Write an intermediate by its CSV name: as the binary sibling (or a
+    partitioned dataset, see partition_store.py), plus the CSV itself when
+    `csv` is set or pyarrow is unavailable. Returns the path written.
+    Paths already named as an export (.xlsx, .csv.gz, .arrow) are written
+    once, compressed, by exporter.write_export().
+
+    Only partitioned datasets take `mode` "upsert" (replace the weeks in
+    `frame`, keep the others) or "append".
+    """
+    if path.endswith((".xlsx", ".csv.gz", BINARY_SUFFIX)):
+        return write_export(frame, path)
+    if is_partitioned(path):
+        out = write_dataset(frame, path, mode)
+        if csv:
+            (frame if mode == "overwrite" else read_frame(out)).to_csv(path, index=False)
+            os.utime(out)  # keep the dataset the preferred read
+        return out
+    if mode != "overwrite":
+        raise ValueError(f"Write mode {mode!r} needs a partitioned dataset (REV_PERF_PARTITIONED=1) for {path}")
+    if not BINARY_ENABLED:
+        frame.to_csv(path, index=False)
+        return path
+
+    out = binary_path(path)
+    cats = {c: "category" for c in CATEGORY_COLUMNS
+            if c in frame.columns and not isinstance(frame[c].dtype, pd.CategoricalDtype)}
+    tmp = f"{out}.{os.getpid()}.tmp"
+    feather.write_feather(frame.astype(cats).reset_index(drop=True), tmp,
+                          compression=ARROW_COMPRESSION)
+    os.replace(tmp, out)
+    if csv:
+        frame.to_csv(path, index=False)
+        os.utime(out)  # keep the binary copy the preferred read
+    return out
+
+
+class FrameWriter:
+    """
+    Append frames batch by batch to an intermediate named like `write_frame`
+    would name it, so a large output never has to be held in memory at once.
+    Batches must share columns; the Arrow schema is fixed by the first batch
+    and later batches are cast to it.
+    """
+
+    def __init__(self, path: str, csv: bool = EXPORT_CSV):
+        self.path = path
+        self.csv = csv or not BINARY_ENABLED
+        self.out = binary_path(path) if BINARY_ENABLED else path
+        # Partitioned outputs get one file per week per batch instead
+        self._dataset = PartitionWriter(path) if is_partitioned(path) else None
+        self._tmp = f"{self.out}.{os.getpid()}.tmp"
+        self._writer = self._schema = None
+        self._csv_header = True
+        self.rows = 0
+
+    def write(self, frame: pd.DataFrame):
+        frame = frame.reset_index(drop=True)
+        if self._dataset is not None:
+            self._dataset.write(frame)
+        elif BINARY_ENABLED:
+            if self._writer is None:
+                schema = pa.Schema.from_pandas(frame, preserve_index=False)
+                # Columns that are empty in the first batch hold text elsewhere
+                for i, f in enumerate(schema):
+                    if pa.types.is_null(f.type):
+                        schema = schema.set(i, f.with_type(pa.string()))
+                self._schema = schema
+                compression = None if ARROW_COMPRESSION == "uncompressed" else ARROW_COMPRESSION
+                self._writer = pa.ipc.new_file(
+                    self._tmp, schema, options=pa.ipc.IpcWriteOptions(compression=compression)
+                )
+            self._writer.write_table(
+                pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+            )
+        if self.csv:
+            frame.to_csv(self.path, index=False, header=self._csv_header,
+                         mode="w" if self._csv_header else "a")
+            self._csv_header = False
+        self.rows += len(frame)
+
+    def close(self) -> str:
+        if self._dataset is not None:
+            self.out = self._dataset.close()
+            if self.csv:
+                os.utime(self.out)  # keep the dataset the preferred read
+            return self.out
+        if self._writer is None and self._csv_header:
+            return write_frame(pd.DataFrame(), self.path, csv=self.csv)  # no batches
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._tmp, self.out)
+        return self.out
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._dataset is not None:
+            self._dataset.abort()
+        elif self._writer is not None:
+            self._writer.close()
+            os.remove(self._tmp)
+
+
+def export_csv(path: str, csv_path: str = None) -> str:
+    """Write a CSV copy of an intermediate for people to open."""
+    csv_path = csv_path or dataset_dir(path) + ".csv"
+    source = resolve(path)
+    read_frame(source).to_csv(csv_path, index=False)
+    if source.endswith((BINARY_SUFFIX, MANIFEST)):
+        os.utime(source)  # keep the binary copy the preferred read
+    return csv_path
+
+
+if __name__ == "__main__":
+    # python -m rev_perf.frame_store invoice_level_index.arrow [invoice_level_index/_manifest.json ...]  -> CSV copies
+    for arg in sys.argv[1:]:
+        print(f"Exported {export_csv(arg)}")
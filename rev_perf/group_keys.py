@@ -0,0 +1,94 @@
+# group_keys.py
+
+import numpy as np
+import pandas as pd
+
+GROUP_KEYS = ["Year", "Week", "Payer", "Group_EM", "Group_EM2"]
+
+
+def parse_unique(values: pd.Series, parse) -> pd.Series:
+    """Apply `parse` (Series -> Series) to the distinct labels of `values` only."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    parsed = parse(pd.Series(uniques, dtype=values.dtype))
+    return pd.Series(parsed.to_numpy()[codes], index=values.index, dtype=parsed.dtype)
+
+
+def _plain_dtype(col: pd.Series):
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.categories.dtype
+    if pd.api.types.is_integer_dtype(col.dtype):
+        return np.dtype("int64")
+    return col.dtype
+
+
+class GroupKeys:
+    """
+    Composite integer id for each row's (Year, Week, Payer, Group_EM, Group_EM2)
+    key, computed once and reused by every grouping and join on those keys.
+
+    Ids are dense and follow the sorted order of the key tuples, so grouping by
+    `ids` yields groups in the same order as `groupby(keys)`. `table` holds one
+    row of plain (str / int64) key values per id; rows with a missing key get
+    id -1.
+    """
+
+    def __init__(self, frame: pd.DataFrame, keys=GROUP_KEYS):
+        self.keys = list(keys)
+        self._levels, codes = [], []
+        for k in self.keys:
+            # Factorize, then sort only the distinct labels
+            c, uniques = pd.factorize(frame[k])
+            labels = np.asarray(uniques)
+            order = np.argsort(labels, kind="stable")
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            codes.append(np.where(c >= 0, rank[np.maximum(c, 0)], -1))
+            self._levels.append(pd.Index(labels[order]))
+
+        composite, valid = self._combine(codes, len(frame))
+        self._composite, gid = np.unique(composite[valid], return_inverse=True)
+        self.ids = np.full(len(frame), -1, dtype=np.int64)
+        self.ids[valid] = gid
+        self.n = len(self._composite)
+
+        # Decode the sorted composites back into one key row per id
+        columns, rest = {}, self._composite
+        for k, level in reversed(list(zip(self.keys, self._levels))):
+            size = max(len(level), 1)
+            values = level.to_numpy()[rest % size] if self.n else level.to_numpy()[:0]
+            columns[k] = pd.Series(values, dtype=_plain_dtype(frame[k]))
+            rest = rest // size
+        self.table = pd.DataFrame({k: columns[k] for k in self.keys})
+
+    def _combine(self, codes, n: int):
+        if np.prod([float(max(len(level), 1)) for level in self._levels]) >= 2 ** 63:
+            raise OverflowError("Too many distinct key values for a 64-bit composite id")
+        composite = np.zeros(n, dtype=np.int64)
+        valid = np.ones(n, dtype=bool)
+        for c, level in zip(codes, self._levels):
+            composite = composite * max(len(level), 1) + np.maximum(c, 0)
+            valid &= c >= 0
+        return composite, valid
+
+    def encode(self, frame: pd.DataFrame) -> np.ndarray:
+        """Ids of `frame`'s key tuples in this table (-1 where the key is not present)."""
+        codes = []
+        for k, level in zip(self.keys, self._levels):
+            c, uniques = pd.factorize(frame[k])
+            found = level.get_indexer(pd.Index(np.asarray(uniques)))
+            codes.append(np.where(c >= 0, found[np.maximum(c, 0)], -1))
+        composite, valid = self._combine(codes, len(frame))
+        if not self.n:
+            return np.full(len(frame), -1, dtype=np.int64)
+        pos = np.searchsorted(self._composite, composite).clip(max=self.n - 1)
+        return np.where(valid & (self._composite[pos] == composite), pos, -1)
+
+    def subgroups(self, keys) -> "GroupKeys":
+        """Ids for a subset of the key columns; `.ids` is indexed by this table's ids."""
+        return GroupKeys(self.table, keys)
+
+
+def align_rows(table: pd.DataFrame, frame: pd.DataFrame, keys) -> np.ndarray:
+    """Row position in `table` (unique on `keys`) for each row of `frame`, -1 if absent."""
+    index = pd.MultiIndex.from_frame(table[keys])
+    return index.get_indexer(pd.MultiIndex.from_frame(frame[keys]))
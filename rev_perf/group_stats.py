@@ -0,0 +1,171 @@
+# group_stats.py
+# Per-group quantiles and robust spreads from one sort by (group, value)
+
+import numpy as np
+import pandas as pd
+
+from .group_keys import GroupKeys
+
+
+def _quantile(stat: str) -> float:
+    """"median" -> 0.5, "p10" -> 0.1, "p97.5" -> 0.975."""
+    if stat == "median":
+        return 0.5
+    if stat.startswith("p"):
+        q = float(stat[1:]) / 100
+        if 0 <= q <= 1:
+            return q
+    raise ValueError(f"Unknown group statistic {stat!r}; expected median, mad or pNN")
+
+
+def grouped_quantiles(ids: np.ndarray, values: np.ndarray, n_groups: int, qs,
+                      weights: np.ndarray = None) -> np.ndarray:
+    """
+    (n_groups, len(qs)) quantiles of `values` per group id, interpolated
+    linearly as pandas does; missing values and ids < 0 are ignored, and
+    groups with no values get NaN.
+
+    Values are sorted by (id, value) once. With `weights` each value stands
+    for that many samples centred on its rank, which is how the sketches of
+    QuantileSketch are read; unit weights give the exact quantiles.
+    """
+    valid = (ids >= 0) & ~np.isnan(values)
+    ids, values = ids[valid], values[valid]
+    weights = np.ones(len(ids)) if weights is None else weights[valid].astype(float)
+    order = np.lexsort((values, ids))
+    ids, values, weights = ids[order], values[order], weights[order]
+
+    counts = np.bincount(ids, minlength=n_groups)
+    totals = np.bincount(ids, weights=weights, minlength=n_groups)
+    start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    before = np.concatenate([[0.0], np.cumsum(totals)[:-1]])
+    # Each value's (centre) rank, offset by the weight of earlier groups so
+    # that ranks increase across the whole sorted array
+    rank = np.cumsum(weights) - weights + (weights - 1) / 2
+
+    out = np.full((n_groups, len(qs)), np.nan)
+    has = np.flatnonzero(counts > 0)
+    first, last = start[has], start[has] + counts[has] - 1
+    for j, q in enumerate(qs):
+        target = before[has] + q * (totals[has] - 1)
+        lo = np.clip(np.searchsorted(rank, target, side="right") - 1, first, last)
+        hi = np.minimum(lo + 1, last)
+        gap = rank[hi] - rank[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frac = np.where(gap > 0, np.clip((target - rank[lo]) / gap, 0, 1), 0.0)
+        out[has, j] = values[lo] + (values[hi] - values[lo]) * frac
+    return out
+
+
+def grouped_mad(ids: np.ndarray, values: np.ndarray, n_groups: int, median: np.ndarray = None,
+                weights: np.ndarray = None) -> np.ndarray:
+    """Median absolute deviation from each group's median (unscaled)."""
+    if median is None:
+        median = grouped_quantiles(ids, values, n_groups, [0.5], weights)[:, 0]
+    deviation = np.abs(values - median[np.maximum(ids, 0)])
+    return grouped_quantiles(ids, deviation, n_groups, [0.5], weights)[:, 0]
+
+
+def _stats_columns(columns: dict, n_groups: int, metric_data) -> dict:
+    # metric_data(metric) -> (group ids, values, weights or None)
+    by_metric = {}
+    for name, (metric, stat) in columns.items():
+        by_metric.setdefault(metric, []).append((name, stat))
+    out = {}
+    for metric, wanted in by_metric.items():
+        ids, values, weights = metric_data(metric)
+        qs = sorted({0.5} | {_quantile(stat) for _, stat in wanted if stat != "mad"})
+        quantiles = dict(zip(qs, grouped_quantiles(ids, values, n_groups, qs, weights).T))
+        for name, stat in wanted:
+            if stat == "mad":
+                out[name] = grouped_mad(ids, values, n_groups, quantiles[0.5], weights)
+            else:
+                out[name] = quantiles[_quantile(stat)]
+    return out
+
+
+def group_stats(frame: pd.DataFrame, keys, columns: dict) -> pd.DataFrame:
+    """
+    One row per group of `keys` (in groupby order) with each requested
+    {column name: (metric, "median" | "mad" | "pNN")} statistic.
+    """
+    gk = GroupKeys(frame, keys)
+    stats = _stats_columns(columns, gk.n,
+                           lambda metric: (gk.ids, frame[metric].to_numpy(dtype=float), None))
+    return gk.table.assign(**stats)
+
+
+class QuantileSketch:
+    """
+    Bounded-memory stand-in for group_stats() over data seen in batches.
+
+    Per group and metric it keeps a KLL sketch: values sit on levels, a
+    value on level h standing for 2**h samples. The top level holds up to
+    `capacity` values and each level below 2/3 as many (at least 2), so a
+    group keeps fewer than 3 * capacity values. A level over its limit is
+    compacted: its values are sorted, and every other one (from a random
+    end) moves up a level while the rest are dropped; only values of equal
+    weight are ever merged. Quantiles are read from the weighted values and
+    are typically within total / capacity ranks of the exact ones, rarely
+    more than twice that; groups that never overflow are exact.
+    """
+
+    SHRINK = 2 / 3
+
+    def __init__(self, keys, metrics, capacity: int = 256, seed: int = 0):
+        if capacity < 2:
+            raise ValueError(f"Sketch capacity must be at least 2, got {capacity}")
+        self.keys, self.metrics, self.capacity = list(keys), list(metrics), capacity
+        self._rng = np.random.default_rng(seed)
+        self._parts = {m: None for m in self.metrics}
+
+    def update(self, chunk: pd.DataFrame):
+        for m in self.metrics:
+            values = chunk[m].to_numpy(dtype=float)
+            ok = ~np.isnan(values)
+            part = chunk.loc[ok, self.keys].assign(_value=values[ok], _level=np.int8(0))
+            prev = self._parts[m]
+            self._parts[m] = self._compact(part if prev is None else pd.concat([prev, part], ignore_index=True))
+        return self
+
+    def _compact(self, part: pd.DataFrame) -> pd.DataFrame:
+        gk = GroupKeys(part, self.keys)
+        values = part["_value"].to_numpy()
+        levels = part["_level"].to_numpy().astype(np.int64)
+        rows = np.arange(len(part))
+        ids = gk.ids
+        while len(rows):
+            # Limit of each value's (group, level): capacity on the group's top level
+            top = np.zeros(gk.n, dtype=np.int64)
+            np.maximum.at(top, ids, levels)
+            limit = np.maximum(2, np.ceil(self.capacity * self.SHRINK ** (top[ids] - levels)))
+            cell = ids * (levels.max() + 2) + levels
+            counts = np.bincount(cell)
+            full = np.flatnonzero(counts[cell] > limit)
+            if not len(full):
+                break
+            # Sort each full level; an odd one out (its largest value) stays where it is
+            order = full[np.lexsort((values[full], cell[full]))]
+            cells, first, size = np.unique(cell[order], return_index=True, return_counts=True)
+            rank = np.arange(len(order)) - np.repeat(first, size)
+            paired = rank < np.repeat(size - size % 2, size)
+            offset = np.repeat(self._rng.integers(2, size=len(cells)), size)
+            promote, drop = order[paired & (rank % 2 == offset)], order[paired & (rank % 2 != offset)]
+            levels[promote] += 1
+            keep = np.ones(len(rows), dtype=bool)
+            keep[drop] = False
+            rows, ids, values, levels = rows[keep], ids[keep], values[keep], levels[keep]
+        return part.iloc[rows].assign(_level=levels.astype(np.int8)).reset_index(drop=True)
+
+    def stats(self, columns: dict) -> pd.DataFrame:
+        """group_stats() of everything passed to update(), approximately."""
+        parts = [p for p in self._parts.values() if p is not None and len(p)]
+        if not parts:
+            return pd.DataFrame(columns=self.keys + list(columns))
+        gk = GroupKeys(pd.concat([p[self.keys] for p in parts], ignore_index=True), self.keys)
+        def metric_data(metric):
+            part = self._parts[metric]
+            if part is None:
+                return np.empty(0, np.int64), np.empty(0), np.empty(0)
+            return gk.encode(part), part["_value"].to_numpy(), 2.0 ** part["_level"].to_numpy()
+        return gk.table.assign(**_stats_columns(columns, gk.n, metric_data))
@@ -0,0 +1,196 @@
+# incremental_refresh.py
+
+import json
+import os
+
+import pandas as pd
+
+from .baselines import BASELINE_KEYS, BASELINE_WINDOW, RunningBaseline, baseline_rows, parse_window
+from .group_keys import GroupKeys
+from .metric_registry import GROUP_KEYS, revenue_cycle_metrics, zb_metrics
+from .regression import load_partitions, save_partitions
+from .weekly_model import (
+    attach_narratives, concat_findings, diagnostic_findings, finalize_weekly, group_baseline_rows,
+    invoice_features, regression_partitions, summarize_weeks, zb_baseline_cols, zb_baseline_rows,
+    zb_findings
+)
+
+STATE_VERSION = 3
+
+
+def week_fingerprints(frame: pd.DataFrame) -> pd.Series:
+    """Order-insensitive content hash per (Year, Week) partition."""
+    hashes = pd.util.hash_pandas_object(frame, index=False)
+    keys = [frame["Year"].astype(str).rename("Year"), frame["Week"].astype(int).rename("Week")]
+    return hashes.groupby(keys).sum().astype(str)
+
+
+def _in_weeks(frame: pd.DataFrame, weeks) -> pd.Series:
+    index = pd.MultiIndex.from_arrays([frame["Year"].astype(str), frame["Week"].astype(int)])
+    return pd.Series(index.isin(list(weeks)), index=frame.index)
+
+
+def _read(state_dir: str, name: str) -> pd.DataFrame:
+    return pd.read_parquet(os.path.join(state_dir, f"{name}.parquet"))
+
+
+def _write(state_dir: str, name: str, frame: pd.DataFrame):
+    tmp = os.path.join(state_dir, f"{name}.parquet.tmp")
+    frame.reset_index(drop=True).to_parquet(tmp, index=False)
+    os.replace(tmp, os.path.join(state_dir, f"{name}.parquet"))
+
+
+def load_state(state_dir: str, baseline: str = "all"):
+    """
+    Saved partitions and baselines, or None when there is no usable state
+    (including state saved for a different `baseline` window).
+    """
+    try:
+        with open(os.path.join(state_dir, "manifest.json")) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != STATE_VERSION or manifest.get("baseline", "all") != baseline:
+        return None
+    state = {name: _read(state_dir, name) for name in
+             ("weekly", "grp", "hist_sums", "hist_counts", "zb_sums", "zb_counts", "findings")}
+    state["regression"] = load_partitions(os.path.join(state_dir, "regression.npz"))
+    state["weeks"] = {tuple(k): v for k, v in manifest["weeks"]}
+    state["metrics"] = manifest["metrics"]
+    return state
+
+
+def save_state(state_dir: str, state: dict):
+    os.makedirs(state_dir, exist_ok=True)
+    for name in ("weekly", "grp", "hist_sums", "hist_counts", "zb_sums", "zb_counts", "findings"):
+        _write(state_dir, name, state[name])
+    save_partitions(os.path.join(state_dir, "regression.npz"), state["regression"])
+    manifest = {
+        "version": STATE_VERSION,
+        "metrics": state["metrics"],
+        "baseline": state["baseline"],
+        "weeks": [[list(k), v] for k, v in sorted(state["weeks"].items())],
+    }
+    tmp = os.path.join(state_dir, "manifest.json.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=1)
+    os.replace(tmp, os.path.join(state_dir, "manifest.json"))
+
+
+def _changed_groups(before: pd.DataFrame, after: pd.DataFrame) -> pd.MultiIndex:
+    before = before.set_index(BASELINE_KEYS)
+    after = after.set_index(BASELINE_KEYS)
+    before = before.reindex(after.index)
+    same = ((before == after) | (before.isna() & after.isna())).all(axis=1)
+    return after.index[~same.to_numpy()]
+
+
+def _replace(stored: pd.DataFrame, weeks, new: pd.DataFrame = None) -> pd.DataFrame:
+    """`stored` without the partitions in `weeks`, plus `new`."""
+    kept = stored[~_in_weeks(stored, weeks)] if len(stored) else stored
+    if new is None or not len(new):
+        return kept
+    return pd.concat([kept, new], ignore_index=True) if len(kept) else new.reset_index(drop=True)
+
+
+def refresh_results(df: pd.DataFrame, inv: pd.DataFrame, state_dir: str,
+                    baseline=BASELINE_WINDOW, **model_args):
+    """
+    Steps 5–13 using the state saved in `state_dir` by the previous run;
+    `(weekly, findings)` as weekly_model.build_results() returns them.
+
+    Only (Year, Week) partitions that are new or whose source/invoice rows
+    changed are re-aggregated; their group rows are folded into the running
+    baselines, and narratives are rebuilt only for weeks containing a group
+    whose baseline moved. The model (Steps 8–9) is re-solved from stored
+    per-week regression statistics and scores the stored weekly rows, and
+    flags (Step 12) run on them too, so the result matches a full run.
+
+    With a trailing or year-over-year `baseline` a week's narratives depend
+    on its neighbours, so they are rebuilt for every week.
+    """
+    kind, length = parse_window(baseline)
+    windowed = kind != "all"
+    baseline = f"{kind}:{length}" if windowed else kind
+    inv_fps = week_fingerprints(inv)
+    fingerprints = {k: f"{v}:{inv_fps.get(k, '')}" for k, v in week_fingerprints(df).items()}
+
+    state = load_state(state_dir, baseline)
+    if state is None:
+        empty = pd.DataFrame({"Year": pd.Series(dtype=str), "Week": pd.Series(dtype=int)})
+        state = {"weekly": empty, "grp": empty, "findings": empty,
+                 "regression": {}, "weeks": {}, "metrics": None}
+    dirty = {k for k, v in fingerprints.items() if state["weeks"].get(k) != v}
+    removed = set(state["weeks"]) - set(fingerprints)
+    touched = dirty | removed
+
+    if touched:
+        weekly_new = grp_new = None
+        if dirty:
+            df_dirty = df[_in_weeks(df, dirty)]
+            group_keys = GroupKeys(df_dirty)
+            weekly_new, grp_new = summarize_weeks(df_dirty, group_keys)
+            weekly_new = weekly_new.join(invoice_features(inv[_in_weeks(inv, dirty)], group_keys))
+        metrics = state["metrics"] or [c for c in grp_new.columns if c not in GROUP_KEYS]
+        if state["metrics"] is None:
+            hist = RunningBaseline(metrics, null_self_pay=revenue_cycle_metrics)
+            zb = RunningBaseline(zb_metrics)
+        else:
+            hist = RunningBaseline.from_frames(metrics, state["hist_sums"], state["hist_counts"],
+                                               null_self_pay=revenue_cycle_metrics)
+            zb = RunningBaseline.from_frames(zb_metrics, state["zb_sums"], state["zb_counts"])
+        hist_before, zb_before = hist.means(), zb.means()
+
+        if len(state["grp"]):
+            old_grp = state["grp"][_in_weeks(state["grp"], touched)]
+            if len(old_grp):
+                hist.update(old_grp, sign=-1)
+                zb.update(old_grp[GROUP_KEYS + zb_metrics], sign=-1)
+        if grp_new is not None:
+            grp_new = grp_new.reindex(columns=GROUP_KEYS + metrics)
+            hist.update(grp_new)
+            zb.update(grp_new[GROUP_KEYS + zb_metrics])
+        grp = state["grp"] = _replace(state["grp"], touched, grp_new)
+        state["weekly"] = _replace(state["weekly"], touched, weekly_new)
+        regression = {k: v for k, v in state["regression"].items() if k not in touched}
+        if weekly_new is not None:
+            regression.update(regression_partitions(weekly_new))
+        state["regression"] = regression
+
+        # Weeks whose narratives depend on a baseline that moved
+        hist_avg, zb_base = hist.means(), zb.means()
+        moved = _changed_groups(hist_before, hist_avg).union(_changed_groups(zb_before, zb_base))
+        in_moved = pd.MultiIndex.from_frame(grp[BASELINE_KEYS]).isin(moved)
+        affected = dirty | set(
+            grp.loc[in_moved | windowed, ["Year", "Week"]].astype({"Year": str, "Week": int})
+            .drop_duplicates().itertuples(index=False, name=None)
+        )
+        sub = grp[_in_weeks(grp, affected)]
+        findings_new = None
+        if len(sub) and windowed:
+            zb_base = zb_baseline_rows(grp[GROUP_KEYS + zb_metrics], baseline)
+            findings_new = concat_findings([
+                diagnostic_findings(sub, group_baseline_rows(grp, baseline).loc[sub.index]),
+                zb_findings(sub[GROUP_KEYS + zb_metrics], zb_base.loc[sub.index])])
+        elif len(sub):
+            findings_new = concat_findings([
+                diagnostic_findings(sub, baseline_rows(hist_avg, sub)),
+                zb_findings(sub[GROUP_KEYS + zb_metrics],
+                            baseline_rows(zb_base.rename(columns=zb_baseline_cols), sub))])
+        state["findings"] = _replace(state["findings"], affected | removed, findings_new)
+
+        state["metrics"], state["baseline"] = metrics, baseline
+        state["hist_sums"], state["hist_counts"] = hist.to_frames()
+        state["zb_sums"], state["zb_counts"] = zb.to_frames()
+        state["weeks"] = fingerprints
+        save_state(state_dir, state)
+
+    weekly = state["weekly"].sort_values(GROUP_KEYS, kind="mergesort").reset_index(drop=True)
+    return finalize_weekly(weekly, parts=state["regression"], **model_args), \
+        concat_findings([state["findings"]])
+
+
+def refresh_weekly(df: pd.DataFrame, inv: pd.DataFrame, state_dir: str,
+                   baseline=BASELINE_WINDOW, **model_args) -> pd.DataFrame:
+    """refresh_results() with the narratives rendered onto the weekly rows."""
+    return attach_narratives(*refresh_results(df, inv, state_dir, baseline, **model_args))
@@ -0,0 +1,300 @@
+# invoice_benchmark_code_v2.py
+
+import argparse
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from .frame_store import FrameWriter, write_frame
+from .group_stats import QuantileSketch, group_stats
+from .partition_store import PartitionWriter, partitions, read_dataset
+from .step_trace import add_arguments, configure_from_args, span, tracer
+
+INVOICE_INPUT = "Invoice_Assigned_To_Benchmark_With_Count.xlsx"
+INVOICE_SHEET = 'Sheet1'
+OUTPUT_CSV = 'invoice_level_index.csv'
+
+# Rows per batch in streaming mode (--chunksize / REV_PERF_CHUNKSIZE); 0 loads the whole file
+CHUNKSIZE = int(os.environ.get("REV_PERF_CHUNKSIZE", "0"))
+
+# How invoices are tagged against their group (--tag-rule / REV_PERF_TAG_RULE):
+#   mean        below 0.9x / above 1.1x the group mean
+#   percentile  below the group's p10 / above its p90
+#   mad         more than MAD_K scaled MADs from the group median
+TAG_RULES = ("mean", "percentile", "mad")
+TAG_RULE = os.environ.get("REV_PERF_TAG_RULE", "mean")
+MAD_K = float(os.environ.get("REV_PERF_MAD_K", "3"))
+# MAD -> standard deviation for normally distributed metrics
+MAD_SCALE = 1.4826
+# Values kept per group and metric when streaming robust benchmarks
+# (--sketch-capacity / REV_PERF_QUANTILE_SKETCH); 0 spills them to disk by
+# Year/Week for exact quantiles
+SKETCH_CAPACITY = int(os.environ.get("REV_PERF_QUANTILE_SKETCH", "0"))
+
+# === Step 3: Define Grouping Keys ===
+group_keys = ['Year', 'Week', 'Payer', 'Group_EM', 'Group_EM2']
+
+# Benchmark column -> invoice metric it averages
+benchmark_means = {
+    'Benchmark_Charge_Amount': 'Charge Amount',
+    'Benchmark_Payment_Amount': 'Payment Amount*',
+    'Benchmark_Zero_Balance_Collection_Rate': 'Zero Balance Collection Rate',
+}
+# Robust benchmark column -> (invoice metric, group statistic), for the other tag rules
+benchmark_robust = {
+    f'{name}_{suffix}': (metric, stat)
+    for name, metric in benchmark_means.items()
+    for suffix, stat in (('Median', 'median'), ('P10', 'p10'), ('P90', 'p90'), ('MAD', 'mad'))
+}
+
+
+# === Step 0: Load Invoice-Level Data ===
+def load_invoices(path: str = INVOICE_INPUT) -> pd.DataFrame:
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Error: File not found: {path}")
+    return pd.read_excel(path, sheet_name=INVOICE_SHEET)
+
+
+def _cell(value):
+    # Same conversion as pandas' openpyxl reader: integral floats become ints
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def iter_invoices(path: str = INVOICE_INPUT, chunksize: int = 50_000):
+    """Yield the raw invoice rows in frames of at most `chunksize` rows."""
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Error: File not found: {path}")
+    if path.endswith(".csv"):
+        yield from pd.read_csv(path, chunksize=chunksize)
+        return
+
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb[INVOICE_SHEET].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        batch = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            batch.append([_cell(v) for v in row])
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        wb.close()
+
+
+def standardize_invoices(df_inv: pd.DataFrame) -> pd.DataFrame:
+    # === Step 1: Standardize Column Names ===
+    df_inv = df_inv.rename(columns={
+        'Year of Visit Service Date': 'Year',
+        'ISO Week of Visit Service Date': 'Week',
+        'Primary Financial Class': 'Payer',
+        'Chart E/M Code Grouping': 'Group_EM',
+        'Chart E/M Code Second Layer': 'Group_EM2',
+        'Charge Invoice Number': 'Invoice_Number'
+    })
+
+    # === Step 2: Data Type Conversion ===
+    df_inv['Year'] = df_inv['Year'].astype(int)
+    df_inv['Week'] = df_inv['Week'].str.replace('W','').astype(int)
+    return df_inv
+
+
+def _robust_limits(df_inv: pd.DataFrame, name: str, rule: str, mad_k: float):
+    # (low, high) limits of the benchmark `name` under a percentile or MAD rule
+    if rule == 'percentile':
+        return df_inv[f'{name}_P10'], df_inv[f'{name}_P90']
+    spread = mad_k * MAD_SCALE * df_inv[f'{name}_MAD']
+    return df_inv[f'{name}_Median'] - spread, df_inv[f'{name}_Median'] + spread
+
+
+def add_tags(df_inv: pd.DataFrame, rule: str = TAG_RULE, mad_k: float = MAD_K) -> pd.DataFrame:
+    # === Step 6: Add Metric-Level Root Cause Tags ===
+    if rule == 'mean':
+        df_inv['Tag_Low_Payment']      = df_inv['Payment Amount*'] < (0.9  * df_inv['Benchmark_Payment_Amount'])
+        df_inv['Tag_Low_ZB_Collection']= df_inv['Zero Balance Collection Rate'] < (0.9  * df_inv['Benchmark_Zero_Balance_Collection_Rate'])
+        df_inv['Tag_High_Charge']      = df_inv['Charge Amount'] > (1.1  * df_inv['Benchmark_Charge_Amount'])
+        return df_inv
+    if rule not in TAG_RULES:
+        raise ValueError(f"Unknown tag rule {rule!r}; expected one of {TAG_RULES}")
+    low_payment, _ = _robust_limits(df_inv, 'Benchmark_Payment_Amount', rule, mad_k)
+    low_zb, _ = _robust_limits(df_inv, 'Benchmark_Zero_Balance_Collection_Rate', rule, mad_k)
+    _, high_charge = _robust_limits(df_inv, 'Benchmark_Charge_Amount', rule, mad_k)
+    df_inv['Tag_Low_Payment']      = df_inv['Payment Amount*'] < low_payment
+    df_inv['Tag_Low_ZB_Collection']= df_inv['Zero Balance Collection Rate'] < low_zb
+    df_inv['Tag_High_Charge']      = df_inv['Charge Amount'] > high_charge
+    return df_inv
+
+
+def group_benchmarks(df_inv: pd.DataFrame, rule: str = TAG_RULE) -> pd.DataFrame:
+    # === Step 4: Compute Group-Level Benchmarks ===
+    benchmark_df = (
+        df_inv
+        .groupby(group_keys)
+        .agg(
+            Benchmark_Charge_Amount=('Charge Amount', 'mean'),
+            Benchmark_Payment_Amount=('Payment Amount*', 'mean'),
+            Benchmark_Zero_Balance_Collection_Rate=('Zero Balance Collection Rate', 'mean'),
+            Benchmark_Invoice_Count=('Invoice_Number', 'count')
+        )
+        .reset_index()
+    )
+    if rule == 'mean':
+        return benchmark_df
+    # Medians, percentiles and MADs from one sort of the invoices per metric
+    robust = group_stats(df_inv, group_keys, benchmark_robust)
+    return benchmark_df.merge(robust, on=group_keys, how='left')
+
+
+def tag_invoices(df_inv: pd.DataFrame, rule: str = TAG_RULE, mad_k: float = MAD_K) -> pd.DataFrame:
+    with span("Steps 1–2: Standardize Invoices", rows_in=len(df_inv)):
+        df_inv = standardize_invoices(df_inv)
+    with span("Step 4: Compute Group-Level Benchmarks", rows_in=len(df_inv)) as s:
+        benchmark_df = group_benchmarks(df_inv, rule)
+        s.rows_out = len(benchmark_df)
+
+    # === Step 5: Merge Benchmarks Back to Invoice Records ===
+    with span("Steps 5–6: Merge Benchmarks & Tag", rows_in=len(df_inv)) as s:
+        df_inv = add_tags(df_inv.merge(benchmark_df, on=group_keys, how='left'), rule, mad_k)
+        s.rows_out = len(df_inv)
+    return df_inv
+
+
+def _widen(dtypes: dict, chunk: pd.DataFrame):
+    """Fold `chunk`'s column dtypes into `dtypes`, widening where batches disagree."""
+    for col, dtype in chunk.dtypes.items():
+        prev = dtypes.get(col, dtype)
+        if prev == dtype:
+            dtypes[col] = dtype
+        elif prev.kind in "biuf" and dtype.kind in "biuf":
+            dtypes[col] = np.result_type(prev, dtype)
+        else:
+            dtypes[col] = np.dtype(object)
+
+
+def tag_invoices_streaming(path: str = INVOICE_INPUT, output: str = OUTPUT_CSV,
+                           chunksize: int = 50_000, rule: str = TAG_RULE, mad_k: float = MAD_K,
+                           sketch_capacity: int = SKETCH_CAPACITY) -> str:
+    """
+    Steps 1–7 in two passes over `path`, holding one batch at a time.
+    Pass one accumulates per-group sums and counts for the benchmark means;
+    pass two re-reads the batches, tags them and appends them to `output`.
+    Benchmarks equal the in-memory means up to floating-point rounding.
+
+    Robust benchmarks (rule other than mean) need the metric values
+    themselves. With `sketch_capacity` pass one feeds a QuantileSketch of
+    about that many values per group, whose quantiles are approximate.
+    Otherwise it spills the key and metric columns to a temporary dataset
+    partitioned by Year/Week (see partition_store.py), and the exact
+    statistics are computed one week at a time, so memory is bounded by
+    the largest week rather than the file.
+    """
+    with tempfile.TemporaryDirectory(prefix="rev_perf_spill_") as spill_dir:
+        return _tag_streaming(path, output, chunksize, rule, mad_k, sketch_capacity,
+                              os.path.join(spill_dir, "robust_values.csv"))
+
+
+def _tag_streaming(path, output, chunksize, rule, mad_k, sketch_capacity, spill_path):
+    sums = counts = None
+    dtypes = {}
+    rows = 0
+    robust = rule != 'mean'
+    sketch = QuantileSketch(group_keys, benchmark_means.values(), sketch_capacity) \
+        if robust and sketch_capacity > 0 else None
+    spill = PartitionWriter(spill_path) if robust and sketch is None else None
+    with span("Steps 1–4: Streaming Benchmark Pass") as s:
+        for chunk in iter_invoices(path, chunksize):
+            rows += len(chunk)
+            chunk = standardize_invoices(chunk)
+            _widen(dtypes, chunk)
+            g = chunk.groupby(group_keys)
+            part_sums = g[list(benchmark_means.values())].sum()
+            part_counts = g[list(benchmark_means.values()) + ['Invoice_Number']].count()
+            sums = part_sums if sums is None else sums.add(part_sums, fill_value=0)
+            counts = part_counts if counts is None else counts.add(part_counts, fill_value=0)
+            if sketch is not None:
+                sketch.update(chunk)
+            elif spill is not None:
+                spill.write(chunk[group_keys + list(benchmark_means.values())])
+        s.rows_in = rows
+        if spill is not None:
+            spill.close()
+    if sums is None:
+        raise ValueError(f"No invoice rows in {path}")
+
+    # === Step 4: Compute Group-Level Benchmarks ===
+    benchmark_df = pd.DataFrame(index=sums.index)
+    for name, metric in benchmark_means.items():
+        benchmark_df[name] = (sums[metric] / counts[metric]).where(counts[metric] > 0)
+    benchmark_df['Benchmark_Invoice_Count'] = counts['Invoice_Number'].astype(int)
+    benchmark_df = benchmark_df.reset_index()
+    if robust:
+        if sketch is not None:
+            stats = sketch.stats(benchmark_robust)
+        else:
+            # Groups never span weeks, so each week's statistics are exact
+            stats = pd.concat([
+                group_stats(read_dataset(spill_path, filters={"Year": p["Year"], "Week": p["Week"]}),
+                            group_keys, benchmark_robust)
+                for p in partitions(spill_path)
+            ], ignore_index=True)
+        benchmark_df = benchmark_df.merge(stats, on=group_keys, how='left')
+
+    # === Steps 5–7: Tag Each Batch & Append to the Drill Index ===
+    with span("Steps 5–7: Streaming Tag Pass", rows_in=rows) as s, FrameWriter(output) as writer:
+        for chunk in iter_invoices(path, chunksize):
+            chunk = standardize_invoices(chunk)
+            chunk = chunk.astype({c: t for c, t in dtypes.items() if chunk[c].dtype != t})
+            writer.write(add_tags(chunk.merge(benchmark_df, on=group_keys, how='left'), rule, mad_k))
+        s.rows_out = rows
+    return writer.out
+
+
+def run(chunksize: int = CHUNKSIZE, rule: str = TAG_RULE, mad_k: float = MAD_K,
+        sketch_capacity: int = SKETCH_CAPACITY, path: str = INVOICE_INPUT) -> str:
+    """Tag the invoices in `path` and write the drill index; returns the path written."""
+    if chunksize > 0:
+        return tag_invoices_streaming(path, OUTPUT_CSV, chunksize, rule, mad_k, sketch_capacity)
+    with span("Step 0: Load Invoice-Level Data") as s:
+        df_inv = load_invoices(path)
+        s.rows_out = len(df_inv)
+    df_inv = tag_invoices(df_inv, rule, mad_k)
+
+    # === Step 7: Export Invoice-Level Drill Index ===
+    with span("Step 7: Export Invoice-Level Drill Index", rows_in=len(df_inv)):
+        return write_frame(df_inv, OUTPUT_CSV)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag invoices against their group benchmarks.")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE,
+                        help="stream the invoices in batches of this many rows")
+    parser.add_argument("--tag-rule", default=TAG_RULE, choices=TAG_RULES,
+                        help="benchmark invoices are tagged against (default: mean)")
+    parser.add_argument("--mad-k", type=float, default=MAD_K,
+                        help="scaled MADs from the median before the mad rule tags an invoice")
+    parser.add_argument("--sketch-capacity", type=int, default=SKETCH_CAPACITY,
+                        help="approximate streaming quantiles with a sketch of about this many "
+                             "values per group (0: exact, spilling the values to disk by week)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    out = run(args.chunksize, args.tag_rule, args.mad_k, args.sketch_capacity)
+    print(f"Invoice-level index written to {out}")
+    for path in tracer.write(OUTPUT_CSV):
+        print(f"Trace written to {path}")
+
+
+if __name__ == "__main__":
+    main()
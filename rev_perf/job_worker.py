@@ -0,0 +1,392 @@
+# job_worker.py
+# Background worker for uploaded workbooks.
+#
+# An upload is a source report (the v2 Rev Perf Report layout): api/upload.js
+# keeps each one under its own name in data/uploads/. The worker polls that
+# directory and an inbox of queued requests. It waits until a workbook has
+# stopped changing for REV_PERF_JOB_DEBOUNCE seconds, so a burst of uploads
+# becomes one job. Workbooks without the report's grouping or metric columns
+# are recorded as rejected ("not a source workbook") when they are queued. The
+# rest are modeled with the v12w model (batch_runner.run_workbook) on a pool
+# of at most REV_PERF_JOB_WORKERS processes. A newer upload of the same
+# workbook cancels its queued or running job.
+#
+# The model output of each successful job is copied to REV_PERF_JOB_PUBLISH
+# (data/revenue-data.xlsx, the workbook scripts/excel-to-json.js turns into
+# the dashboard data), so the latest finished job is what the dashboard shows.
+#
+# Status and timing of every job go to a job table, <jobs dir>/jobs.json,
+# which api/health.js reports.
+#   python -m rev_perf.job_worker                      watch until stopped
+#   python -m rev_perf.job_worker --once               process what is there now, then exit
+#   python -m rev_perf.job_worker --submit BOOK.xlsx   queue a workbook for the running worker
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from multiprocessing import Pipe, Process
+
+from .batch_runner import INVOICE_CSV, is_source, run_workbook, workbook
+from .regression import SEGMENT_MODES
+from .source_cache import missing_source_columns
+
+UPLOAD_DIR = os.environ.get("REV_PERF_UPLOAD_DIR", os.path.join("data", "uploads"))
+JOBS_DIR = os.environ.get("REV_PERF_JOBS_DIR", ".rev_perf_jobs")
+# Jobs run at once; the rest wait in the queue
+JOB_WORKERS = int(os.environ.get("REV_PERF_JOB_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // 2)
+# Seconds a workbook must stay unchanged before its job is queued
+DEBOUNCE_SECONDS = float(os.environ.get("REV_PERF_JOB_DEBOUNCE", "2"))
+POLL_SECONDS = float(os.environ.get("REV_PERF_JOB_POLL", "0.5"))
+# Finished jobs kept in the table
+JOB_HISTORY = int(os.environ.get("REV_PERF_JOB_HISTORY", "200"))
+# Where each successful job's model output is copied ("" to keep outputs in the jobs dir only)
+PUBLISH_PATH = os.environ.get("REV_PERF_JOB_PUBLISH", os.path.join("data", "revenue-data.xlsx")) or None
+# Command run after each successful job, e.g. "node scripts/excel-to-json.js" to
+# refresh the dashboard JSON from the published workbook; it gets
+# REV_PERF_JOB_SOURCE, REV_PERF_JOB_OUTPUT and REV_PERF_JOB_PUBLISHED in its environment
+AFTER_COMMAND = os.environ.get("REV_PERF_JOB_AFTER") or None
+ACTIVE = ("queued", "running")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _signature(path: str) -> list:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+@dataclass
+class Job:
+    """One analysis of one version (size, mtime) of a workbook."""
+    id: int
+    name: str
+    source: str
+    signature: list
+    status: str = "queued"
+    submitted_at: str = field(default_factory=_now)
+    started_at: str = None
+    finished_at: str = None
+    wait_seconds: float = None
+    seconds: float = None
+    error: str = None
+    outputs: list = field(default_factory=list)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def check_source(path: str) -> str:
+    """Why the workbook at `path` cannot be modeled, or None."""
+    try:
+        missing = missing_source_columns(path)
+    except Exception as e:  # not a readable workbook at all
+        return f"not a source workbook: {type(e).__name__}: {e}"
+    if missing:
+        return f"not a source workbook: missing columns {missing}"
+    return None
+
+
+def _publish(outputs: list, publish: str) -> str:
+    # Atomically replace `publish` with the job's workbook output
+    books = [p for p in outputs if p.endswith(".xlsx")]
+    if not books:
+        raise ValueError(f"No .xlsx output to publish to {publish} (add xlsx to --export-formats)")
+    os.makedirs(os.path.dirname(os.path.abspath(publish)), exist_ok=True)
+    tmp = f"{publish}.{os.getpid()}.tmp"
+    shutil.copyfile(books[0], tmp)
+    os.replace(tmp, publish)
+    return publish
+
+
+def _run_job(conn, source: str, invoices: str, out_dir: str, formats, segments: str, publish: str,
+             after: str):
+    # Runs in a worker process; sends back the run_workbook() result
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    result = run_workbook(workbook(source, invoices), out_dir, formats, segments)
+    result.pop("frame", None)
+    published = ""
+    if result["status"] == "ok" and publish:
+        try:
+            published = _publish(result["outputs"], publish)
+            result["outputs"].append(published)
+        except (OSError, ValueError) as e:
+            result["status"], result["error"] = "failed", f"{type(e).__name__}: {e}"
+    if result["status"] == "ok" and after:
+        env = {**os.environ, "REV_PERF_JOB_SOURCE": source,
+               "REV_PERF_JOB_OUTPUT": result["outputs"][0] if result["outputs"] else "",
+               "REV_PERF_JOB_PUBLISHED": published}
+        proc = subprocess.run(shlex.split(after), env=env, capture_output=True, text=True)
+        if proc.returncode:
+            result["status"] = "failed"
+            result["error"] = f"{after!r} exited with {proc.returncode}: {proc.stderr.strip()[-500:]}"
+    conn.send(result)
+    conn.close()
+
+
+def submit(source: str, jobs_dir: str = JOBS_DIR) -> str:
+    """Queue `source` for the worker watching `jobs_dir`; returns the request file."""
+    inbox = os.path.join(jobs_dir, "inbox")
+    os.makedirs(inbox, exist_ok=True)
+    path = os.path.join(inbox, f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.json")
+    with open(path + ".tmp", "w") as fh:
+        json.dump({"source": os.path.abspath(source)}, fh)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class JobWorker:
+    """
+    Debounced upload watcher and bounded job queue. Jobs run in their own
+    processes so that a superseded one can be stopped. Jobs for the same
+    workbook never run at the same time.
+    """
+
+    def __init__(self, upload_dir: str = UPLOAD_DIR, jobs_dir: str = JOBS_DIR, workers: int = JOB_WORKERS,
+                 debounce: float = DEBOUNCE_SECONDS, invoices: str = INVOICE_CSV, formats=None,
+                 segments: str = None, publish: str = PUBLISH_PATH, after: str = AFTER_COMMAND):
+        self.upload_dir, self.jobs_dir = upload_dir, jobs_dir
+        self.workers, self.debounce = max(1, workers), debounce
+        self.invoices, self.formats, self.segments = invoices, formats, segments
+        self.publish, self.after = publish, after
+        self.out_dir = os.path.join(jobs_dir, "output")
+        os.makedirs(upload_dir, exist_ok=True)
+        self.inbox = os.path.join(jobs_dir, "inbox")
+        self.table_path = os.path.join(jobs_dir, "jobs.json")
+        self.jobs = self._load_table()
+        self._pending, self._running = [], {}
+        self._seen = {}  # path -> (signature, first seen with it)
+        self._latest = {}  # workbook name -> signature of its newest job
+        self._clock = {}  # job id -> monotonic submit / start times
+        for job in self.jobs:
+            if job.status in ACTIVE:
+                job.status, job.error, job.finished_at = "cancelled", "worker restarted", _now()
+            if job.status != "cancelled":
+                self._latest[job.name] = job.signature
+        self._save_table()
+
+    # === Job table ===
+    def _load_table(self) -> list:
+        try:
+            with open(self.table_path) as fh:
+                return [Job(**j) for j in json.load(fh)["jobs"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+    def _save_table(self):
+        active = [j for j in self.jobs if j.status in ACTIVE]
+        finished = [j for j in self.jobs if j.status not in ACTIVE][-JOB_HISTORY:]
+        self.jobs = sorted(active + finished, key=lambda j: j.id)
+        table = {"updated_at": _now(), "pid": os.getpid(), "workers": self.workers,
+                 "upload_dir": os.path.abspath(self.upload_dir), "jobs": [asdict(j) for j in self.jobs]}
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        tmp = f"{self.table_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(table, fh, indent=1)
+        os.replace(tmp, self.table_path)
+
+    # === Queue ===
+    def submit(self, source: str, signature: list = None) -> Job:
+        """
+        Queue a job for `source`, cancelling any queued or running job of the
+        same workbook. A workbook that is not a source report is recorded as
+        rejected instead of queued.
+        """
+        name = os.path.splitext(os.path.basename(source))[0]
+        job = Job(max((j.id for j in self.jobs), default=0) + 1, name, source,
+                  signature or _signature(source))
+        error = check_source(source)
+        for old in self._pending:
+            if old.name == name:
+                self._cancel(old, f"superseded by job {job.id}")
+        self._pending = [j for j in self._pending if j.name != name]
+        for old_id, (process, conn, old) in list(self._running.items()):
+            if old.name == name:
+                process.terminate()
+                process.join()
+                conn.close()
+                del self._running[old_id]
+                self._cancel(old, f"superseded by job {job.id}")
+        self.jobs.append(job)
+        self._latest[name] = job.signature
+        if error:
+            job.status, job.error, job.finished_at = "rejected", error, _now()
+        else:
+            self._pending.append(job)
+            self._clock[job.id] = [time.monotonic(), None]
+        self._save_table()
+        return job
+
+    def _cancel(self, job: Job, reason: str):
+        job.status, job.error, job.finished_at = "cancelled", reason, _now()
+        self._clock.pop(job.id, None)
+
+    def _start(self):
+        while self._pending and len(self._running) < self.workers:
+            job = self._pending.pop(0)
+            if not os.path.isfile(job.source):
+                self._cancel(job, "source removed")
+                continue
+            parent, child = Pipe(duplex=False)
+            process = Process(target=_run_job, daemon=True,
+                              args=(child, job.source, self.invoices, self.out_dir, self.formats,
+                                    self.segments, self.publish, self.after))
+            process.start()
+            child.close()
+            started = time.monotonic()
+            job.status, job.started_at = "running", _now()
+            job.wait_seconds = round(started - self._clock[job.id][0], 3)
+            self._clock[job.id][1] = started
+            self._running[job.id] = (process, parent, job)
+            self._save_table()
+
+    def _reap(self):
+        for job_id, (process, conn, job) in list(self._running.items()):
+            result = None
+            if conn.poll():
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    pass
+            elif process.is_alive():
+                continue
+            process.join()
+            conn.close()
+            del self._running[job_id]
+            job.finished_at = _now()
+            job.seconds = round(time.monotonic() - self._clock.pop(job_id)[1], 3)
+            if result is None:
+                job.status, job.error = "failed", f"worker process exited with code {process.exitcode}"
+            else:
+                job.status = "done" if result["status"] == "ok" else "failed"
+                job.error, job.outputs = result["error"], result["outputs"]
+            self._save_table()
+
+    # === Watching ===
+    def scan(self, settled_after: float = None):
+        """Queue workbooks in the upload directory that changed and then stayed unchanged."""
+        settled_after = self.debounce if settled_after is None else settled_after
+        now = time.monotonic()
+        current = set()
+        for entry in os.scandir(self.upload_dir):
+            if not entry.is_file() or not is_source(entry.name):
+                continue
+            try:
+                signature = _signature(entry.path)
+            except OSError:
+                continue  # replaced or removed while listing
+            current.add(entry.path)
+            seen = self._seen.get(entry.path)
+            if seen is None or seen[0] != signature:
+                self._seen[entry.path] = seen = (signature, now)
+            name = os.path.splitext(entry.name)[0]
+            if now - seen[1] >= settled_after and self._latest.get(name) != signature:
+                self.submit(entry.path, signature)
+        self._seen = {p: s for p, s in self._seen.items() if p in current}
+
+    def read_inbox(self):
+        """Queue the workbooks requested with submit()."""
+        if not os.path.isdir(self.inbox):
+            return
+        for f in sorted(os.listdir(self.inbox)):
+            if not f.endswith(".json"):
+                continue
+            path = os.path.join(self.inbox, f)
+            try:
+                with open(path) as fh:
+                    source = json.load(fh)["source"]
+                if os.path.isfile(source):
+                    self.submit(source)
+            except (OSError, ValueError, KeyError):
+                pass
+            os.remove(path)
+
+    def poll(self, settled_after: float = None):
+        self._reap()
+        self.read_inbox()
+        self.scan(settled_after)
+        self._start()
+
+    def idle(self) -> bool:
+        return not self._pending and not self._running
+
+    def run(self, once: bool = False, interval: float = POLL_SECONDS):
+        """
+        Poll until stopped (SIGINT/SIGTERM). With `once`, queue what is
+        there without waiting for the debounce, and return when it is done.
+        """
+        signal.signal(signal.SIGTERM, _interrupt)
+        # A single pass queues every changed workbook at once and nothing later
+        first, later = (0, float("inf")) if once else (None, None)
+        try:
+            self.poll(first)
+            while not (once and self.idle()):
+                time.sleep(interval)
+                self.poll(later)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        for job_id, (process, conn, job) in list(self._running.items()):
+            process.terminate()
+            process.join()
+            conn.close()
+            self._cancel(job, "worker stopped")
+        for job in self._pending:
+            self._cancel(job, "worker stopped")
+        self._running, self._pending = {}, []
+        self._save_table()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the weekly model for uploaded workbooks.")
+    parser.add_argument("--upload-dir", default=UPLOAD_DIR)
+    parser.add_argument("--jobs-dir", default=JOBS_DIR, help="job table, inbox and outputs")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="jobs run at once")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS,
+                        help="seconds a workbook must stay unchanged before it is analyzed")
+    parser.add_argument("--invoices", default=INVOICE_CSV,
+                        help="invoice drill index for workbooks without their own")
+    parser.add_argument("--export-formats", default=None, help="e.g. xlsx,csv.gz (see exporter.py)")
+    parser.add_argument("--segments", default=os.environ.get("REV_PERF_SEGMENTS") or None,
+                        choices=sorted(SEGMENT_MODES))
+    parser.add_argument("--publish", default=PUBLISH_PATH, metavar="XLSX",
+                        help="copy each successful job's model output here (\"\" to disable)")
+    parser.add_argument("--after", default=AFTER_COMMAND, help="command run after each successful job")
+    parser.add_argument("--once", action="store_true", help="process the current uploads and exit")
+    parser.add_argument("--submit", nargs="+", metavar="WORKBOOK",
+                        help="queue workbooks for the running worker and exit")
+    args = parser.parse_args()
+
+    if args.submit:
+        for source in args.submit:
+            if not os.path.isfile(source):
+                raise FileNotFoundError(f"Error: File not found: {source}")
+            print(f"Queued {source} ({submit(source, args.jobs_dir)})")
+        return
+
+    worker = JobWorker(args.upload_dir, args.jobs_dir, args.workers, args.debounce, args.invoices,
+                       args.export_formats.split(",") if args.export_formats else None,
+                       args.segments, args.publish or None, args.after)
+    print(f"Watching {args.upload_dir} with {worker.workers} worker(s); job table in {worker.table_path}")
+    worker.run(once=args.once)
+    counts = {}
+    for job in worker.jobs:
+        counts[job.status] = counts.get(job.status, 0) + 1
+    print(", ".join(f"{n} {s}" for s, n in sorted(counts.items())) or "No jobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import argparse, os
+
+from . import interactive_benchmark_code_v2 as benchmark
+from . import final_rev_perf_weekly_model_generator_v12v_updated as summary
+from . import merge_invoice_summary_alignment as alignment
+from .pipeline_runner import PipelineRunner, Stage, code_files
+from .source_cache import load_source
+from .step_trace import add_arguments, configure_from_args, tracer
+from .weekly_model import (
+    QUERY_FILES, build_weekly, export_frame, invoice_cols, prepare_source, query_frames, query_path
+)
+
+SOURCE_FILE = "v2 Rev Perf Report with Second Group Layer.xlsx"
+MODEL_OUTPUT = SOURCE_FILE.replace(".xlsx", "_LR_Final_NoPayer.xlsx")
+# The query service's files, when REV_PERF_QUERY_FILES=1 asks for them
+QUERY_OUTPUTS = [query_path(MODEL_OUTPUT, name) for name in ("keyed", "narratives")] if QUERY_FILES else []
+
+
+def _code(*modules):
+    # The stage functions (this file), the modules the stage calls and the
+    # runner that reads and writes its frames, with everything they import
+    return sorted({os.path.abspath(__file__), *code_files(PipelineRunner.__module__, *modules)})
+
+
+# Each stage reads its inputs from the previous stages' frames when they ran
+# in this process, and from disk otherwise; outputs are still written to disk
+# (as binary intermediates, see frame_store.py).
+def run_benchmark(frames):
+    df_inv = frames.get(benchmark.INVOICE_INPUT, benchmark.load_invoices)
+    return {benchmark.OUTPUT_CSV: benchmark.tag_invoices(df_inv)}
+
+
+def run_weekly_summary(frames):
+    df = frames.get(SOURCE_FILE, load_source)
+    return {summary.OUTPUT_CSV: summary.weekly_summary(df)}
+
+
+def run_merge(frames):
+    summaries = frames.get(alignment.SUMMARY_CSV, columns=alignment.keys + ['Payment Amount*'])
+    merged = alignment.merge_alignment(frames.get(alignment.INVOICE_CSV), summaries)
+    return {alignment.OUTPUT_CSV: merged}
+
+
+def run_model(frames):
+    df = prepare_source(frames.get(SOURCE_FILE, load_source))
+    weekly = build_weekly(df, frames.get(alignment.OUTPUT_CSV, columns=invoice_cols))
+    outputs = {MODEL_OUTPUT: export_frame(weekly)}
+    if QUERY_FILES:
+        outputs.update(query_frames(weekly, MODEL_OUTPUT))
+    return outputs
+
+
+STAGES = [
+    Stage("benchmark", run_benchmark, [benchmark.INVOICE_INPUT], [benchmark.OUTPUT_CSV],
+          _code(benchmark)),
+    Stage("weekly_summary", run_weekly_summary, [SOURCE_FILE], [summary.OUTPUT_CSV],
+          _code(summary, load_source)),
+    Stage("merge", run_merge, [alignment.INVOICE_CSV, alignment.SUMMARY_CSV], [alignment.OUTPUT_CSV],
+          _code(alignment)),
+    Stage("model", run_model, [SOURCE_FILE, alignment.OUTPUT_CSV], [MODEL_OUTPUT, *QUERY_OUTPUTS],
+          _code(prepare_source, build_weekly, export_frame, load_source)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the revenue performance pipeline.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="concurrent stages (default: min(4, CPUs))")
+    parser.add_argument("--processes", action="store_true",
+                        help="run stages in worker processes instead of threads")
+    parser.add_argument("--force", action="store_true",
+                        help="re-run every stage even if its inputs are unchanged")
+    add_arguments(parser)
+    args = parser.parse_args()
+    # Stages run with --processes trace in their worker processes and are not collected
+    configure_from_args(args)
+
+    PipelineRunner(STAGES, workers=args.workers, processes=args.processes,
+                   force=args.force).run()
+    for path in tracer.write(MODEL_OUTPUT):
+        print(f"Trace written to {path}")
+    print("✅ Pipeline complete.")
+
+if __name__ == "__main__":
+    main()
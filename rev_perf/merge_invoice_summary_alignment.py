@@ -0,0 +1,64 @@
+# merge_invoice_summary_alignment.py
+
+import argparse
+
+import pandas as pd
+from .frame_store import read_frame, write_frame
+from .partition_store import is_partitioned
+from .step_trace import span, tracer
+
+INVOICE_CSV = "invoice_level_index.csv"
+SUMMARY_CSV = "weekly_summary_with_layer2.csv"
+OUTPUT_CSV = "invoice_with_weekly_summary_joined.csv"
+keys = ['Year','Week','Payer','Group_EM','Group_EM2']
+
+
+def merge_alignment(invoices: pd.DataFrame, summaries: pd.DataFrame) -> pd.DataFrame:
+    # Key dtypes differ when the frames are handed over in memory rather than via CSV
+    summaries = summaries.astype({k: invoices[k].dtype for k in ('Year', 'Week')})
+
+    # Merge on five keys
+    return invoices.merge(
+        summaries[keys + ['Payment Amount*']],
+        on=keys, how='left', suffixes=('','_Summary')
+    )
+
+
+def run(filters: dict = None) -> str:
+    """
+    Join and write the drill-aligned file; returns the path written. With
+    `filters` ({"Year": ..., "Week": ...}) only those weeks are re-merged and
+    replaced in the partitioned output (REV_PERF_PARTITIONED=1).
+    """
+    # Load inputs
+    with span("Load inputs") as s:
+        invoices  = read_frame(INVOICE_CSV, filters=filters)
+        summaries = read_frame(SUMMARY_CSV, columns=keys + ['Payment Amount*'], filters=filters)
+        s.rows_out = len(invoices)
+
+    with span("Merge on five keys", rows_in=len(invoices)) as s:
+        merged = merge_alignment(invoices, summaries)
+        s.rows_out = len(merged)
+
+    # Export final drill-aligned file
+    with span("Export", rows_in=len(merged)):
+        return write_frame(merged, OUTPUT_CSV, mode="upsert" if filters else "overwrite")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Join invoices to their weekly summary rows.")
+    parser.add_argument("--year", type=int, nargs="*", help="only re-merge these years")
+    parser.add_argument("--week", type=int, nargs="*", help="only re-merge these weeks")
+    args = parser.parse_args()
+    filters = {k: v for k, v in (("Year", args.year), ("Week", args.week)) if v}
+    if filters and not is_partitioned(OUTPUT_CSV):
+        parser.error("--year/--week need the partitioned output (REV_PERF_PARTITIONED=1)")
+
+    out = run(filters)
+    print(f"Merged invoice-to-summary output written to {out}")
+    for path in tracer.write(OUTPUT_CSV):
+        print(f"Trace written to {path}")
+
+
+if __name__ == "__main__":
+    main()
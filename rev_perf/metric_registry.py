@@ -0,0 +1,123 @@
+# metric_registry.py
+
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+from .group_keys import GROUP_KEYS, GroupKeys
+
+# === Embedded Metric Rules ===
+increase_good = {
+    "Visit Count": True,
+    "Avg. Charge E/M Weight": True,
+    "Charge Amount": True,
+    "Charge Billed Balance": False,
+    "Zero Balance - Collection * Charges": False,
+    "Payment per Visit": True,
+    "NRV Zero Balance*": True,
+    "Zero Balance Collection Rate": True,
+    "Collection Rate*": True,
+    "Labs per Visit": True,
+    "Payment Amount*": True,
+    "Avg. Payment per Visit By Payor": True,
+    "Avg. Payments By Payor": True,
+    "NRV Gap ($)": False,
+    "NRV Gap (%)": False,
+    "NRV Gap Sum ($)": True,
+    "% of Remaining Charges": False,
+    "% of Visits w Radiology": True,
+    "Denial %": False,
+    "Procedure per Visit": True
+}
+feats = list(increase_good)
+sum_override = {"Charge Billed Balance", "Zero Balance - Collection * Charges"}
+
+# === Metric Domains ===
+operational_metrics = {
+    "Visit Count", "Labs per Visit", "Avg. Charge E/M Weight", "Charge Amount",
+    "Payment per Visit", "% of Visits w Radiology", "Procedure per Visit"
+}
+revenue_cycle_metrics = {
+    "Charge Billed Balance", "Zero Balance - Collection * Charges", "NRV Zero Balance*",
+    "Zero Balance Collection Rate", "Collection Rate*", "Payment Amount*", "Denial %",
+    "NRV Gap ($)", "NRV Gap (%)", "% of Remaining Charges", "NRV Gap Sum ($)"
+}
+
+# Recomputed from the aggregated columns, never aggregated from source rows
+derived_metrics = {"% of Remaining Charges"}
+zb_metrics = ["Zero Balance Collection Rate", "Collection Rate*"]
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    name: str
+    increase_good: bool
+    domain: Optional[str]
+    weekly_agg: Optional[str]
+    group_agg: Optional[str]
+
+
+def _spec(m: str) -> MetricSpec:
+    summed = m.endswith("Count") or m.endswith("Amount") or m in sum_override
+    domain = ("operational" if m in operational_metrics
+              else "revenue_cycle" if m in revenue_cycle_metrics else None)
+    if m in derived_metrics:
+        return MetricSpec(m, increase_good[m], domain, None, None)
+    # The weekly summary totals payments; the group diagnostics average them
+    return MetricSpec(
+        m, increase_good[m], domain,
+        "sum" if summed or m == "Payment Amount*" else "mean",
+        "sum" if summed else "mean",
+    )
+
+
+METRICS = {m: _spec(m) for m in feats}
+
+# Stage name -> (spec attribute holding its rule, default metric list)
+STAGES = {
+    "weekly": ("weekly_agg", None),
+    "group": ("group_agg", None),
+    "zb": ("group_agg", zb_metrics),
+}
+
+
+def stage_aggs(stage: str, columns, metrics=None) -> dict:
+    """Metric -> "sum"/"mean" for `stage`, limited to metrics present in `columns`."""
+    attr, default = STAGES[stage]
+    metrics = metrics if metrics is not None else default if default is not None else feats
+    return {
+        m: getattr(METRICS[m], attr)
+        for m in metrics
+        if m in columns and getattr(METRICS[m], attr) is not None
+    }
+
+
+def aggregate(df: pd.DataFrame, stages: dict, keys=GROUP_KEYS,
+              group_keys: GroupKeys = None) -> dict:
+    """
+    Aggregate every requested stage in a single grouping of `df`. `stages`
+    maps a stage name to its metric list (None for the stage default); the
+    result maps each stage name to a flat frame of `keys` plus its metrics,
+    with row i holding group id i of `group_keys` (computed when not given).
+    """
+    plans = {name: stage_aggs(name, df.columns, metrics) for name, metrics in stages.items()}
+    sum_cols = list(dict.fromkeys(m for p in plans.values() for m, how in p.items() if how == "sum"))
+    mean_cols = list(dict.fromkeys(m for p in plans.values() for m, how in p.items() if how == "mean"))
+
+    group_keys = group_keys or GroupKeys(df, keys)
+    ids = group_keys.ids
+    if (ids < 0).any():
+        df, ids = df[ids >= 0], ids[ids >= 0]
+    g = df.groupby(ids)
+    results = {
+        "sum": g[sum_cols].sum() if sum_cols else None,
+        "mean": g[mean_cols].mean() if mean_cols else None,
+    }
+    return {
+        name: pd.concat([
+            group_keys.table,
+            pd.DataFrame({m: results[how][m].to_numpy() for m, how in plan.items()})
+        ], axis=1)
+        for name, plan in plans.items()
+    }
@@ -0,0 +1,222 @@
+# narrative_diagnostics.py
+
+import numpy as np
+import pandas as pd
+
+from .group_keys import align_rows
+
+# Metric whose direction flips when its historical average is negative
+NEGATIVE_AVG_METRIC = "Zero Balance - Collection * Charges"
+
+# A findings table holds one row per finding quoted in a narrative: the week,
+# the group, the narrative column it belongs to, the metric with its baseline
+# (avg), actual value, % change and direction, its position in the narrative
+# (rank) and, for classified findings (Step 13), the class label. Text is only
+# produced by render_narratives().
+FINDING_COLUMNS = ["Year", "Week", "Payer", "Group_EM", "Group_EM2", "narrative", "metric",
+                   "avg", "act", "pct", "increased", "rank", "label"]
+FINDING_CATEGORIES = ["Payer", "Group_EM", "Group_EM2", "narrative", "metric", "label"]
+
+
+def melt_findings(gw: pd.DataFrame, metrics, increase_good: dict,
+                  priority_payers: list, avg: pd.DataFrame = None):
+    """
+    Melt the group-week frame into one row per usable (group row, metric)
+    pair with delta, pct and direction. Baselines come from `avg` (one row
+    per row of `gw`, one column per metric) or else from `<metric>_Avg`
+    columns of `gw`. Returns `(findings, weeks)`; `findings["wk"]` indexes
+    rows of `weeks`.
+    """
+    if avg is None:
+        avg = gw[[c for c in gw.columns if c.endswith("_Avg")]].rename(columns=lambda c: c[:-len("_Avg")])
+    metrics = [m for m in increase_good
+               if m in metrics and m in gw.columns and m in avg.columns]
+    wk = gw.groupby(["Year", "Week"], sort=True).ngroup().to_numpy()
+    weeks = gw.groupby(["Year", "Week"], sort=True).size().index.to_frame(index=False)
+
+    act = gw[metrics].to_numpy(dtype=float)
+    avg = avg[metrics].to_numpy(dtype=float)
+    n, k = act.shape
+
+    # Payer priority and de-duplication prefix are only parsed per unique value
+    payer_codes, payers = pd.factorize(gw["Payer"])
+    group_codes, groups = pd.factorize(gw["Group_EM"])
+    prio_by_payer = np.array([
+        priority_payers.index(p.split("–")[0].strip().upper())
+        if p.split("–")[0].strip().upper() in priority_payers else len(priority_payers)
+        for p in payers
+    ], dtype=np.int64)
+    pair_codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([gw["Payer"], gw["Group_EM"]]))
+    prefix_codes = pd.factorize(pd.Index([f"{p} – {g}".lstrip() for p, g in pairs]))[0][pair_codes]
+
+    row = np.repeat(np.arange(n), k)
+    mi = np.tile(np.arange(k), n)
+    act, avg = act.ravel(), avg.ravel()
+    valid = ~np.isnan(act) & ~np.isnan(avg) & (avg != 0) & np.repeat(wk >= 0, k)
+    row, mi, act, avg = row[valid], mi[valid], act[valid], avg[valid]
+
+    delta = act - avg
+    up_good = np.array([increase_good[m] for m in metrics], dtype=bool)[mi]
+    good = ((delta > 0) & up_good) | ((delta < 0) & ~up_good)
+    if NEGATIVE_AVG_METRIC in metrics:
+        special = (mi == metrics.index(NEGATIVE_AVG_METRIC)) & (avg < 0)
+        good = np.where(special & (act == 0), True, np.where(special & (act > 0), False, good))
+
+    increased = delta > 0
+    findings = pd.DataFrame({
+        "wk": wk[row],
+        "pos": np.flatnonzero(valid),
+        "Payer": pd.Categorical.from_codes(payer_codes[row], payers),
+        "Group_EM": pd.Categorical.from_codes(group_codes[row], groups),
+        "Group_EM2": gw["Group_EM2"].to_numpy()[row],
+        "metric": pd.Categorical.from_codes(mi, metrics),
+        "increased": increased,
+        "good": good,
+        "avg": avg,
+        "act": act,
+        "pct": np.abs(delta / avg) * 100,
+        "prio": prio_by_payer[payer_codes[row]],
+        "key": (prefix_codes[row].astype(np.int64) * k + mi) * 2 + increased,
+    })
+    return findings, weeks
+
+
+def _rank_top(f: pd.DataFrame, limit: int = 6) -> pd.DataFrame:
+    # Keep the strongest finding per key (earliest on ties), then order by
+    # (payer priority, -pct, first appearance of the key) within each side.
+    f = f.sort_values(["wk", "good", "key", "pct", "pos"],
+                      ascending=[True, True, True, False, True], kind="mergesort")
+    first_pos = f.groupby(["wk", "good", "key"], sort=False)["pos"].transform("min")
+    f = f.assign(first_pos=first_pos).drop_duplicates(["wk", "good", "key"])
+    f = f.sort_values(["wk", "good", "prio", "pct", "first_pos"],
+                      ascending=[True, True, True, False, True], kind="mergesort")
+    rank = f.groupby(["wk", "good"], sort=False).cumcount().to_numpy()
+    if "limit" in f.columns:
+        limit = f["limit"].to_numpy()
+    return f.assign(rank=rank)[rank < limit].drop(columns=["first_pos", "limit"], errors="ignore")
+
+
+def render_text(f: pd.DataFrame) -> list:
+    """Render `"{Payer} – {Group_EM} {metric} increased from avg … to …"` per finding."""
+    return [
+        f"{p} – {g} {m} {'increased' if inc else 'decreased'} from avg {a:.2f} to {x:.2f}"
+        for p, g, m, inc, a, x in zip(f["Payer"], f["Group_EM"], f["metric"],
+                                      f["increased"], f["avg"], f["act"])
+    ]
+
+
+def join_segments(codes, texts, n: int, sep: str = "; ") -> list:
+    """Join `texts` (already ordered, grouped by sorted `codes`) into `n` slots."""
+    out = [""] * n
+    codes = np.asarray(codes)
+    if len(codes):
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)]
+        for s, e in zip(starts, ends):
+            out[codes[s]] = sep.join(texts[s:e])
+    return out
+
+
+def select_findings(findings: pd.DataFrame, metrics,
+                    enforce_visit: bool = False) -> pd.DataFrame:
+    """
+    Top-6 findings per (week, good/bad) side, in output order. With
+    `enforce_visit`, the largest Visit Count move of at least 5% leads and the
+    remaining five slots are ranked as usual.
+    """
+    f = findings[findings["metric"].isin(list(metrics))]
+    if not enforce_visit:
+        return _rank_top(f, 6)
+
+    cand = f[(f["metric"] == "Visit Count") & (f["pct"] >= 5)]
+    best = (cand.sort_values(["wk", "good", "pct", "pos"],
+                             ascending=[True, True, False, True], kind="mergesort")
+                .drop_duplicates(["wk", "good"]))
+    best = best.assign(text=render_text(best))
+
+    # Drop every entry whose text equals the leader's; only entries sharing
+    # the leader's key can match, so only those are rendered.
+    same_key = f.reset_index().merge(best[["wk", "good", "key", "text"]],
+                                     on=["wk", "good", "key"]).set_index("index")
+    dup = same_key.index[np.array(render_text(same_key), dtype=object)
+                         == same_key["text"].to_numpy()]
+    rest = f.drop(index=dup)
+
+    has_best = pd.MultiIndex.from_frame(rest[["wk", "good"]]).isin(
+        pd.MultiIndex.from_frame(best[["wk", "good"]]))
+    ranked = _rank_top(rest.assign(limit=np.where(has_best, 5, 6)))
+    out = pd.concat([best.drop(columns="text").assign(rank=-1), ranked])
+    return out.sort_values(["wk", "good", "rank"], kind="mergesort")
+
+
+def findings_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """`frame` as a findings table: FINDING_COLUMNS, with text columns stored as categories."""
+    out = frame.reindex(columns=FINDING_COLUMNS).reset_index(drop=True)
+    return out.astype({**{c: "category" for c in FINDING_CATEGORIES},
+                       "increased": bool, "rank": np.int16})
+
+
+def concat_findings(frames: list) -> pd.DataFrame:
+    """One findings table from several, with their categories merged."""
+    return findings_frame(pd.concat(
+        [findings_frame(f).astype({c: object for c in FINDING_CATEGORIES}) for f in frames],
+        ignore_index=True
+    ))
+
+
+def narrative_findings(findings: pd.DataFrame, weeks: pd.DataFrame, metrics,
+                       well_col: str, improve_col: str,
+                       enforce_visit: bool = False) -> pd.DataFrame:
+    """
+    The findings table behind the good (`well_col`) and bad (`improve_col`)
+    narratives of each week: the selected findings of melt_findings() output.
+    """
+    top = select_findings(findings, metrics, enforce_visit=enforce_visit)
+    good = top["good"].to_numpy()
+    out = weeks.iloc[top["wk"].to_numpy()].reset_index(drop=True)
+    for col in ("Payer", "Group_EM", "Group_EM2", "metric", "avg", "act", "pct", "increased"):
+        out[col] = top[col].to_numpy()
+    out["narrative"] = np.where(good, well_col, improve_col)
+    # `top` is in output order within each (week, side)
+    out["rank"] = top.groupby(["wk", "good"], sort=False).cumcount().to_numpy()
+    return findings_frame(out)
+
+
+def render_finding(f: pd.DataFrame) -> list:
+    """
+    The default text of each finding: render_text(), or
+    `"{Payer} – {Group_EM} – {Group_EM2} – {label}"` for classified ones.
+    """
+    labelled = f["label"].notna().to_numpy()
+    texts = np.empty(len(f), dtype=object)
+    texts[~labelled] = render_text(f[~labelled])
+    texts[labelled] = [f"{p} – {g} – {g2} – {label}" for p, g, g2, label in zip(
+        *(f.loc[labelled, c] for c in ("Payer", "Group_EM", "Group_EM2", "label")))]
+    return list(texts)
+
+
+def render_narratives(findings: pd.DataFrame, weeks: pd.DataFrame, columns,
+                      render=render_finding, sep: str = "; ") -> pd.DataFrame:
+    """
+    One row per row of `weeks` (Year, Week) with each narrative of `columns`:
+    the `render`ed text of its findings joined in rank order ("" for none).
+    """
+    out = weeks[["Year", "Week"]].reset_index(drop=True)
+    wk = align_rows(out, findings, ["Year", "Week"])
+    keep = (wk >= 0) & findings["narrative"].isin(list(columns)).to_numpy()
+    f, wk = findings[keep], wk[keep]
+    order = np.lexsort((f["rank"].to_numpy(), wk))
+    f, wk = f.iloc[order], wk[order]
+    texts = np.array(render(f), dtype=object)
+    for col in columns:
+        sel = (f["narrative"] == col).to_numpy()
+        out[col] = join_segments(wk[sel], texts[sel].tolist(), len(out), sep)
+    return out
+
+
+def summarize_findings(findings: pd.DataFrame, weeks: pd.DataFrame, metrics,
+                       well_col: str, improve_col: str,
+                       enforce_visit: bool = False) -> pd.DataFrame:
+    """One row per (Year, Week) with the `"; "`-joined good and bad narratives."""
+    top = narrative_findings(findings, weeks, metrics, well_col, improve_col, enforce_visit)
+    return render_narratives(top, weeks, [well_col, improve_col])
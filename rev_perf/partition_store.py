@@ -0,0 +1,274 @@
+# partition_store.py
+# Invoice-level outputs as a dataset partitioned by Year and Week
+#
+# Layout, in a directory named after the CSV it replaces:
+#   invoice_level_index/_manifest.json
+#   invoice_level_index/Year=2025/Week=01/part-<writer>-<n>.arrow
+#
+# The manifest lists every partition with its files, row count, a content
+# hash and the min/max of STATS_COLUMNS; readers open only the partitions
+# their Year/Week/Payer/... predicates can match.
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+PARTITION_KEYS = ["Year", "Week"]
+MANIFEST = "_manifest.json"
+MANIFEST_VERSION = 1
+# Min/max kept per partition; text keys are stored dictionary-encoded
+STATS_COLUMNS = ["Payer", "Group_EM", "Group_EM2"]
+# Intermediates written as datasets when REV_PERF_PARTITIONED=1 (see frame_store.py)
+PARTITIONED = os.environ.get("REV_PERF_PARTITIONED") == "1" and feather is not None
+PARTITIONED_OUTPUTS = {"invoice_level_index.csv", "invoice_with_weekly_summary_joined.csv"}
+WRITE_MODES = ("overwrite", "upsert", "append")
+
+
+def dataset_dir(path: str) -> str:
+    """The dataset directory for a CSV name (or the manifest itself)."""
+    if os.path.basename(path) == MANIFEST:
+        return os.path.dirname(path)
+    return os.path.splitext(path)[0]
+
+
+def manifest_path(path: str) -> str:
+    return os.path.join(dataset_dir(path), MANIFEST)
+
+
+def is_partitioned(path: str) -> bool:
+    """Whether `path` (by its CSV name) is written as a dataset."""
+    return PARTITIONED and os.path.basename(path) in PARTITIONED_OUTPUTS
+
+
+def load_manifest(path: str):
+    """The manifest of the dataset behind `path` (its CSV name or the manifest), or None."""
+    try:
+        with open(manifest_path(path)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _scalar(value):
+    # JSON-safe partition key / stat value
+    if isinstance(value, np.generic):
+        value = value.item()
+    return None if pd.isna(value) else value
+
+
+def _partition_dir(key) -> str:
+    year, week = key
+    return os.path.join(f"Year={year}", f"Week={int(week):02d}")
+
+
+def _content_hash(frame: pd.DataFrame) -> int:
+    # Order-insensitive, so a week split over several batches hashes the same
+    return int(pd.util.hash_pandas_object(frame, index=False).sum())
+
+
+def _stats(frame: pd.DataFrame) -> dict:
+    stats = {}
+    for c in STATS_COLUMNS:
+        if c in frame.columns and frame[c].notna().any():
+            values = frame[c].dropna().astype(str)
+            stats[c] = [values.min(), values.max()]
+    return stats
+
+
+def _merge_stats(a: dict, b: dict) -> dict:
+    out = dict(a)
+    for c, (lo, hi) in b.items():
+        out[c] = [min(lo, out[c][0]), max(hi, out[c][1])] if c in out else [lo, hi]
+    return out
+
+
+class PartitionWriter:
+    """
+    Write frames into the dataset behind `path` batch by batch; each batch
+    adds one file per Year/Week it holds. close() swaps in the new manifest:
+
+      overwrite  the dataset holds exactly what was written; partitions
+                 whose content is unchanged keep their existing files
+      upsert     written partitions replace stored ones, others are kept
+      append     written rows are added to the stored partitions
+
+    Files no longer listed are removed after the swap, so readers see either
+    the old or the new dataset.
+    """
+
+    def __init__(self, path: str, mode: str = "overwrite"):
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Unknown write mode {mode!r}; expected one of {WRITE_MODES}")
+        if feather is None:
+            raise ImportError("Partitioned datasets need pyarrow")
+        self.path, self.mode = path, mode
+        self.root = dataset_dir(path)
+        self.rows = 0
+        self._old = {(p["Year"], p["Week"]): p for p in (load_manifest(path) or {}).get("partitions", [])}
+        self._parts = {}
+        self._columns = None
+        self._token = f"{os.getpid()}-{time.time_ns()}"
+        self._files = 0
+
+    def _write_file(self, key, frame: pd.DataFrame) -> str:
+        rel = os.path.join(_partition_dir(key), f"part-{self._token}-{self._files}.arrow")
+        self._files += 1
+        out = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        cats = {c: "category" for c in STATS_COLUMNS
+                if c in frame.columns and not isinstance(frame[c].dtype, pd.CategoricalDtype)}
+        feather.write_feather(frame.astype(cats).reset_index(drop=True), out + ".tmp",
+                              compression="uncompressed")
+        os.replace(out + ".tmp", out)
+        return rel.replace(os.sep, "/")
+
+    def write(self, frame: pd.DataFrame, skip=()):
+        """Add `frame`'s rows; partitions in `skip` are recorded as unchanged and not written."""
+        missing = [k for k in PARTITION_KEYS if k not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing cols: {missing}")
+        if frame[PARTITION_KEYS].isna().any().any():
+            raise ValueError(f"Rows without {PARTITION_KEYS} cannot be partitioned")
+        self._columns = self._columns or list(frame.columns)
+        for key, part in frame.groupby(PARTITION_KEYS, sort=True):
+            key = tuple(_scalar(k) for k in key)
+            entry = self._parts.setdefault(key, {"Year": key[0], "Week": key[1], "files": [],
+                                                 "rows": 0, "hash": 0, "stats": {}})
+            if key not in skip:
+                entry["files"].append(self._write_file(key, part))
+            entry["rows"] += len(part)
+            entry["hash"] = (entry["hash"] + _content_hash(part)) % 2 ** 64
+            entry["stats"] = _merge_stats(entry["stats"], _stats(part))
+            self.rows += len(part)
+
+    def abort(self):
+        """Remove the files written so far; the stored dataset is left as it was."""
+        for entry in self._parts.values():
+            for f in entry["files"]:
+                if os.path.isfile(os.path.join(self.root, f)):
+                    os.remove(os.path.join(self.root, f))
+        self._parts = {}
+
+    def close(self) -> str:
+        """Swap in the new manifest; returns its path."""
+        parts = {}
+        for key, entry in self._parts.items():
+            old = self._old.get(key)
+            if self.mode == "append" and old is not None:
+                entry = {**entry, "files": old["files"] + entry["files"], "rows": old["rows"] + entry["rows"],
+                         "hash": (int(old["hash"]) + entry["hash"]) % 2 ** 64,
+                         "stats": _merge_stats(old["stats"], entry["stats"])}
+            elif old is not None and int(old["hash"]) == entry["hash"] and old["rows"] == entry["rows"]:
+                entry = {**entry, "files": old["files"]}  # unchanged: keep the stored files
+            parts[key] = {**entry, "hash": str(entry["hash"])}
+        if self.mode != "overwrite":
+            parts = {**{k: p for k, p in self._old.items() if k not in parts}, **parts}
+
+        manifest = {"version": MANIFEST_VERSION, "keys": PARTITION_KEYS,
+                    "columns": self._columns or [], "rows": sum(p["rows"] for p in parts.values()),
+                    "partitions": [parts[k] for k in sorted(parts)]}
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, f"{MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(manifest, fh, indent=1)
+        os.replace(tmp, os.path.join(self.root, MANIFEST))
+
+        # Remove files that are no longer listed (superseded or unchanged rewrites)
+        listed = {f for p in parts.values() for f in p["files"]}
+        for p in list(self._old.values()) + list(self._parts.values()):
+            for f in p["files"]:
+                if f not in listed and os.path.isfile(os.path.join(self.root, f)):
+                    os.remove(os.path.join(self.root, f))
+        return os.path.join(self.root, MANIFEST)
+
+
+def write_dataset(frame: pd.DataFrame, path: str, mode: str = "overwrite") -> str:
+    """
+    Write `frame` as the dataset behind `path`; returns the manifest path.
+    In overwrite mode partitions whose content matches the manifest are not
+    rewritten, so a full run that only adds weeks writes only the new weeks.
+    """
+    writer = PartitionWriter(path, mode)
+    skip = set()
+    if mode == "overwrite" and writer._old:
+        for key, part in frame.groupby(PARTITION_KEYS, sort=True):
+            key = tuple(_scalar(k) for k in key)
+            old = writer._old.get(key)
+            if old is not None and old["rows"] == len(part) and int(old["hash"]) == _content_hash(part):
+                skip.add(key)
+    try:
+        writer.write(frame, skip)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+def _matches(value, wanted: list) -> bool:
+    return any(str(value) == str(w) for w in wanted)
+
+
+def _may_match(partition: dict, filters: dict) -> bool:
+    for col, wanted in filters.items():
+        if col in PARTITION_KEYS:
+            if not _matches(partition[col], wanted):
+                return False
+        elif col in partition["stats"]:
+            lo, hi = partition["stats"][col]
+            if not any(lo <= str(w) <= hi for w in wanted):
+                return False
+    return True
+
+
+def normalize_filters(filters: dict) -> dict:
+    """{column: [values]} from {column: value or values}."""
+    return {c: list(np.atleast_1d(v)) for c, v in (filters or {}).items()}
+
+
+def filter_rows(frame: pd.DataFrame, filters: dict) -> pd.DataFrame:
+    """Rows of `frame` whose columns equal one of the wanted values (compared as text)."""
+    if not filters:
+        return frame
+    keep = np.ones(len(frame), dtype=bool)
+    for col, wanted in normalize_filters(filters).items():
+        if col not in frame.columns:
+            raise ValueError(f"Cannot filter by missing column {col!r}")
+        keep &= frame[col].astype(str).isin([str(w) for w in wanted]).to_numpy()
+    return frame[keep].reset_index(drop=True)
+
+
+def partitions(path: str, filters: dict = None) -> list:
+    """Manifest entries of the partitions `filters` can match."""
+    manifest = load_manifest(path) or {"partitions": []}
+    filters = normalize_filters(filters)
+    return [p for p in manifest["partitions"] if _may_match(p, filters)]
+
+
+def read_dataset(path: str, columns: list = None, filters: dict = None) -> pd.DataFrame:
+    """
+    Rows of the dataset behind `path` matching `filters` ({column: value or
+    values}); only partitions the predicates can match are opened, and only
+    `columns` (plus filtered ones) are materialized.
+    """
+    manifest = load_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"Error: File not found: {manifest_path(path)}")
+    filters = normalize_filters(filters)
+    wanted = None if columns is None else list(dict.fromkeys(list(columns) + list(filters)))
+    frames = [
+        feather.read_table(os.path.join(dataset_dir(path), f), columns=wanted, memory_map=True).to_pandas()
+        for p in partitions(path, filters) for f in p["files"]
+    ]
+    if not frames:
+        return pd.DataFrame(columns=columns if columns is not None else manifest["columns"])
+    frame = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    frame = filter_rows(frame, filters)
+    return frame[list(columns)] if columns is not None else frame
@@ -0,0 +1,219 @@
+# pipeline_runner.py
+
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+import pandas as pd
+
+from .frame_store import exists, read_frame, resolve, write_frame
+from .source_cache import fingerprint
+from .step_trace import span
+
+STATE_FILE = ".rev_perf_pipeline.json"
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline step. `func(frames)` returns `{output_path: DataFrame}` for
+    every path in `outputs`; `inputs` are the files it reads. Edits to any
+    file in `code` also invalidate the stage's cached result.
+    """
+    name: str
+    func: Callable
+    inputs: list
+    outputs: list
+    code: list = field(default_factory=list)
+
+
+def code_files(*modules) -> list:
+    """
+    Source files of `modules` (modules, module names, or functions for their
+    modules) and of every module they import relatively, directly or through
+    other package modules. Imports inside functions count too, so lazily
+    imported code is fingerprinted with the stage that can run it.
+    """
+    files = {}
+    todo = [m.__name__ if isinstance(m, types.ModuleType) else m if isinstance(m, str) else m.__module__
+            for m in modules]
+    while todo:
+        name = todo.pop()
+        if name in files:
+            continue
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+            raise ImportError(f"No source file for module {name!r}")
+        files[name] = spec.origin
+        package = name if spec.submodule_search_locations is not None else name.rpartition(".")[0]
+        with open(spec.origin) as fh:
+            tree = ast.parse(fh.read(), spec.origin)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.level:
+                base = importlib.util.resolve_name("." * node.level + (node.module or ""), package)
+                # `from .module import name` vs `from . import module`
+                todo.extend([base] if node.module else [f"{base}.{a.name}" for a in node.names])
+    return sorted(files.values())
+
+
+class Frames:
+    """Stage inputs: frames produced earlier in this run, otherwise read from disk."""
+
+    def __init__(self, memory: dict):
+        self._memory = memory
+
+    def get(self, path: str, reader: Callable = None, columns: list = None) -> pd.DataFrame:
+        if path in self._memory:
+            frame = self._memory[path]
+            return frame[columns] if columns else frame
+        if not exists(path):
+            raise FileNotFoundError(f"Error: File not found: {path}")
+        if reader is not None:
+            return reader(path)
+        return read_frame(path, columns=columns)
+
+
+def _run_stage(stage: Stage, memory: dict):
+    start = time.perf_counter()
+    with span(f"Stage {stage.name}") as s:
+        outputs = stage.func(Frames(memory))
+        missing = [p for p in stage.outputs if p not in outputs]
+        if missing:
+            raise ValueError(f"Stage {stage.name} did not produce: {missing}")
+        for path, frame in outputs.items():
+            write_frame(frame, path)
+        s.rows_out = sum(len(frame) for frame in outputs.values())
+    return outputs, time.perf_counter() - start
+
+
+class PipelineRunner:
+    """
+    Runs stages as a dependency graph inside one interpreter.
+
+    A stage depends on the stages producing its inputs. It is skipped when
+    the fingerprint of its input files and code matches the last successful
+    run and its outputs still exist. Ready stages run concurrently on a
+    thread pool (or a process pool with `processes=True`), and frames
+    produced during the run are handed to downstream stages in memory.
+    """
+
+    def __init__(self, stages, workers: int = None, processes: bool = False,
+                 force: bool = False, state_file: str = STATE_FILE):
+        self.stages = {s.name: s for s in stages}
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.processes = processes
+        self.force = force
+        self.state_file = state_file
+        producers = {out: s.name for s in stages for out in s.outputs}
+        self.deps = {
+            s.name: {producers[i] for i in s.inputs if i in producers and producers[i] != s.name}
+            for s in stages
+        }
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        seen, visiting = set(), set()
+
+        def visit(name):
+            if name in visiting:
+                raise ValueError(f"Pipeline has a dependency cycle at stage {name}")
+            if name not in seen:
+                visiting.add(name)
+                for dep in self.deps[name]:
+                    visit(dep)
+                visiting.discard(name)
+                seen.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_file) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {"stages": {}, "files": {}}
+
+    def _save_state(self, state: dict):
+        tmp = f"{self.state_file}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(state, fh, indent=1)
+        os.replace(tmp, self.state_file)
+
+    def _fingerprint(self, stage: Stage, files: dict) -> str:
+        h = hashlib.sha256(stage.name.encode())
+        for path in list(stage.inputs) + list(stage.code):
+            path = resolve(path)
+            if not os.path.isfile(path):
+                h.update(f"{path}:missing".encode())
+                continue
+            digest = fingerprint(path, files)
+            st = os.stat(path)
+            files[os.path.abspath(path)] = {
+                "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest
+            }
+            h.update(f"{path}:{digest}".encode())
+        return h.hexdigest()
+
+    def run(self) -> list:
+        """Run the graph; returns one `{stage, status, seconds}` record per stage."""
+        state = self._load_state()
+        pending = list(self.stages)
+        done, memory, report, running = set(), {}, [], {}
+        pool_cls = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+
+        with pool_cls(max_workers=self.workers) as pool:
+            while pending or running:
+                for name in [n for n in pending if self.deps[n] <= done]:
+                    stage = self.stages[name]
+                    fp = self._fingerprint(stage, state["files"])
+                    pending.remove(name)
+                    if (not self.force and state["stages"].get(name) == fp
+                            and all(exists(p) for p in stage.outputs)):
+                        done.add(name)
+                        report.append({"stage": name, "status": "skipped", "seconds": 0.0})
+                        print(f"⏭ {name}: inputs unchanged, skipped")
+                        continue
+                    print(f"▶ Running {name}...")
+                    inputs = {p: memory[p] for p in stage.inputs if p in memory}
+                    running[pool.submit(_run_stage, stage, inputs)] = name
+                if not running:
+                    if pending:
+                        continue  # skipped stages unblocked more work
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = running.pop(fut)
+                    try:
+                        outputs, seconds = fut.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        report.append({"stage": name, "status": "failed", "seconds": None})
+                        self._save_state(state)
+                        print_report(report)
+                        raise
+                    memory.update(outputs)
+                    done.add(name)
+                    # Fingerprint against the outputs of this run's upstream stages
+                    state["stages"][name] = self._fingerprint(self.stages[name], state["files"])
+                    report.append({"stage": name, "status": "ran", "seconds": seconds})
+                    self._save_state(state)
+
+        print_report(report)
+        return report
+
+
+def print_report(report: list):
+    print(f"{'Stage':<22}{'Status':<10}{'Wall (s)':>10}")
+    for row in report:
+        seconds = "-" if row["seconds"] is None else f"{row['seconds']:.2f}"
+        print(f"{row['stage']:<22}{row['status']:<10}{seconds:>10}")
@@ -0,0 +1,308 @@
+# query_service.py
+# Local async HTTP service answering filtered, paginated queries over the
+# weekly results and the invoice drill-through index
+#
+#   GET /summary     weekly summary rows (weekly_summary_with_layer2.csv)
+#   GET /narratives  each group's performance diagnostics with its week's
+#                    narrative text, joined at query time (the text is kept
+#                    once per week, or rendered from the findings table)
+#   GET /results     the numeric columns of the final weekly results, with
+#                    their group keys and performance diagnostics
+#   GET /findings    the narrative findings table (written with --narratives findings)
+#   GET /invoices    invoice details (invoice_level_index.csv)
+#   GET /metrics     request latency and cache statistics
+#
+# The results and week narratives are written by `model --query-files`
+# (REV_PERF_QUERY_FILES=1).
+#
+# Filters: year, week, payer, group_em, group_em2 (repeat one, or separate
+# values with |, to match any of them); paging: offset, limit; columns=a,b to
+# project. Responses are {"total", "offset", "limit", "columns", "data":
+# [[...], ...]}, gzipped when the client accepts it.
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+from collections import deque
+from functools import lru_cache
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .frame_store import exists, read_frame
+from .group_keys import GROUP_KEYS
+from .narrative_diagnostics import render_narratives
+from .weekly_model import narrative_cols, perf_classes, query_path
+
+SUMMARY_CSV = "weekly_summary_with_layer2.csv"
+INVOICE_CSV = "invoice_level_index.csv"
+MODEL_OUTPUT = "v2 Rev Perf Report with Second Group Layer_LR_Final_NoPayer.xlsx"
+# Numeric weekly results with GROUP_KEYS, and one row of narratives per week
+# (weekly_model.query_frames(), Step 14)
+RESULTS_FILE = query_path(MODEL_OUTPUT, "keyed")
+NARRATIVES_FILE = query_path(MODEL_OUTPUT, "narratives")
+FINDINGS_FILE = "v2 Rev Perf Report with Second Group Layer_LR_Final_NoPayer_findings.xlsx"
+WEEK_KEYS = ["Year", "Week"]
+# Classified from the % errors when the results are loaded
+DIAGNOSTIC_COLUMNS = {"Performance Diagnostic (RF)": "% Error (RF)", "Performance Diagnostic": "% Error"}
+# Served by /narratives after the group keys
+NARRATIVE_COLUMNS = [*DIAGNOSTIC_COLUMNS, *narrative_cols]
+# Query parameter -> key column
+FILTERS = {"year": "Year", "week": "Week", "payer": "Payer",
+           "group_em": "Group_EM", "group_em2": "Group_EM2"}
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 5_000
+# Distinct queries whose encoded responses are kept (REV_PERF_QUERY_CACHE)
+CACHE_SIZE = int(os.environ.get("REV_PERF_QUERY_CACHE", "1024"))
+# Responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1_024
+# Latencies kept per endpoint for the /metrics percentiles
+LATENCY_WINDOW = 1_000
+
+
+class QueryError(ValueError):
+    """A bad request; answered with `status` and the message."""
+    status = 400
+
+
+class UnknownDataset(QueryError):
+    status = 404
+
+
+def _json_values(col: pd.Series) -> list:
+    # Python scalars for json.dumps; missing and non-finite numbers become null
+    if pd.api.types.is_float_dtype(col.dtype):
+        values = col.to_numpy(dtype=float)
+        out = values.astype(object)
+        out[~np.isfinite(values)] = None
+        return out.tolist()
+    return col.astype(object).where(col.notna(), None).tolist()
+
+
+class FilterIndex:
+    """
+    Row positions per key value, built once: rows are sorted by each key
+    column's codes, so the rows holding a value are one slice. A query
+    intersects the slices of its filters, smallest first.
+    """
+
+    def __init__(self, frame: pd.DataFrame, keys=GROUP_KEYS):
+        self.frame = frame.reset_index(drop=True)
+        self.keys = [k for k in keys if k in frame.columns]
+        self._slices = {}
+        for k in self.keys:
+            codes, uniques = pd.factorize(self.frame[k])
+            order = np.argsort(codes, kind="stable")
+            offsets = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            # Query strings are matched against the values' text form
+            self._slices[k] = {str(u): order[offsets[i]:offsets[i + 1]]
+                               for i, u in enumerate(uniques)}
+
+    def positions(self, filters: dict) -> np.ndarray:
+        """Ascending row positions matching every {column: [values]} filter."""
+        unknown = [k for k in filters if k not in self.keys]
+        if unknown:
+            raise QueryError(f"Cannot filter this dataset by {unknown}")
+        matches = []
+        for k, values in filters.items():
+            parts = [self._slices[k].get(v) for v in values]
+            parts = [p for p in parts if p is not None]
+            matches.append(np.unique(np.concatenate(parts)) if parts else np.empty(0, np.int64))
+        if not matches:
+            return np.arange(len(self.frame))
+        matches.sort(key=len)
+        result = matches[0]
+        for m in matches[1:]:
+            result = np.intersect1d(result, m, assume_unique=True)
+        return result
+
+
+class QueryService:
+    """The loaded datasets and a shared LRU cache of encoded responses."""
+
+    def __init__(self, datasets: dict, joins: dict = None, cache_size: int = CACHE_SIZE):
+        self.indexes = {name: FilterIndex(frame) for name, frame in datasets.items()}
+        # Per-week columns joined onto a dataset's page rows: {dataset: frame keyed by WEEK_KEYS}
+        self.joins = joins or {}
+        self.query = lru_cache(maxsize=cache_size)(self._query)
+        self.latency = {}
+
+    @classmethod
+    def load(cls, summary=SUMMARY_CSV, invoices=INVOICE_CSV, results=RESULTS_FILE,
+             findings=FINDINGS_FILE, narratives=NARRATIVES_FILE, **kwargs):
+        """Load whichever of the pipeline outputs exist."""
+        datasets, joins = {}, {}
+        if exists(summary):
+            datasets["summary"] = read_frame(summary)
+        if exists(invoices):
+            datasets["invoices"] = read_frame(invoices)
+        if exists(findings):
+            datasets["findings"] = read_frame(findings)
+        if exists(results):
+            frame = read_frame(results)
+            missing = [c for c in GROUP_KEYS if c not in frame.columns]
+            if missing:
+                raise ValueError(f"{results} has no group keys {missing}; expected the keyed results "
+                                 f"the model writes with --query-files")
+            for col, error in DIAGNOSTIC_COLUMNS.items():
+                if error in frame.columns:
+                    frame[col] = perf_classes(frame[error])
+            datasets["results"] = frame
+            week_dtypes = {k: frame[k].dtype for k in WEEK_KEYS}
+            if exists(narratives):
+                text = read_frame(narratives).astype(week_dtypes)
+            elif "findings" in datasets:
+                text = render_narratives(datasets["findings"].astype(week_dtypes),
+                                         frame[WEEK_KEYS].drop_duplicates(), narrative_cols)
+            else:
+                raise ValueError(f"No week narratives {narratives} or findings table {findings} for {results}")
+            datasets["narratives"] = frame[GROUP_KEYS + [c for c in DIAGNOSTIC_COLUMNS if c in frame.columns]]
+            joins["narratives"] = text[WEEK_KEYS + [c for c in narrative_cols if c in text.columns]]
+        if not datasets:
+            raise FileNotFoundError(f"None of {summary}, {invoices}, {results} found")
+        return cls(datasets, joins, **kwargs)
+
+    def _query(self, dataset: str, filters: tuple, offset: int, limit: int, columns: tuple):
+        # Cached per normalized query; returns (json, gzipped json or None)
+        index = self.indexes[dataset]
+        frame = index.frame
+        join = self.joins.get(dataset)
+        available = list(frame.columns) if join is None else [
+            *frame.columns, *(c for c in join.columns if c not in WEEK_KEYS)]
+        missing = [c for c in columns if c not in available]
+        if missing:
+            raise QueryError(f"Missing cols: {missing}")
+        positions = index.positions(dict(filters))
+        page = frame.iloc[positions[offset:offset + limit]]
+        if join is not None:
+            page = page.merge(join, on=WEEK_KEYS, how="left")
+        if columns:
+            page = page[list(columns)]
+        body = json.dumps({
+            "total": len(positions), "offset": offset, "limit": limit,
+            "columns": list(page.columns),
+            "data": list(map(list, zip(*(_json_values(page[c]) for c in page.columns)))),
+        }, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return body, gzip.compress(body, compresslevel=5) if len(body) >= GZIP_MIN_BYTES else None
+
+    def parse(self, path: str, query: str):
+        """Normalize a request into the (hashable) arguments of query()."""
+        dataset = path.strip("/")
+        if dataset not in self.indexes:
+            raise UnknownDataset(f"Unknown dataset {dataset!r}; expected one of {sorted(self.indexes)}")
+        params = parse_qs(query, keep_blank_values=False)
+        filters = []
+        for name, column in FILTERS.items():
+            values = [v for raw in params.pop(name, []) for v in raw.split("|")]
+            if values:
+                filters.append((column, tuple(sorted(set(values)))))
+        try:
+            offset = int(params.pop("offset", ["0"])[0])
+            limit = int(params.pop("limit", [str(DEFAULT_LIMIT)])[0])
+        except ValueError:
+            raise QueryError("offset and limit must be integers")
+        if offset < 0 or not 0 < limit <= MAX_LIMIT:
+            raise QueryError(f"offset must be >= 0 and limit in 1..{MAX_LIMIT}")
+        columns = tuple(c for raw in params.pop("columns", []) for c in raw.split(",") if c)
+        if params:
+            raise QueryError(f"Unknown parameters {sorted(params)}")
+        return dataset, tuple(filters), offset, limit, columns
+
+    def record(self, endpoint: str, seconds: float):
+        self.latency.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def metrics(self) -> dict:
+        info = self.query.cache_info()
+        endpoints = {}
+        for endpoint, samples in self.latency.items():
+            ms = np.array(samples) * 1000
+            endpoints[endpoint] = {"requests": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                                   "p95_ms": round(float(np.percentile(ms, 95)), 3),
+                                   "max_ms": round(float(ms.max()), 3)}
+        return {"cache": {"hits": info.hits, "misses": info.misses,
+                          "size": info.currsize, "max_size": info.maxsize},
+                "datasets": {n: len(i.frame) for n, i in self.indexes.items()},
+                "endpoints": endpoints}
+
+
+async def _handle(service: QueryService, reader, writer):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            request = await reader.readline()
+            if not request:
+                break
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            start = time.perf_counter()
+            method, target, *_ = request.decode("latin-1").split() + ["", ""]
+            url = urlsplit(target)
+            endpoint = url.path.strip("/")
+            status, body, gz = 200, None, None
+            try:
+                if method != "GET":
+                    status, body = 405, b'{"error":"GET only"}'
+                elif endpoint == "metrics":
+                    body = json.dumps(service.metrics()).encode("utf-8")
+                else:
+                    args = service.parse(url.path, url.query)
+                    # Pandas work runs off the event loop; hits return at once
+                    body, gz = await loop.run_in_executor(None, service.query, *args)
+            except QueryError as e:
+                status, body = e.status, json.dumps({"error": str(e)}).encode("utf-8")
+            except Exception as e:
+                status, body = 500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8")
+
+            use_gzip = gz is not None and "gzip" in headers.get("accept-encoding", "")
+            payload = gz if use_gzip else body
+            head = [f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(payload)}",
+                    "Access-Control-Allow-Origin: *",
+                    "Vary: Accept-Encoding"]
+            if use_gzip:
+                head.append("Content-Encoding: gzip")
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+            await writer.drain()
+            service.record(endpoint if status != 404 else "unknown", time.perf_counter() - start)
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service: QueryService, host: str, port: int):
+    server = await asyncio.start_server(lambda r, w: _handle(service, r, w), host, port)
+    print(f"Query service on http://{host}:{port} ({', '.join(service.indexes)})")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve filtered queries over the pipeline outputs.")
+    parser.add_argument("--summary", default=SUMMARY_CSV)
+    parser.add_argument("--invoices", default=INVOICE_CSV)
+    parser.add_argument("--results", default=RESULTS_FILE)
+    parser.add_argument("--findings", default=FINDINGS_FILE)
+    parser.add_argument("--narratives", default=NARRATIVES_FILE)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("REV_PERF_QUERY_PORT", "8765")))
+    args = parser.parse_args()
+    service = QueryService.load(args.summary, args.invoices, args.results, args.findings, args.narratives)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
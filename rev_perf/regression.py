@@ -0,0 +1,325 @@
+# regression.py
+
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .group_keys import GroupKeys
+
+WEEK_KEYS = ["Year", "Week"]
+
+# Segmented modeling: one model per segment of these keys (--segments / REV_PERF_SEGMENTS)
+SEGMENT_MODES = {"payer": ["Payer"], "payer_em": ["Payer", "Group_EM"]}
+# Segments with fewer training rows are scored by the global model
+MIN_SEGMENT_ROWS = int(os.environ.get("REV_PERF_SEGMENT_MIN_ROWS", "30"))
+GLOBAL_SEGMENT = "Global"
+
+
+class RegressionStats:
+    """
+    Normal-equation statistics of a set of training rows (features X with
+    gaps, target y), kept so that a median-imputed least-squares model can be
+    fitted for any union of row sets without revisiting the rows.
+
+    Missing values are tracked apart from observed ones. With x~ the feature
+    imputed with median m,
+        sum x~_i x~_j = sxx_ij + m_j sx_miss_ij + m_i sx_miss_ji + m_i m_j n_miss_ij
+    where sx_miss_ij sums x_i over rows missing x_j and n_miss_ij counts rows
+    missing both. Observed values are kept per feature for exact medians.
+    """
+
+    def __init__(self, k: int):
+        self.n = 0
+        self.sy = 0.0
+        self.sx = np.zeros(k)
+        self.n_obs = np.zeros(k)
+        self.sxy = np.zeros(k)
+        self.sy_miss = np.zeros(k)
+        self.sxx = np.zeros((k, k))
+        self.sx_miss = np.zeros((k, k))
+        self.n_miss = np.zeros((k, k))
+        self.values = [np.empty(0)] * k
+
+    @classmethod
+    def from_rows(cls, X: np.ndarray, y: np.ndarray) -> "RegressionStats":
+        miss = np.isnan(X)
+        x0 = np.where(miss, 0.0, X)
+        mf = miss.astype(float)
+        s = cls(X.shape[1])
+        s.n = len(y)
+        s.sy = float(y.sum())
+        s.sx = x0.sum(axis=0)
+        s.n_obs = (~miss).sum(axis=0).astype(float)
+        s.sxy = x0.T @ y
+        s.sy_miss = mf.T @ y
+        s.sxx = x0.T @ x0
+        s.sx_miss = x0.T @ mf
+        s.n_miss = mf.T @ mf
+        s.values = [X[~miss[:, j], j] for j in range(X.shape[1])]
+        return s
+
+    @classmethod
+    def combine(cls, stats: list) -> "RegressionStats":
+        """
+        Statistics of the union of `stats`. Moments are summed in order and the
+        observed values are concatenated once per feature, so a window of P
+        partitions copies each value once rather than P times.
+        """
+        s = cls(len(stats[0].sx))
+        for name in ("n", "sy", "sx", "n_obs", "sxy", "sy_miss", "sxx", "sx_miss", "n_miss"):
+            total = getattr(stats[0], name)
+            for other in stats[1:]:
+                total = total + getattr(other, name)
+            setattr(s, name, total)
+        s.values = [np.concatenate(v) for v in zip(*(t.values for t in stats))]
+        return s
+
+    def __add__(self, other: "RegressionStats") -> "RegressionStats":
+        return RegressionStats.combine([self, other])
+
+
+@dataclass
+class LinearModel:
+    """A fitted model: imputer medians, retained features and coefficients."""
+    features: list
+    medians: list
+    support: list
+    coef: list
+    intercept: float
+    train_weeks: list
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        """Predictions for the rows of `X`; non-finite feature values are imputed."""
+        support = np.asarray(self.support, dtype=bool)
+        medians = np.array([np.nan if m is None else m for m in self.medians], dtype=float)
+        kept = X[self.features].to_numpy(dtype=float)[:, support]
+        kept = np.where(np.isfinite(kept), kept, medians[support])
+        return kept @ np.asarray(self.coef, dtype=float) + self.intercept
+
+    def full_coef(self) -> np.ndarray:
+        """Coefficient of every feature in `features` order (0 for dropped ones)."""
+        coef = np.zeros(len(self.features))
+        coef[np.asarray(self.support, dtype=bool)] = self.coef
+        return coef
+
+    def row_coef(self, X: pd.DataFrame) -> np.ndarray:
+        """(rows, features) coefficients each row of `X` is scored with."""
+        return np.tile(self.full_coef(), (len(X), 1))
+
+    def save(self, path: str):
+        _write_json(path, self.__dict__)
+
+    @classmethod
+    def load(cls, path: str) -> "LinearModel":
+        with open(path) as fh:
+            return cls(**json.load(fh))
+
+
+@dataclass
+class SegmentedModel:
+    """One LinearModel per value of `segment_keys`; other rows use `fallback`."""
+    segment_keys: list
+    fallback: LinearModel
+    segments: dict
+
+    def _segment_rows(self, X: pd.DataFrame):
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(X[self.segment_keys].astype(str)))
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        for i, key in enumerate(uniques):
+            if key in self.segments:
+                yield key, order[bounds[i]:bounds[i + 1]]
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        pred = self.fallback.predict(X)
+        for key, rows in self._segment_rows(X):
+            pred[rows] = self.segments[key].predict(X.iloc[rows])
+        return pred
+
+    def row_coef(self, X: pd.DataFrame) -> np.ndarray:
+        coef = self.fallback.row_coef(X)
+        for key, rows in self._segment_rows(X):
+            coef[rows] = self.segments[key].full_coef()
+        return coef
+
+    def labels(self, X: pd.DataFrame) -> np.ndarray:
+        """Name of the model that scores each row of `X`."""
+        labels = np.full(len(X), GLOBAL_SEGMENT, dtype=object)
+        for key, rows in self._segment_rows(X):
+            labels[rows] = " × ".join(key)
+        return labels
+
+    def save(self, path: str):
+        _write_json(path, {
+            "segment_keys": self.segment_keys,
+            "fallback": self.fallback.__dict__,
+            "segments": [{"key": list(k), "model": m.__dict__} for k, m in self.segments.items()],
+        })
+
+    @classmethod
+    def load(cls, path: str) -> "SegmentedModel":
+        with open(path) as fh:
+            data = json.load(fh)
+        return cls(
+            data["segment_keys"], LinearModel(**data["fallback"]),
+            {tuple(s["key"]): LinearModel(**s["model"]) for s in data["segments"]},
+        )
+
+
+def load_model(path: str):
+    """A saved LinearModel or SegmentedModel."""
+    with open(path) as fh:
+        segmented = "segment_keys" in json.load(fh)
+    return (SegmentedModel if segmented else LinearModel).load(path)
+
+
+def _write_json(path: str, data: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(data, fh, indent=1)
+    os.replace(tmp, path)
+
+
+def partition_stats(X: np.ndarray, y: np.ndarray, keys: pd.DataFrame) -> dict:
+    """
+    RegressionStats per distinct row of `keys` (Year, Week and optionally
+    segment columns, aligned with the rows of X and y), keyed by
+    `(year, week, *segment)` tuples.
+    """
+    groups = GroupKeys(keys, list(keys.columns))
+    order = np.argsort(groups.ids, kind="stable")
+    bounds = np.searchsorted(groups.ids[order], np.arange(groups.n + 1))
+    parts = {}
+    for i, (year, week, *segment) in enumerate(groups.table.itertuples(index=False, name=None)):
+        rows = order[bounds[i]:bounds[i + 1]]
+        key = (str(year), int(week), *map(str, segment))
+        parts[key] = RegressionStats.from_rows(X[rows], y[rows])
+    return parts
+
+
+def window_stats(parts: dict, keys) -> RegressionStats:
+    """Statistics of the union of the partitions in `keys`, summed in key order."""
+    keys = sorted(k for k in keys if k in parts)
+    if not keys:
+        raise ValueError("No training rows in the requested weeks")
+    return RegressionStats.combine([parts[k] for k in keys])
+
+
+def _normal_equations(stats: RegressionStats):
+    """Imputer medians, retained features, means and centered moments of `stats`."""
+    medians = np.array([np.median(v) if len(v) else np.nan for v in stats.values])
+    support = np.array([len(v) > 0 and v.max() > v.min() for v in stats.values])
+    m = np.where(np.isnan(medians), 0.0, medians)
+
+    n = stats.n
+    sx = stats.sx + m * (n - stats.n_obs)
+    fill = stats.sx_miss * m[None, :]
+    sxx = stats.sxx + fill + fill.T + np.outer(m, m) * stats.n_miss
+    sxy = stats.sxy + m * stats.sy_miss
+    mu, ybar = sx / n, stats.sy / n
+    return medians, support, mu, ybar, sxx - n * np.outer(mu, mu), sxy - n * mu * ybar
+
+
+def _model(features, medians, support, coef, intercept, train_weeks) -> LinearModel:
+    return LinearModel(
+        features=list(features),
+        medians=[None if np.isnan(v) else float(v) for v in medians],
+        support=[bool(s) for s in support],
+        coef=[float(c) for c in coef],
+        intercept=float(intercept),
+        train_weeks=[[str(k[0]), int(k[1])] for k in sorted(train_weeks)],
+    )
+
+
+def fit(stats: RegressionStats, features: list, train_weeks=()) -> LinearModel:
+    """
+    Median imputation, removal of constant features and an intercept
+    least-squares fit, equivalent to SimpleImputer(strategy="median") ->
+    VarianceThreshold(0.0) -> LinearRegression() on the rows behind `stats`.
+    """
+    medians, support, mu, ybar, cov, cxy = _normal_equations(stats)
+
+    # Centered (co)variances of the retained features, solved on unit scale
+    cov, cxy = cov[np.ix_(support, support)], cxy[support]
+    scale = np.sqrt(np.diag(cov))
+    coef = np.linalg.lstsq(cov / np.outer(scale, scale), cxy / scale, rcond=None)[0] / scale
+    intercept = ybar - mu[support] @ coef
+    return _model(features, medians, support, coef, intercept, train_weeks)
+
+
+def fit_batch(stats_list: list, features: list, train_weeks=()) -> list:
+    """fit() for many row sets with one batched solve across all of them."""
+    if not stats_list:
+        return []
+    prepared = [_normal_equations(s) for s in stats_list]
+    support = np.array([p[1] for p in prepared])
+    mu = np.array([p[2] for p in prepared])
+    ybar = np.array([p[3] for p in prepared])
+    cov = np.array([p[4] for p in prepared])
+    cxy = np.array([p[5] for p in prepared])
+
+    # Dropped features get a unit diagonal and no coupling, so their coefficient is 0
+    k = len(features)
+    diag = np.where(support, cov[:, np.arange(k), np.arange(k)], 1.0)
+    cov = np.where(support[:, :, None] & support[:, None, :], cov, 0.0)
+    cov[:, np.arange(k), np.arange(k)] = diag
+    cxy = np.where(support, cxy, 0.0)
+
+    scale = np.sqrt(diag)
+    scaled = cov / (scale[:, :, None] * scale[:, None, :])
+    coef = (np.linalg.pinv(scaled, hermitian=True) @ (cxy / scale)[:, :, None])[:, :, 0] / scale
+    intercept = ybar - (mu * coef).sum(axis=1)
+    return [
+        _model(features, p[0], sup, c[sup], b, train_weeks)
+        for p, sup, c, b in zip(prepared, support, coef, intercept)
+    ]
+
+
+def train_segments(parts: dict, features: list, segment_keys: list, fallback: LinearModel,
+                   train_weeks=None, min_rows: int = MIN_SEGMENT_ROWS) -> SegmentedModel:
+    """
+    Fit one model per segment from `parts` keyed `(year, week, *segment)`,
+    over `train_weeks` (default: every week). Segments with fewer than
+    `min_rows` training rows are left to `fallback`.
+    """
+    weeks = None if train_weeks is None else {(str(y), int(w)) for y, w in train_weeks}
+    by_segment = {}
+    for key in parts:
+        if weeks is None or key[:2] in weeks:
+            by_segment.setdefault(key[2:], []).append(key)
+    windows = {seg: window_stats(parts, keys) for seg, keys in sorted(by_segment.items())}
+    windows = {seg: s for seg, s in windows.items() if s.n >= min_rows}
+    models = fit_batch(list(windows.values()), features,
+                       sorted({k[:2] for keys in by_segment.values() for k in keys}))
+    return SegmentedModel(list(segment_keys), fallback, dict(zip(windows, models)))
+
+
+def save_partitions(path: str, parts: dict):
+    """Persist per-week statistics (e.g. next to the incremental state)."""
+    arrays = {"keys": np.array([json.dumps([str(k[0]), int(k[1]), *k[2:]]) for k in parts])}
+    for i, s in enumerate(parts.values()):
+        arrays[f"{i}/scalars"] = np.array([s.n, s.sy])
+        for name in ("sx", "n_obs", "sxy", "sy_miss", "sxx", "sx_miss", "n_miss"):
+            arrays[f"{i}/{name}"] = getattr(s, name)
+        for j, v in enumerate(s.values):
+            arrays[f"{i}/values/{j}"] = v
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def load_partitions(path: str) -> dict:
+    parts = {}
+    with np.load(path) as data:
+        for i, key in enumerate(data["keys"]):
+            year, week, *segment = json.loads(str(key))
+            s = RegressionStats(len(data[f"{i}/sx"]))
+            s.n, s.sy = int(data[f"{i}/scalars"][0]), float(data[f"{i}/scalars"][1])
+            for name in ("sx", "n_obs", "sxy", "sy_miss", "sxx", "sx_miss", "n_miss"):
+                setattr(s, name, data[f"{i}/{name}"])
+            s.values = [data[f"{i}/values/{j}"] for j in range(len(s.sx))]
+            parts[(year, week, *segment)] = s
+    return parts
@@ -0,0 +1,250 @@
+# scenarios.py
+# What-if scoring: re-score Expected Payments, % Error and the Step 9 / Step 13
+# diagnostics for a batch of feature changes and threshold settings at once,
+# from the fitted model and the weekly feature matrix, without re-running the
+# pipeline.
+#
+# A spec file (JSON) lists scenarios, optional sweeps and a threshold grid:
+#   {"scenarios": [{"name": "BCBS denials -2pt",
+#                   "changes": [{"feature": "Denial %", "delta": -2, "where": {"Payer": "2-BCBS"}}]}],
+#    "sweeps": [{"feature": "Collection Rate*", "scale": [0.9, 0.95, 1.05, 1.1]}],
+#    "thresholds": {"band": [2.5, 5], "zb_low": [0.75], "zb_high": [1.25], "cr_high": [1.2]}}
+# "where" values must match the report labels exactly (e.g. "2-BCBS"); unknown
+# values are an error. Every threshold combination is scored for every
+# scenario; a "Baseline" scenario without changes is always included.
+
+import argparse
+import itertools
+import json
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .baselines import BASELINE_WINDOW
+from .frame_store import read_frame, write_frame
+from .metric_registry import GROUP_KEYS, zb_metrics
+from .regression import SEGMENT_MODES, load_model
+from .source_cache import load_source
+from .weekly_model import (
+    invoice_cols, perf_band, perf_codes, perf_labels, prepare_source,
+    regression_partitions, train_model, train_segment_models, weekly_features,
+    zb_baseline_rows, zb_classify, zb_labels, zb_thresholds
+)
+
+SOURCE_FILE = "v2 Rev Perf Report with Second Group Layer.xlsx"
+INVOICE_CSV = "invoice_with_weekly_summary_joined.csv"
+SUMMARY_CSV = "scenario_summary.csv"
+BASELINE_SCENARIO = "Baseline"
+THRESHOLD_COLS = ["band", *zb_thresholds]
+
+
+@dataclass
+class Change:
+    """
+    One feature change on the rows matching `where` ({key column: value or
+    [values]}); the new value is `value * scale + delta`. Missing values stay
+    missing (the model imputes them as before).
+    """
+    feature: str
+    delta: float = 0.0
+    scale: float = 1.0
+    where: dict = field(default_factory=dict)
+
+
+@dataclass
+class Scenario:
+    """Changes applied together; changes to the same feature add up."""
+    name: str
+    changes: list = field(default_factory=list)
+
+
+def sweep(feature: str, delta=(), scale=(), where: dict = None) -> list:
+    """One single-change Scenario per delta and per scale of `feature`."""
+    where = where or {}
+    scope = "".join(f" ({k}={v})" for k, v in where.items())
+    return ([Scenario(f"{feature} {d:+g}{scope}", [Change(feature, delta=d, where=where)]) for d in delta]
+            + [Scenario(f"{feature} x{s:g}{scope}", [Change(feature, scale=s, where=where)]) for s in scale])
+
+
+def threshold_grid(band=(perf_band,), zb_low=(zb_thresholds["zb_low"],),
+                   zb_high=(zb_thresholds["zb_high"],), cr_high=(zb_thresholds["cr_high"],)) -> pd.DataFrame:
+    """Every combination of the given threshold values, one per row."""
+    return pd.DataFrame(list(itertools.product(band, zb_low, zb_high, cr_high)), columns=THRESHOLD_COLS)
+
+
+def load_spec(path: str):
+    """(scenarios, threshold grid) from a spec file (see the module header)."""
+    with open(path) as fh:
+        spec = json.load(fh)
+    scenarios = [Scenario(s["name"], [Change(**c) for c in s.get("changes", [])])
+                 for s in spec.get("scenarios", [])]
+    for s in spec.get("sweeps", []):
+        scenarios += sweep(s["feature"], s.get("delta", ()), s.get("scale", ()), s.get("where"))
+    unknown = set(spec.get("thresholds", {})) - set(THRESHOLD_COLS)
+    if unknown:
+        raise ValueError(f"Unknown thresholds {sorted(unknown)}; expected {THRESHOLD_COLS}")
+    return scenarios, threshold_grid(**{k: list(np.atleast_1d(v)) for k, v in spec.get("thresholds", {}).items()})
+
+
+class ScenarioEngine:
+    """
+    The weekly feature matrix, the coefficients each row is scored with and
+    the Step 13 baselines, held once. Predictions are linear in the
+    features, so a scenario's Expected Payments are the fitted ones plus
+    (coefficients x feature changes), summed per scenario in one pass over
+    all changes of the batch.
+    """
+
+    def __init__(self, weekly: pd.DataFrame, model, zb_base: pd.DataFrame):
+        self.keys = weekly[GROUP_KEYS].reset_index(drop=True)
+        self.features = list(getattr(model, "fallback", model).features)
+        X = weekly[self.features].to_numpy(dtype=float)
+        # Non-finite values are imputed by the model, so changes do not reach them
+        self.finite = np.isfinite(X)
+        self.x0 = np.where(self.finite, X, 0.0)
+        self.coef = model.row_coef(weekly) * self.finite
+        self.payment = weekly["Payment Amount*"].to_numpy(dtype=float)
+        self.expected = model.predict(weekly)
+        self.zb_base = (zb_base["ZBCR_Baseline"].to_numpy(dtype=float),
+                        zb_base["CR_Baseline"].to_numpy(dtype=float))
+        self.zb_rates = [weekly[m].to_numpy(dtype=float) for m in zb_metrics]
+        self._codes = {}
+        for k in GROUP_KEYS:
+            codes, uniques = pd.factorize(self.keys[k].astype(str))
+            self._codes[k] = (codes, {u: i for i, u in enumerate(uniques)})
+
+    @classmethod
+    def from_weekly(cls, weekly: pd.DataFrame, model=None, segments: str = None,
+                    baseline=BASELINE_WINDOW) -> "ScenarioEngine":
+        """Engine over `weekly` (Steps 5–7 output), fitting the model as Steps 8–9 do when not given."""
+        if model is None:
+            model = train_model(regression_partitions(weekly))
+            if segments:
+                model = train_segment_models(weekly, segments, model)
+        return cls(weekly, model, zb_baseline_rows(weekly[GROUP_KEYS + zb_metrics], baseline))
+
+    def _mask(self, where: dict) -> np.ndarray:
+        mask = np.ones(len(self.keys), dtype=bool)
+        for k, values in where.items():
+            if k not in self._codes:
+                raise ValueError(f"Cannot filter scenarios by {k!r}; expected one of {GROUP_KEYS}")
+            codes, lookup = self._codes[k]
+            values = [str(v) for v in np.atleast_1d(values)]
+            unknown = sorted(set(values) - set(lookup))
+            if unknown:
+                raise ValueError(f"Unknown {k} values {unknown}; expected one of {sorted(lookup)}")
+            wanted = [lookup[v] for v in values]
+            mask &= np.isin(codes, wanted)
+        return mask
+
+    def _shifts(self, scenarios: list, weights: np.ndarray) -> np.ndarray:
+        """
+        (scenarios, rows) sum over each scenario's changes of
+        weights[row, feature] x change, for a (rows, features) weight matrix.
+        """
+        changes = [(i, c) for i, s in enumerate(scenarios) for c in s.changes]
+        out = np.zeros((len(scenarios), len(self.keys)))
+        if not changes:
+            return out
+        unknown = sorted({c.feature for _, c in changes} - set(self.features))
+        if unknown:
+            raise ValueError(f"Unknown scenario features {unknown}; expected model features")
+        col = np.array([self.features.index(c.feature) for _, c in changes])
+        delta = np.array([c.delta for _, c in changes], dtype=float)
+        scale = np.array([c.scale for _, c in changes], dtype=float)
+        # One row mask per distinct filter
+        filters = [json.dumps(c.where, sort_keys=True, default=str) for _, c in changes]
+        codes, uniques = pd.factorize(pd.Series(filters))
+        masks = np.array([self._mask(json.loads(u)) for u in uniques])
+
+        w, x = weights[:, col].T, self.x0[:, col].T
+        contrib = masks[codes] * w * (delta[:, None] + (scale[:, None] - 1) * x)
+        owner = np.array([i for i, _ in changes])
+        starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+        out[owner[starts]] = np.add.reduceat(contrib, starts, axis=0)
+        return out
+
+    def expected_payments(self, scenarios: list) -> np.ndarray:
+        """(scenarios, rows) Expected Payments."""
+        return self.expected + self._shifts(scenarios, self.coef)
+
+    def score(self, scenarios: list, grid: pd.DataFrame = None, detail: bool = False) -> dict:
+        """
+        {"summary": one row per scenario and threshold setting, "groups":
+        the same per group-week row (only with `detail`)}. "Flipped" counts
+        rows whose Performance Diagnostic (RF) differs from the fitted one
+        at the default band.
+        """
+        scenarios = [Scenario(BASELINE_SCENARIO)] + list(scenarios)
+        grid = threshold_grid() if grid is None else grid.reset_index(drop=True)
+        expected = self.expected_payments(scenarios)
+        missed = self.payment - expected
+        with np.errstate(divide="ignore", invalid="ignore"):
+            err = missed / expected * 100
+        current = perf_codes(err[0])
+        # Rates after the changes to the Step 13 metrics themselves
+        zb, cr = (rate + self._shifts(scenarios, self.finite * np.array([f == m for f in self.features]))
+                  for rate, m in zip(self.zb_rates, zb_metrics))
+
+        summaries, details = [], []
+        for t, th in grid.iterrows():
+            perf = perf_codes(err, th["band"])
+            zb_codes = zb_classify(zb, cr, *self.zb_base, th["zb_low"], th["zb_high"], th["cr_high"])
+            summary = pd.DataFrame({"Scenario": [s.name for s in scenarios]})
+            for c in THRESHOLD_COLS:
+                summary[c] = th[c]
+            summary["Expected Payments"] = np.nansum(expected, axis=1)
+            summary["Missed Revenue (RF)"] = np.nansum(missed, axis=1)
+            for i, label in enumerate(perf_labels):
+                summary[label] = (perf == i).sum(axis=1)
+            summary["Flipped"] = (perf != current).sum(axis=1)
+            for i, label in enumerate(zb_labels):
+                summary[f"ZB {label}"] = (zb_codes == i).sum(axis=1)
+            summaries.append(summary)
+            if detail:
+                rows = pd.concat([self.keys] * len(scenarios), ignore_index=True)
+                rows.insert(0, "Scenario", np.repeat(summary["Scenario"].to_numpy(), len(self.keys)))
+                for c in THRESHOLD_COLS:
+                    rows[c] = th[c]
+                rows["Expected Payments"] = expected.ravel()
+                rows["Missed Revenue (RF)"] = missed.ravel()
+                rows["% Error (RF)"] = err.ravel()
+                rows["Performance Diagnostic (RF)"] = np.array(perf_labels, dtype=object)[perf.ravel()]
+                rows["Zero-Balance Class"] = np.array(zb_labels, dtype=object)[zb_codes.ravel()]
+                details.append(rows)
+        out = {"summary": pd.concat(summaries, ignore_index=True)}
+        if detail:
+            out["groups"] = pd.concat(details, ignore_index=True)
+        return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score what-if scenarios against the weekly model.")
+    parser.add_argument("spec", help="scenario spec (JSON; see scenarios.py)")
+    parser.add_argument("--source", default=SOURCE_FILE)
+    parser.add_argument("--invoices", default=INVOICE_CSV)
+    parser.add_argument("--model", default=None, help="saved model to score with instead of refitting")
+    parser.add_argument("--segments", default=os.environ.get("REV_PERF_SEGMENTS") or None,
+                        choices=sorted(SEGMENT_MODES))
+    parser.add_argument("--baseline", default=BASELINE_WINDOW, help="Step 13 baselines: all|trailing:N|yoy[:N]")
+    parser.add_argument("--out", default=SUMMARY_CSV, help="per-scenario summary")
+    parser.add_argument("--detail", default=None, help="also write the per-group rows here")
+    args = parser.parse_args()
+
+    scenarios, grid = load_spec(args.spec)
+    # The source comes from the parquet cache after the first load (see source_cache.py)
+    df = prepare_source(load_source(args.source, sheet_name=0))
+    weekly, _ = weekly_features(df, read_frame(args.invoices, columns=invoice_cols))
+    engine = ScenarioEngine.from_weekly(weekly, load_model(args.model) if args.model else None,
+                                        args.segments, args.baseline)
+    result = engine.score(scenarios, grid, detail=bool(args.detail))
+    result["summary"].to_csv(args.out, index=False)
+    print(f"{len(scenarios) + 1} scenarios x {len(grid)} threshold settings written to {args.out}")
+    if args.detail:
+        print(f"Group rows written to {write_frame(result['groups'], args.detail)}")
+
+
+if __name__ == "__main__":
+    main()
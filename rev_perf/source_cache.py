@@ -0,0 +1,178 @@
+# source_cache.py
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from .group_keys import parse_unique
+
+try:
+    import pyarrow  # noqa: F401  (parquet engine)
+except ImportError:
+    pyarrow = None
+
+# Bump whenever normalize_source() changes so stale entries are never served
+NORMALIZE_VERSION = 2
+
+CACHE_ENABLED = os.environ.get("REV_PERF_CACHE", "1") != "0"
+CACHE_DIR = os.environ.get("REV_PERF_CACHE_DIR")  # default: next to the workbook
+CACHE_MAX_BYTES = int(float(os.environ.get("REV_PERF_CACHE_MAX_MB", "512")) * 1024 * 1024)
+INDEX_FILE = "index.json"
+
+SOURCE_COLUMNS = {
+    "Year of Visit Service Date": "Year",
+    "ISO Week of Visit Service Date": "Week",
+    "Primary Financial Class": "Payer",
+    "Chart E/M Code Grouping": "Group_EM",
+    "Chart E/M Code Second Layer": "Group_EM2"
+}
+KEY_COLUMNS = ["Year", "Week", "Payer", "Group_EM", "Group_EM2"]
+# Report metrics the weekly model reads (Step 4 zero-payment handling, the
+# Steps 5–6 summary and the Step 8 features)
+SOURCE_METRICS = [
+    "Visit Count", "Labs per Visit", "Procedure per Visit", "Avg. Charge E/M Weight",
+    "Charge Amount", "Charge Billed Balance", "Zero Balance - Collection * Charges",
+    "Payment Amount*", "Payment per Visit", "NRV Zero Balance*",
+    "Zero Balance Collection Rate", "Collection Rate*", "Denial %", "% of Visits w Radiology",
+]
+
+
+def missing_source_columns(path: str, sheet_name=0) -> list:
+    """
+    The grouping (by report or normalized name) and SOURCE_METRICS columns
+    that the workbook at `path` lacks; only the header row is read. Year and
+    Week may be positional, so they are not required by name.
+    """
+    columns = set(pd.read_excel(path, sheet_name=sheet_name, nrows=0).columns)
+    keys = [src for src, key in SOURCE_COLUMNS.items()
+            if key not in ("Year", "Week") and src not in columns and key not in columns]
+    return keys + [m for m in SOURCE_METRICS if m not in columns]
+
+
+def normalize_source(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rename the report columns and forward-fill / parse the keys. Year and the
+    text keys become categoricals and Week a small int; labels are parsed once
+    per distinct value rather than once per row.
+    """
+    df = df.rename(columns={k: v for k, v in SOURCE_COLUMNS.items() if k in df.columns})
+    # Use positional columns if the export dropped the header names
+    if "Year" not in df.columns:
+        df["Year"] = df.iloc[:, 0]
+    if "Week" not in df.columns:
+        df["Week"] = df.iloc[:, 1]
+    keys = df[KEY_COLUMNS].ffill()
+    df["Year"] = parse_unique(
+        keys["Year"], lambda s: s.astype(str).str.replace(".0", "", regex=False)
+    ).astype("category")
+    df["Week"] = parse_unique(keys["Week"], lambda s: (s
+        .astype(str)
+        .str.extract(r"(\d+)", expand=False)
+        .astype(float)
+        .fillna(0)
+        .astype("int16")
+    ))
+    for k in ("Payer", "Group_EM", "Group_EM2"):
+        df[k] = parse_unique(keys[k], lambda s: s.astype(str)).astype("category")
+    return df
+
+
+def _read_index(cache_dir: str) -> dict:
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(cache_dir: str, index: dict):
+    tmp = os.path.join(cache_dir, f"{INDEX_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(index, fh, indent=1)
+    os.replace(tmp, os.path.join(cache_dir, INDEX_FILE))
+
+
+def fingerprint(path: str, index: dict = None) -> str:
+    """
+    SHA-256 of the workbook contents. The digest is reused from `index` while
+    the file's size and mtime are unchanged, so unchanged files are not rehashed.
+    """
+    st = os.stat(path)
+    known = (index or {}).get(os.path.abspath(path))
+    if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+        return known["sha256"]
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def evict(cache_dir: str, max_bytes: int = CACHE_MAX_BYTES):
+    """Delete least-recently-used entries until the cache fits in `max_bytes`."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".parquet"):
+            st = os.stat(os.path.join(cache_dir, name))
+            entries.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
+
+
+def load_source(path: str, sheet_name=0, cache_dir: str = None) -> pd.DataFrame:
+    """
+    Load and normalize a source workbook, serving it from a parquet cache
+    keyed by the workbook's content hash when one exists.
+
+    Entries are invalidated when the workbook contents or NORMALIZE_VERSION
+    change; superseded entries for the same path are removed and the cache
+    is kept under REV_PERF_CACHE_MAX_MB by evicting least-recently-used files.
+    Set REV_PERF_CACHE=0 to always parse the workbook.
+    """
+    if not CACHE_ENABLED or pyarrow is None:
+        return normalize_source(pd.read_excel(path, sheet_name=sheet_name))
+
+    cache_dir = cache_dir or CACHE_DIR or os.path.join(
+        os.path.dirname(os.path.abspath(path)), ".rev_perf_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _read_index(cache_dir)
+    digest = fingerprint(path, index)
+    entry = f"{digest[:32]}-{sheet_name}-v{NORMALIZE_VERSION}.parquet"
+    entry_path = os.path.join(cache_dir, entry)
+
+    key = os.path.abspath(path)
+    st = os.stat(path)
+    previous = index.get(key, {}).get("entries", {})
+    record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+
+    if os.path.isfile(entry_path):
+        os.utime(entry_path)  # mark as recently used
+        if {k: index.get(key, {}).get(k) for k in record} != record:
+            index[key] = {**record, "entries": {**previous, str(sheet_name): entry}}
+            _write_index(cache_dir, index)
+        return pd.read_parquet(entry_path)
+
+    df = normalize_source(pd.read_excel(path, sheet_name=sheet_name))
+    tmp = f"{entry_path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, entry_path)
+    except (ValueError, TypeError, OSError, pyarrow.ArrowException):
+        # Mixed-type columns the parquet writer rejects: run uncached
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return df
+
+    stale = previous.get(str(sheet_name))
+    if stale and stale != entry and os.path.isfile(os.path.join(cache_dir, stale)):
+        os.remove(os.path.join(cache_dir, stale))
+    index[key] = {**record, "entries": {**previous, str(sheet_name): entry}}
+    _write_index(cache_dir, index)
+    evict(cache_dir)
+    return df
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Standalone Revenue Performance Pipeline
+Runs the full ETL and modeling process using the Excel source file
+"""
+
+import os
+import re
+import sys
+from .exporter import ExportTarget, export
+from .group_keys import GroupKeys
+from .metric_registry import aggregate
+from .regression import SEGMENT_MODES
+from .source_cache import load_source
+from .step_trace import configure_from_argv, tracer
+from .weekly_model import (
+    fit_expected_payments, model_feats, prepare_source, regression_partitions, train_model,
+    train_segment_models, valid_em
+)
+
+# === Step 0: File Paths ===
+SOURCE_FILE = "v2 Rev Perf Report with Second Group Layer.xlsx"
+
+# "payer" / "payer_em": one Expected Payments model per segment (see regression.py)
+SEGMENTS = os.environ.get("REV_PERF_SEGMENTS") or None
+
+
+def main():
+    print("🚀 Starting Revenue Performance Pipeline...")
+
+    # Per-step trace next to the model results: --trace[=chrome] / REV_PERF_TRACE (see step_trace.py)
+    configure_from_argv(sys.argv)
+
+    if not os.path.isfile(SOURCE_FILE):
+        raise FileNotFoundError(f"Error: File not found: {SOURCE_FILE}")
+    if SEGMENTS and SEGMENTS not in SEGMENT_MODES:
+        raise ValueError(f"Unknown REV_PERF_SEGMENTS {SEGMENTS!r}; expected one of {sorted(SEGMENT_MODES)}")
+
+    print(f"📊 Loading data from {SOURCE_FILE}...")
+
+    # === Steps 1–2: Metric Rules & Domains (see metric_registry.py) ===
+
+    # === Step 3: Load & Clean Source Data ===
+    print("🔄 Processing source data...")
+    step = tracer.step("Step 3: Load & Clean Source Data")
+    df = load_source(SOURCE_FILE, sheet_name=0)
+
+    # === Step 4: Zero-Payment Handling ===
+    step.rows_out = len(df)
+    print("💰 Processing payment data...")
+    step = tracer.step("Step 4: Zero-Payment Handling", rows_in=len(df))
+    df = prepare_source(df)
+
+    # === Step 5: Weekly Summary & Averages ===
+    print("📈 Creating weekly summaries...")
+    step = tracer.step("Step 5: Weekly Summary & Averages", rows_in=len(df))
+    group_keys = GroupKeys(df)  # composite group id shared by Steps 5 and 7
+    weekly = aggregate(df, {"weekly": None}, group_keys=group_keys)["weekly"]
+
+    # Add payer-level payment averages
+    by_payer_keys = group_keys.subgroups(["Year","Week","Payer"])
+    rows = df["Group_EM"].isin(valid_em).to_numpy()
+    by_payor = (
+        df.loc[rows, ["Payment Amount*","Payment per Visit"]]
+        .groupby(by_payer_keys.ids[group_keys.ids[rows]])
+        .mean()
+        .reindex(by_payer_keys.ids)
+    )
+    weekly["Avg. Payment per Visit By Payor"] = by_payor["Payment Amount*"].to_numpy()
+    weekly["Avg. Payments By Payor"] = by_payor["Payment per Visit"].to_numpy()
+
+    # === Step 6: NRV Gaps ===
+    step.rows_out = len(weekly)
+    print("📊 Calculating NRV gaps...")
+    step = tracer.step("Step 6: NRV Gaps", rows_in=len(weekly))
+    weekly["NRV Gap ($)"]     = weekly["NRV Zero Balance*"] - weekly["Payment per Visit"]
+    weekly["NRV Gap (%)"]     = weekly["NRV Gap ($)"] / weekly["Payment per Visit"] * 100
+    weekly["NRV Gap Sum ($)"] = weekly["NRV Gap ($)"] * weekly["Visit Count"]
+    weekly["Above NRV Benchmark"] = (weekly["Payment per Visit"] > weekly["NRV Zero Balance*"]).astype(int)
+
+    # === Step 7: Simplified Invoice-Level Features ===
+    print("🔍 Creating invoice-level features...")
+    step = tracer.step("Step 7: Simplified Invoice-Level Features", rows_in=len(df))
+    # Since we don't have the full invoice drill-through, create simplified features
+    inv_group = (
+        df.groupby(group_keys.ids)
+        .agg(
+            Payment_SD = ("Payment Amount*", "std"),
+            Charge_SD = ("Charge Amount", "std"),
+            Invoice_Count = ("Charge Invoice Number", "count")
+        )
+    )
+
+    # Calculate coefficients of variation
+    inv_group["Payment_CV"] = inv_group["Payment_SD"] / inv_group["Payment_SD"].mean()
+    inv_group["Charge_CV"] = inv_group["Charge_SD"] / inv_group["Charge_SD"].mean()
+
+    # Create simplified tags
+    inv_group["LowPayment_Rate"] = 0.1  # Placeholder
+    inv_group["HighCharge_Rate"] = 0.1  # Placeholder
+
+    weekly = weekly.join(inv_group)
+
+    # === Step 8: Regression Modeling ===
+    step.rows_out = len(weekly)
+    print("🤖 Training predictive model...")
+    step = tracer.step("Step 8: Regression Modeling", rows_in=len(weekly))
+    # Median imputation, constant-feature removal and least squares on the
+    # training year, as in the weekly model (see regression.fit)
+    features = [f for f in model_feats if f in weekly.columns]
+    print(f"Using features: {features}")
+    model = train_model(regression_partitions(weekly, features=features), features=features)
+    print(f"Final model features: {[f for f, keep in zip(model.features, model.support) if keep]}")
+    if SEGMENTS:
+        # Per-segment models on the same training rows; thin segments use the global fit
+        model = train_segment_models(weekly, SEGMENTS, model)
+        print(f"Segment models: {len(model.segments)} ({SEGMENTS})")
+
+    # === Step 9: Performance Classification ===
+    step = tracer.step("Step 9: Performance Classification", rows_in=len(weekly))
+    weekly = fit_expected_payments(weekly, model)
+
+    # === Step 10: Export Results ===
+    print("💾 Exporting results...")
+    step = tracer.step("Step 10: Export Results", rows_in=len(weekly))
+
+    # Invoice-level index (simplified) and its join to the weekly summary
+    invoice_index = df[["Year","Week","Payer","Group_EM","Group_EM2","Charge Invoice Number","Charge Amount","Payment Amount*","Zero Balance Collection Rate"]]
+    merged = invoice_index.merge(
+        weekly[["Year","Week","Payer","Group_EM","Group_EM2","Payment Amount*"]],
+        on=["Year","Week","Payer","Group_EM","Group_EM2"], 
+        how="left", 
+        suffixes=('','_Summary')
+    )
+
+    # All four files are validated first, then written concurrently
+    export({"weekly": weekly, "invoice_index": invoice_index, "merged": merged}, [
+        ExportTarget("weekly_summary_with_layer2.csv", "weekly"),
+        ExportTarget("invoice_level_index.csv", "invoice_index"),
+        ExportTarget("invoice_with_weekly_summary_joined.csv", "merged"),
+        ExportTarget("revenue_performance_model_results.csv", "weekly",
+                     ["Year","Week","Payer","Group_EM","Group_EM2","Payment Amount*","Expected Payments","Missed Revenue (RF)","% Error (RF)","Performance Diagnostic (RF)"],
+                     ["Model Segment"]),
+    ])
+    print("✅ Weekly summary exported to: weekly_summary_with_layer2.csv")
+    print("✅ Invoice index exported to: invoice_level_index.csv")
+    print("✅ Merged file exported to: invoice_with_weekly_summary_joined.csv")
+    print("✅ Model results exported to: revenue_performance_model_results.csv")
+
+    for path in tracer.write("revenue_performance_model_results.csv"):
+        print(f"Trace written to {path}")
+
+    print("🎉 Pipeline complete! Generated files:")
+    print("  - weekly_summary_with_layer2.csv")
+    print("  - invoice_level_index.csv") 
+    print("  - invoice_with_weekly_summary_joined.csv")
+    print("  - revenue_performance_model_results.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# step_trace.py
+# Per-step spans (wall/CPU time, peak memory, row counts) for the pipeline scripts
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+# REV_PERF_TRACE=1 writes <output>.trace.json; "chrome" adds <output>.trace.chrome.json
+TRACE = os.environ.get("REV_PERF_TRACE", "0")
+# tracemalloc peaks per span (slows allocation-heavy steps several times over)
+TRACE_MEMORY = os.environ.get("REV_PERF_TRACE_MEMORY") == "1"
+# cProfile every span whose name starts with this (e.g. "Step 8")
+PROFILE_STEP = os.environ.get("REV_PERF_PROFILE_STEP") or None
+
+
+def peak_rss_kb():
+    """Peak RSS in KiB since the last reset_peak_rss() (Linux), or None."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Reset the process's VmHWM high-water mark (Linux: write 5 to clear_refs)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+class _NullSpan:
+    """Returned while tracing is off: accepts row counts and records nothing."""
+    rows_in = rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed step; set `rows_in` / `rows_out` inside the `with` block."""
+
+    def __init__(self, tracer: "Tracer", name: str, rows_in=None, parent=None):
+        self.tracer, self.name, self.parent = tracer, name, parent
+        self.rows_in, self.rows_out = rows_in, None
+        self.peak_rss_kb = self.peak_traced = 0
+        # Set when a span of another thread was open at the same time
+        self.concurrent = False
+        self.thread = threading.get_ident()
+        self.profile = None
+
+    def __enter__(self):
+        if not self.tracer._open_span(self):
+            if self.parent is not None:
+                # Resetting the high-water marks below would lose the parent's peak so far
+                self.parent.peak_rss_kb = max(self.parent.peak_rss_kb, peak_rss_kb() or 0)
+                if tracemalloc.is_tracing():
+                    self.parent.peak_traced = max(self.parent.peak_traced, tracemalloc.get_traced_memory()[1])
+            reset_peak_rss()
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+        profile_step = self.tracer.profile_step
+        if profile_step and self.name.startswith(profile_step) and not self.tracer.profiling:
+            self.tracer.profiling = True
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.start, self.cpu = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall, cpu = time.perf_counter() - self.start, time.process_time() - self.cpu
+        if self.profile is not None:
+            self.profile.disable()
+            self.tracer.profiling = False
+        if not self.tracer._close_span(self):
+            self.peak_rss_kb = max(self.peak_rss_kb, peak_rss_kb() or 0)
+            if tracemalloc.is_tracing():
+                self.peak_traced = max(self.peak_traced, tracemalloc.get_traced_memory()[1])
+            if self.parent is not None:
+                self.parent.peak_rss_kb = max(self.parent.peak_rss_kb, self.peak_rss_kb)
+                self.parent.peak_traced = max(self.parent.peak_traced, self.peak_traced)
+        self.tracer._close(self, wall, cpu)
+        return False
+
+
+class Tracer:
+    """
+    Collects spans for one run. While disabled, span() returns NULL_SPAN so
+    instrumented code pays one attribute check per step.
+
+    Peak memory is process-wide, so a span gets peaks only while no other
+    thread has a span open. Spans that overlap another thread's (e.g.
+    concurrent pipeline stages) record null peaks, and the high-water marks
+    are not reset under them.
+    """
+
+    def __init__(self, mode: str = TRACE, memory: bool = TRACE_MEMORY,
+                 profile_step: str = PROFILE_STEP):
+        self.enabled = self.chrome = self.memory = False
+        self.profile_step = None
+        self.profiling = False
+        self.records = []
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+        self._current = {}
+        self._lock = threading.Lock()
+        self._open = []  # spans open in any thread
+        self.configure(mode, memory, profile_step)
+
+    def configure(self, mode=None, memory=None, profile_step=None):
+        """Update settings from flags; None keeps the current (environment) value."""
+        if mode is not None:
+            mode = str(mode).lower()
+            self.enabled = mode not in ("", "0", "off", "false")
+            self.chrome = mode == "chrome"
+        if memory is not None:
+            self.memory = memory
+        if profile_step is not None:
+            self.profile_step = profile_step
+        if self.profile_step:
+            self.enabled = True
+        if self.enabled and self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def span(self, name: str, rows_in=None):
+        if not self.enabled:
+            return NULL_SPAN
+        stack = self._local.__dict__.setdefault("stack", [])
+        return _Tracked(self, Span(self, name, rows_in, stack[-1] if stack else None), stack)
+
+    def step(self, name: str, rows_in=None):
+        """
+        Start a sequential step in flat scripts, ending the previous one
+        started here; returns the span so row counts can be set on it.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        self.end_step()
+        self._current[threading.get_ident()] = ctx = self.span(name, rows_in)
+        return ctx.__enter__()
+
+    def end_step(self):
+        ctx = self._current.pop(threading.get_ident(), None)
+        if ctx is not None:
+            ctx.__exit__(None, None, None)
+
+    def _open_span(self, span: Span) -> bool:
+        # Registers `span`; returns whether it overlaps another thread's spans
+        with self._lock:
+            if any(s.thread != span.thread for s in self._open):
+                for s in self._open:
+                    s.concurrent = True
+                span.concurrent = True
+            self._open.append(span)
+            return span.concurrent
+
+    def _close_span(self, span: Span) -> bool:
+        with self._lock:
+            self._open.remove(span)
+            return span.concurrent
+
+    def _close(self, span: Span, wall: float, cpu: float):
+        measured = not span.concurrent
+        record = {
+            "name": span.name,
+            "parent": span.parent.name if span.parent is not None else None,
+            "start_s": round(span.start - self.origin, 6),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": round(span.peak_rss_kb / 1024, 1) if measured and span.peak_rss_kb else None,
+            "peak_traced_mb": round(span.peak_traced / 2 ** 20, 1)
+            if measured and tracemalloc.is_tracing() else None,
+            "rows_in": span.rows_in,
+            "rows_out": span.rows_out,
+            "thread": threading.get_ident(),
+        }
+        if span.profile is not None:
+            record["profile"] = self._dump_profile(span)
+        self.records.append(record)
+
+    def _dump_profile(self, span: Span) -> dict:
+        out = io.StringIO()
+        pstats.Stats(span.profile, stream=out).sort_stats("cumulative").print_stats(25)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", span.name).strip("_").lower()
+        return {"slug": slug, "stats": span.profile, "top": out.getvalue()}
+
+    def write(self, output_path: str) -> list:
+        """
+        Write the trace next to `output_path` (<stem>.trace.json, plus
+        .trace.chrome.json and per-step .prof files when enabled); returns
+        the paths written.
+        """
+        self.end_step()
+        if not self.enabled or not self.records:
+            return []
+        stem = os.path.splitext(output_path)[0]
+        written = []
+        records = []
+        for r in self.records:
+            r = dict(r)
+            profile = r.pop("profile", None)
+            if profile is not None:
+                prof_path = f"{stem}.{profile['slug']}.prof"
+                profile["stats"].dump_stats(prof_path)
+                written.append(prof_path)
+                r["profile"] = {"file": os.path.basename(prof_path), "top": profile["top"]}
+            records.append(r)
+
+        written.insert(0, _write_json(f"{stem}.trace.json", {"spans": records}))
+        if self.chrome:
+            threads = {t: i for i, t in enumerate(dict.fromkeys(r["thread"] for r in records))}
+            events = [{
+                "name": r["name"], "ph": "X", "pid": os.getpid(), "tid": threads[r["thread"]],
+                "ts": int(r["start_s"] * 1e6), "dur": int(r["wall_s"] * 1e6),
+                "args": {k: r[k] for k in ("cpu_s", "peak_rss_mb", "peak_traced_mb", "rows_in", "rows_out")},
+            } for r in records]
+            written.insert(1, _write_json(f"{stem}.trace.chrome.json", {"traceEvents": events}))
+        return written
+
+
+class _Tracked:
+    """Pushes its span on the thread's stack so nested spans find their parent."""
+
+    def __init__(self, tracer: Tracer, span: Span, stack: list):
+        self.span, self.stack = span, stack
+
+    def __enter__(self):
+        self.stack.append(self.span)
+        return self.span.__enter__()
+
+    def __exit__(self, *exc):
+        self.stack.pop()
+        return self.span.__exit__(*exc)
+
+
+def _write_json(path: str, data: dict) -> str:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(data, fh, indent=1)
+    os.replace(tmp, path)
+    return path
+
+
+# Shared by every module in a run
+tracer = Tracer()
+span = tracer.span
+
+
+def configure_from_argv(argv):
+    """Apply --trace[=chrome], --trace-memory and --profile-step NAME from a raw argv."""
+    mode = next((a.partition("=")[2] or "1" for a in argv
+                 if a == "--trace" or a.startswith("--trace=")), None)
+    profile_step = argv[argv.index("--profile-step") + 1] if "--profile-step" in argv[:-1] else None
+    tracer.configure(mode, True if "--trace-memory" in argv else None, profile_step)
+
+
+def add_arguments(parser):
+    """The same flags for argparse scripts; pass the parsed args to configure_from_args()."""
+    parser.add_argument("--trace", nargs="?", const="1", default=None, metavar="chrome",
+                        help="write a per-step trace next to the output (REV_PERF_TRACE)")
+    parser.add_argument("--trace-memory", action="store_true", default=None,
+                        help="add tracemalloc peaks to the trace (REV_PERF_TRACE_MEMORY)")
+    parser.add_argument("--profile-step", default=None, metavar="NAME",
+                        help="cProfile the steps whose name starts with NAME (REV_PERF_PROFILE_STEP)")
+
+
+def configure_from_args(args):
+    tracer.configure(args.trace, args.trace_memory, args.profile_step)
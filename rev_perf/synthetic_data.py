@@ -0,0 +1,190 @@
+# synthetic_data.py
+# Schema-faithful synthetic revenue reports for benchmarking at arbitrary scale
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from .source_cache import SOURCE_COLUMNS
+
+# Real financial classes and their invoice counts in the checked-in report;
+# larger payer counts continue with numbered classes
+PAYERS = {
+    "9-EPS": 1486, "2-BCBS": 1420, "1-SELF PAY": 1140, "4-MEDICAID": 918,
+    "15-UNITED HEALTHCARE": 624, "17-AETNA": 506, "18-CIGNA": 329, "13-TRICARE": 164,
+    "20-WORK COMP": 140, "3-MEDICARE": 126, "5-COMMERCIAL": 104, "12-HUMANA": 80,
+    "99-NEEDS INFO": 5, "7-PPO": 1,
+}
+# Chart E/M Code Grouping -> second-layer labels and their shares
+EM_GROUPS = {
+    "New E/M Code": {"New Level 3": 0.25, "New Level 4": 0.6, "New Level 5": 0.12,
+                     "New PCP E/M Code": 0.03},
+    "Existing E/M Code": {"Existing Level 3": 0.25, "Existing Level 4": 0.6,
+                          "Existing Level 5": 0.12, "Existing PCP E/M Code": 0.03},
+    "Non E/M Code": {"Non E/M Code": 1.0},
+    "Medicare Wellness E/M": {"Medicare Wellness E/M": 1.0},
+}
+EM_SHARE = [0.44, 0.29, 0.27, 0.001]
+FIRST_INVOICE = 421570
+LAST_YEAR = 2025  # the model trains on this year, so it is always generated
+
+# Benchmark-tagging input (Invoice_Assigned_To_Benchmark_With_Count.xlsx)
+INVOICE_COLUMNS = list(SOURCE_COLUMNS) + [
+    "Charge Invoice Number", "Charge Amount", "Payment Amount*", "Zero Balance Collection Rate"
+]
+
+
+def _payers(n: int) -> dict:
+    payers = dict(list(PAYERS.items())[:n])
+    for i in range(len(payers), n):
+        payers[f"{i + 100}-PAYER {i}"] = 100
+    return payers
+
+
+def _em_groups(n: int) -> dict:
+    groups = dict(list(EM_GROUPS.items())[:n])
+    for i in range(len(groups), n):
+        groups[f"E/M Group {i}"] = {f"E/M Group {i} Level {j}": s
+                                    for j, s in ((3, 0.3), (4, 0.5), (5, 0.2))}
+    return groups
+
+
+def generate_invoices(years: int = 1, weeks: int = 27, payers: int = 14, em_groups: int = 4,
+                      invoices_per_week: int = 260, seed: int = 0) -> pd.DataFrame:
+    """
+    One row per invoice with every key filled in, sorted by key: `years`
+    years ending in LAST_YEAR, `weeks` ISO weeks each, and Poisson(
+    `invoices_per_week`) invoices per week spread over the payer and E/M
+    mixes of the checked-in report.
+    """
+    rng = np.random.default_rng(seed)
+    payer_counts = _payers(payers)
+    payer_labels = list(payer_counts)
+    groups = _em_groups(em_groups)
+    em_share = np.array((EM_SHARE + [0.1] * em_groups)[:em_groups])
+
+    # Key columns
+    counts = rng.poisson(invoices_per_week, size=years * weeks)
+    n = int(counts.sum())
+    period = np.repeat(np.arange(years * weeks), counts)
+    year = LAST_YEAR - years + 1 + period // weeks
+    week = period % weeks + 1
+    payer_weight = np.array(list(payer_counts.values()), dtype=float)
+    payer = rng.choice(payers, size=n, p=payer_weight / payer_weight.sum())
+    em = rng.choice(em_groups, size=n, p=em_share / em_share.sum())
+    em_labels = list(groups)
+    layer_labels = [l for v in groups.values() for l in v]
+    # Second layer: sample within the row's E/M group by its shares
+    layer_code = np.empty(n, dtype=np.int64)
+    offset = 0
+    for g, layers in enumerate(groups.values()):
+        rows = np.flatnonzero(em == g)
+        share = np.array(list(layers.values()))
+        layer_code[rows] = offset + rng.choice(len(layers), size=len(rows), p=share / share.sum())
+        offset += len(layers)
+
+    # E/M weight from the level in the second layer (none for PCP / wellness codes)
+    level = np.array([next((float(c) for c in l if c in "345"), np.nan)
+                      if "Level" in l else np.nan for l in layer_labels])[layer_code]
+    non_em = np.array([l == "Non E/M Code" for l in layer_labels])[layer_code]
+    weighted = non_em & (rng.random(n) < 0.01)
+    level[weighted] = rng.integers(1, 5, size=int(weighted.sum()))
+
+    # Charges and payments
+    base = np.where(np.isnan(level), 3.0, level)
+    charge = np.round(rng.lognormal(np.log(60 * base), 0.45), 0)
+    payer_rate = rng.uniform(0.3, 0.8, size=payers)
+    if "9-EPS" in payer_labels:
+        payer_rate[payer_labels.index("9-EPS")] = 0.08
+    payment = np.round(charge * payer_rate[payer] * rng.lognormal(0.0, 0.2, size=n), 2)
+    payment[rng.random(n) < 0.125] = np.nan
+    payment[rng.random(n) < 0.0005] = 0.0
+    open_balance = rng.random(n) < 0.13
+    balance = np.where(open_balance, np.round(charge - np.nan_to_num(payment), 2).clip(0), 0.0)
+    zero_balance = (balance == 0) & ~np.isnan(payment)
+    expected = np.where(np.isnan(payment), charge * payer_rate[payer],
+                        payment + rng.normal(40, 60, size=n)).round(2)
+
+    frame = pd.DataFrame({
+        "Year of Visit Service Date": year,
+        "ISO Week of Visit Service Date": np.array([f"W{w:02d}" for w in range(weeks + 1)],
+                                                   dtype=object)[week],
+        "Primary Financial Class": np.array(payer_labels, dtype=object)[payer],
+        "Chart E/M Code Grouping": np.array(em_labels, dtype=object)[em],
+        "Chart E/M Code Second Layer": np.array(layer_labels, dtype=object)[layer_code],
+    })
+    frame = frame.assign(**{
+        "Charge Invoice Number": 0,
+        "Charge Billed Balance": balance,
+        "Open Invoice Count": (open_balance | (rng.random(n) < 0.08)).astype(int),
+        "% of Visits w Radiology": (rng.random(n) < 0.06).astype(int),
+        "Denial %": (rng.random(n) < 0.07).astype(int),
+        # Named as the model reads it (the checked-in export says "Lab per Visit (copy)")
+        "Labs per Visit": rng.choice(6, size=n, p=[0.64, 0.155, 0.11, 0.08, 0.008, 0.007]),
+        "Procedure per Visit": (rng.random(n) < 0.03).astype(int),
+        "Visit Count": 1,
+        "Avg. Charge E/M Weight": level,
+        "Charge Amount": charge,
+        "Payment Amount*": payment,
+        "Zero Balance - Collection * Charges": np.where(zero_balance, 0.0, np.nan),
+        "Fee Schedule Expected Amount": expected,
+        "Charge Per Visit": charge,
+        "Payment per Visit": payment,
+        "NRV Zero Balance*": np.where(zero_balance, payment, np.nan),
+        "Zero Balance Collection Rate": np.where(zero_balance, payment / charge, np.nan),
+        "Collection Rate*": payment / charge,
+    })
+    keys = list(SOURCE_COLUMNS)
+    frame = frame.sort_values(keys, kind="mergesort").reset_index(drop=True)
+    frame["Charge Invoice Number"] = FIRST_INVOICE + np.cumsum(rng.integers(1, 6, size=n)) - 1
+    return frame
+
+
+def report_layout(invoices: pd.DataFrame) -> pd.DataFrame:
+    """
+    The source workbook layout: each key is shown only on the first row
+    where it or a key to its left changes, and blank below (the loader
+    forward-fills them).
+    """
+    report = invoices.copy()
+    report["Year of Visit Service Date"] = report["Year of Visit Service Date"].astype(float)
+    changed = np.zeros(len(report), dtype=bool)
+    if len(report):
+        changed[0] = True
+    for k in SOURCE_COLUMNS:
+        col = report[k]
+        changed = changed | (col != col.shift()).to_numpy()
+        report[k] = col.where(changed)
+    return report
+
+
+def invoice_assignments(invoices: pd.DataFrame) -> pd.DataFrame:
+    """The benchmark-tagging input: every key filled, Year as an integer."""
+    return invoices[INVOICE_COLUMNS].copy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic revenue report and invoice file.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--weeks", type=int, default=27)
+    parser.add_argument("--payers", type=int, default=14)
+    parser.add_argument("--em-groups", type=int, default=4)
+    parser.add_argument("--invoices-per-week", type=int, default=260)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    invoices = generate_invoices(args.years, args.weeks, args.payers, args.em_groups,
+                                 args.invoices_per_week, args.seed)
+    os.makedirs(args.out_dir, exist_ok=True)
+    source = os.path.join(args.out_dir, "v2 Rev Perf Report with Second Group Layer.xlsx")
+    report_layout(invoices).to_excel(source, index=False)
+    invoice_file = os.path.join(args.out_dir, "Invoice_Assigned_To_Benchmark_With_Count.xlsx")
+    invoice_assignments(invoices).to_excel(invoice_file, sheet_name="Sheet1", index=False)
+    print(f"{len(invoices)} synthetic invoices written to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+# weekly_model.py
+# Step functions behind final_rev_perf_weekly_model_generator v12w.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from .baselines import BASELINE_KEYS, BASELINE_WINDOW, windowed_means
+from .exporter import EXPORT_FORMATS, SUFFIXES, ExportTarget, export, export_format, format_paths, select
+from .frame_store import BINARY_ENABLED
+from .group_keys import GroupKeys
+from .metric_registry import (
+    GROUP_KEYS, aggregate, increase_good, operational_metrics,
+    revenue_cycle_metrics, zb_metrics
+)
+from .narrative_diagnostics import (
+    concat_findings, findings_frame, melt_findings, narrative_findings, render_narratives
+)
+from .regression import (
+    SEGMENT_MODES, LinearModel, SegmentedModel, fit, partition_stats, train_segments,
+    window_stats
+)
+from .step_trace import span
+
+valid_em = {"Existing E/M Code","New E/M Code"}
+priority_payers = [
+    "BCBS","AETNA","MEDICAID","SELF PAY","UNITED HEALTHCARE",
+    "CIGNA","HUMANA","TRICARE","MEDICARE"
+]
+model_feats = [
+    "Visit Count","Labs per Visit","Procedure per Visit","Avg. Charge E/M Weight",
+    "Charge Amount","Charge Billed Balance","Zero Balance - Collection * Charges",
+    "% of Remaining Charges","Zero Balance Collection Rate","Collection Rate*",
+    "Denial %","NRV Zero Balance*","% of Visits w Radiology",
+    "Payment_SD","Payment_CV","LowPayment_Rate","HighCharge_Rate"
+]
+# Invoice columns read by Step 7
+invoice_cols = GROUP_KEYS + [
+    "Payment Amount*","Tag_Low_Payment","Tag_High_Charge",
+    "Benchmark_Invoice_Count","Benchmark_Charge_Amount"
+]
+# Weeks of this year train the Expected Payments model unless a window is given
+train_year = "2025"
+zb_baseline_cols = {"Zero Balance Collection Rate":"ZBCR_Baseline","Collection Rate*":"CR_Baseline"}
+# Step 13 classes, coded by zb_classify()
+zb_labels = ["Above baseline", "Below baseline", "Collection data incomplete", "Normal range"]
+# Step 13 multipliers of the baselines: below zb_low x ZBCR, above zb_high x ZBCR or cr_high x CR
+zb_thresholds = {"zb_low": 0.75, "zb_high": 1.25, "cr_high": 1.2}
+# Steps 8–9: % Error beyond +/- this band is over/under performance
+perf_band = 2.5
+# Classes coded by perf_codes()
+perf_labels = ["Over Performed", "Under Performed", "Average Performance"]
+required_cols = [
+    "Year","Week","Visit Count","Labs per Visit","Procedure per Visit",
+    "Avg. Charge E/M Weight","Charge Amount","Charge Billed Balance",
+    "Zero Balance - Collection * Charges","% of Remaining Charges",
+    "Zero Balance Collection Rate","Collection Rate*","Denial %",
+    "NRV Zero Balance*","% of Visits w Radiology",
+    "Avg. Payment per Visit By Payor","Avg. Payments By Payor",
+    "Payment Amount*","Expected Payments","Missed Revenue (RF)","% Error (RF)",
+    "Performance Diagnostic (RF)","% Error","Performance Diagnostic",
+    "Operational - What Went Well","Operational - What Can Be Improved",
+    "Revenue Cycle - What Went Well","Revenue Cycle - What Can Be Improved",
+    "Over Performed","Under Performed","Average Performance",
+    "Volume Without Revenue Lift","Zero-Balance Collection Narrative",
+    "NRV Gap ($)","NRV Gap (%)","NRV Gap Sum ($)","Above NRV Benchmark",
+    "Payment_SD","Payment_CV","LowPayment_Rate","HighCharge_Rate"
+]
+# Exported after required_cols when segment models scored the rows
+segment_col = "Model Segment"
+# Narrative columns (Steps 10–11, then Step 13), rendered from the findings table
+zb_narrative_col = "Zero-Balance Collection Narrative"
+narrative_cols = [
+    "Operational - What Went Well","Operational - What Can Be Improved",
+    "Revenue Cycle - What Went Well","Revenue Cycle - What Can Be Improved",
+    zb_narrative_col
+]
+# "text" joins the rendered narratives onto every weekly row; "findings" exports
+# the findings table next to the results instead (--narratives / REV_PERF_NARRATIVES)
+NARRATIVE_MODES = ("text", "findings")
+NARRATIVES = os.environ.get("REV_PERF_NARRATIVES", "text")
+# Write the query service's keyed results and week narratives next to the
+# export (--query-files / REV_PERF_QUERY_FILES)
+QUERY_FILES = os.environ.get("REV_PERF_QUERY_FILES") == "1"
+QUERY_SUFFIX = SUFFIXES["arrow" if BINARY_ENABLED else "csv.gz"]
+
+
+# === Step 4: Zero-Payment Handling ===
+def prepare_source(df: pd.DataFrame) -> pd.DataFrame:
+    zero_mask = df["Payment Amount*"] == 0
+    df.loc[zero_mask, ["Payment per Visit","NRV Zero Balance*","Zero Balance Collection Rate","Collection Rate*"]] = 0
+    df.loc[zero_mask, "Zero Balance - Collection * Charges"] = df.loc[zero_mask, "Charge Billed Balance"]
+    df["% of Remaining Charges"] = np.where(
+        df["Charge Amount"] == 0,
+        np.nan,
+        df["Charge Billed Balance"] / df["Charge Amount"]
+    )
+    df.loc[~df["Group_EM"].isin(valid_em), "Avg. Charge E/M Weight"] = np.nan
+    return df
+
+
+# === Steps 5–6: Weekly Summary, Averages & NRV Gaps ===
+def summarize_weeks(df: pd.DataFrame, group_keys: GroupKeys = None):
+    """
+    Returns `(weekly, grp)`, both with row i for group id i of `group_keys`.
+    One grouping pass feeds the weekly summary, the group diagnostics
+    (Step 10) and the zero-balance narrative (Step 13), whose metrics are a
+    subset of `grp`.
+    """
+    group_keys = group_keys or GroupKeys(df)
+    stage_frames = aggregate(df, {"weekly": None, "group": None}, group_keys=group_keys)
+    weekly = stage_frames["weekly"]
+
+    # Add payer-level payment averages: mean over payers of each payer's mean
+    by_payer_keys = group_keys.subgroups(["Year","Week","Payer"])
+    by_week_keys = by_payer_keys.subgroups(["Year","Week"])
+    rows = df["Group_EM"].isin(valid_em).to_numpy() & (group_keys.ids >= 0)
+    by_payor = (
+        df.loc[rows, ["Payment per Visit","Payment Amount*"]]
+        .groupby(by_payer_keys.ids[group_keys.ids[rows]])
+        .mean()
+    )
+    by_week = by_payor.groupby(by_week_keys.ids[by_payor.index]).mean()
+    week_of_group = by_week_keys.ids[by_payer_keys.ids]
+    weekly["Avg. Payment per Visit By Payor"] = by_week["Payment per Visit"].reindex(week_of_group).to_numpy()
+    weekly["Avg. Payments By Payor"] = by_week["Payment Amount*"].reindex(week_of_group).to_numpy()
+    weekly["% of Remaining Charges"] = weekly["Charge Billed Balance"] / weekly["Charge Amount"]
+
+    weekly["NRV Gap ($)"]     = weekly["NRV Zero Balance*"] - weekly["Payment per Visit"]
+    weekly["NRV Gap (%)"]     = weekly["NRV Gap ($)"] / weekly["Payment per Visit"] * 100
+    weekly["NRV Gap Sum ($)"] = weekly["NRV Gap ($)"] * weekly["Visit Count"]
+    weekly["Above NRV Benchmark"] = (weekly["Payment per Visit"] > weekly["NRV Zero Balance*"]).astype(int)
+    return weekly, stage_frames["group"]
+
+
+# === Step 7: Invoice-Level Variation Features ===
+def invoice_features(inv: pd.DataFrame, group_keys: GroupKeys) -> pd.DataFrame:
+    """Invoice features with row i for group id i of `group_keys` (NaN without invoices)."""
+    inv = inv.assign(Year=inv["Year"].astype(str))  # keys are strings in `weekly`
+    ids = group_keys.encode(inv)
+    inv_group = (
+        inv[ids >= 0]
+        .groupby(ids[ids >= 0])
+        .agg(
+            Payment_SD              = ("Payment Amount*","std"),
+            LowPayment_Rate         = ("Tag_Low_Payment","mean"),
+            HighCharge_Rate         = ("Tag_High_Charge","mean"),
+            Benchmark_Invoice_Count = ("Benchmark_Invoice_Count","first"),
+            Benchmark_Charge_Amount = ("Benchmark_Charge_Amount","first")
+        )
+    )
+    inv_group["Payment_CV"] = inv_group["Payment_SD"] / inv_group["Benchmark_Charge_Amount"]
+    return inv_group.reindex(pd.RangeIndex(group_keys.n))
+
+
+# === Steps 8–9: Regression Modeling & Performance Classification ===
+def classify_perf(e, band=perf_band):
+    if e > band:   return "Over Performed"
+    if e < -band:  return "Under Performed"
+    return "Average Performance"
+
+
+def perf_codes(err, band=perf_band) -> np.ndarray:
+    """classify_perf() over an array of % errors, as indexes into perf_labels."""
+    return np.select([err > band, err < -band], [0, 1], default=2)
+
+
+def perf_classes(err, band=perf_band) -> np.ndarray:
+    """Labels of perf_codes()."""
+    return np.array(perf_labels, dtype=object)[perf_codes(np.asarray(err, dtype=float), band)]
+
+
+def regression_partitions(weekly: pd.DataFrame, segment_keys=(), features=model_feats) -> dict:
+    """Per-(Year, Week[, *segment_keys]) regression statistics of `weekly` as training rows."""
+    # Zero-charge groups give infinite ratios; impute them like missing values
+    X = weekly[features].replace([np.inf, -np.inf], np.nan)
+    # Null out self-pay rows for revenue-cycle metrics
+    self_pay = weekly["Payer"].str.upper() == "SELF PAY"
+    for col in revenue_cycle_metrics:
+        if col in X.columns:
+            X.loc[self_pay, col] = np.nan
+    return partition_stats(
+        X.to_numpy(dtype=float), weekly["Payment Amount*"].to_numpy(dtype=float),
+        weekly[["Year","Week", *segment_keys]]
+    )
+
+
+def train_model(parts: dict, train_weeks=None, features=model_feats) -> LinearModel:
+    """
+    Fit on the partitions in `train_weeks` (default: every week of
+    `train_year`); `features` are the columns `parts` were built from.
+    """
+    if train_weeks is None:
+        train_weeks = [w for w in parts if w[0] == train_year]
+    return fit(window_stats(parts, train_weeks), features, train_weeks)
+
+
+def train_segment_models(weekly: pd.DataFrame, segments: str, fallback: LinearModel,
+                         train_weeks=None) -> SegmentedModel:
+    """
+    One model per segment of SEGMENT_MODES[`segments`] over `fallback`'s
+    features; thin segments use `fallback`.
+    """
+    segment_keys = SEGMENT_MODES[segments]
+    parts = regression_partitions(weekly, segment_keys, fallback.features)
+    if train_weeks is None:
+        train_weeks = {k[:2] for k in parts if k[0] == train_year}
+    return train_segments(parts, fallback.features, segment_keys, fallback, train_weeks)
+
+
+def fit_expected_payments(weekly: pd.DataFrame, model=None, parts: dict = None,
+                          train_weeks=None, save_model: str = None,
+                          segments: str = None) -> pd.DataFrame:
+    """
+    Score `weekly` with `model`, or with a model trained on `train_weeks` from
+    the partition statistics `parts` (built from `weekly` when not given).
+    With `segments` ("payer" or "payer_em") the trained model is split per
+    segment and `segment_col` records which model scored each row.
+    """
+    if model is None:
+        model = train_model(parts if parts is not None else regression_partitions(weekly), train_weeks)
+        if segments:
+            model = train_segment_models(weekly, segments, model, train_weeks)
+    if save_model:
+        model.save(save_model)
+    weekly["Expected Payments"] = model.predict(weekly)
+    weekly["Missed Revenue (RF)"] = weekly["Payment Amount*"] - weekly["Expected Payments"]
+    weekly["% Error (RF)"] = weekly["Missed Revenue (RF)"] / weekly["Expected Payments"] * 100
+    weekly["Performance Diagnostic (RF)"] = perf_classes(weekly["% Error (RF)"])
+
+    weekly["% Error"] = weekly["Missed Revenue (RF)"] / weekly["Expected Payments"] * 100
+    weekly["Performance Diagnostic"] = perf_classes(weekly["% Error"])
+    if isinstance(model, SegmentedModel):
+        weekly[segment_col] = model.labels(weekly)
+    return weekly
+
+
+# === Steps 10–11: Operational & Revenue Cycle Narrative Diagnostics ===
+def group_baseline_rows(grp: pd.DataFrame, window=BASELINE_WINDOW) -> pd.DataFrame:
+    """
+    Each group-week's Step 10 baselines over `window` (see
+    baselines.BASELINE_WINDOW); self-pay rows are excluded from
+    revenue-cycle baselines.
+    """
+    metrics = [c for c in grp.columns if c not in GROUP_KEYS]
+    return windowed_means(grp, metrics, window, null_self_pay=revenue_cycle_metrics)
+
+
+def diagnostic_findings(grp: pd.DataFrame, hist_avg: pd.DataFrame) -> pd.DataFrame:
+    """
+    The findings table (see narrative_diagnostics) of the four Step 10–11
+    narratives; `hist_avg` holds each row's baselines (see group_baseline_rows).
+    """
+    findings, weeks = melt_findings(
+        grp, operational_metrics | revenue_cycle_metrics, increase_good, priority_payers,
+        avg=hist_avg
+    )
+    op = narrative_findings(
+        findings, weeks, operational_metrics,
+        "Operational - What Went Well", "Operational - What Can Be Improved",
+        enforce_visit=True
+    )
+    rc = narrative_findings(
+        findings, weeks, revenue_cycle_metrics,
+        "Revenue Cycle - What Went Well", "Revenue Cycle - What Can Be Improved"
+    )
+    return concat_findings([op, rc])
+
+
+# === Step 12: Boolean Diagnostic Flags ===
+def flag_performance(weekly: pd.DataFrame) -> pd.DataFrame:
+    weekly["Over Performed"] = (weekly["Performance Diagnostic"] == "Over Performed").astype(int)
+    weekly["Under Performed"] = (weekly["Performance Diagnostic"] == "Under Performed").astype(int)
+    weekly["Average Performance"] = (weekly["Performance Diagnostic"] == "Average Performance").astype(int)
+    weekly["Volume Without Revenue Lift"] = (
+        (weekly["Visit Count"] > weekly["Visit Count"].mean()) &
+        (weekly["Over Performed"] == 0)
+    ).astype(int)
+    return weekly
+
+
+# === Step 13: Zero-Balance Collection Narrative (Detailed) ===
+def zb_baseline_rows(zb_grp: pd.DataFrame, window=BASELINE_WINDOW) -> pd.DataFrame:
+    return windowed_means(zb_grp, zb_metrics, window).rename(columns=zb_baseline_cols)
+
+
+def zb_classify(zb, cr, zb_bl, cr_bl, zb_low=zb_thresholds["zb_low"],
+                zb_high=zb_thresholds["zb_high"], cr_high=zb_thresholds["cr_high"]) -> np.ndarray:
+    """
+    Index into zb_labels for each row, from float arrays of the rates and
+    their baselines (broadcast against each other).
+    """
+    incomplete = np.isnan(zb) | np.isnan(zb_bl) | np.isnan(cr) | np.isnan(cr_bl)
+    return np.select(
+        [incomplete, zb < zb_low * zb_bl, (zb > zb_high * zb_bl) | (zb > cr_high * cr_bl)],
+        [2, 1, 0], default=3
+    )
+
+
+def zb_findings(zb_grp: pd.DataFrame, zb_base: pd.DataFrame) -> pd.DataFrame:
+    """
+    The findings table of the Zero-Balance Collection Narrative: each group
+    row's class with its rate and baseline, ranked within the week in the
+    sorted order of the "Payer – Group_EM – Group_EM2 – label" texts (distinct
+    texts only). Each text is built once per distinct combination.
+    `zb_base` holds each row's baselines (see zb_baseline_rows).
+    """
+    zb, cr, zb_bl, cr_bl = (
+        frame[col].to_numpy(dtype=float) for frame, col in (
+            (zb_grp, "Zero Balance Collection Rate"), (zb_grp, "Collection Rate*"),
+            (zb_base, "ZBCR_Baseline"), (zb_base, "CR_Baseline"))
+    )
+    codes = zb_classify(zb, cr, zb_bl, cr_bl)
+    combos = GroupKeys(zb_grp[BASELINE_KEYS].reset_index(drop=True).assign(label=codes),
+                       BASELINE_KEYS + ["label"])
+    texts = np.array([
+        f"{payer} – {em} – {em2} – {zb_labels[label]}"
+        for payer, em, em2, label in combos.table.itertuples(index=False, name=None)
+    ], dtype=object)
+    order = np.argsort(texts, kind="stable")
+    rank = np.empty(combos.n, dtype=np.int64)
+    rank[order] = np.arange(combos.n)
+
+    # Distinct (week, text) pairs in (week, text) order, each from its first row
+    weeks = GroupKeys(zb_grp, ["Year","Week"])
+    valid = (weeks.ids >= 0) & (combos.ids >= 0)
+    pairs, first = np.unique(weeks.ids[valid] * max(combos.n, 1) + rank[combos.ids[valid]],
+                             return_index=True)
+    rows = np.flatnonzero(valid)[first]
+    wk = pairs // max(combos.n, 1)
+    out = weeks.table.iloc[wk].reset_index(drop=True)
+    for col in BASELINE_KEYS:
+        out[col] = zb_grp[col].to_numpy()[rows]
+    out["narrative"] = zb_narrative_col
+    out["metric"] = "Zero Balance Collection Rate"
+    out["avg"], out["act"] = zb_bl[rows], zb[rows]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["pct"] = np.abs((zb[rows] - zb_bl[rows]) / zb_bl[rows]) * 100
+    out["increased"] = zb[rows] > zb_bl[rows]
+    out["rank"] = np.arange(len(pairs)) - np.searchsorted(wk, wk)
+    out["label"] = np.array(zb_labels, dtype=object)[codes[rows]]
+    return findings_frame(out)
+
+
+def attach_narratives(weekly: pd.DataFrame, findings: pd.DataFrame) -> pd.DataFrame:
+    """`weekly` with each week's rendered narrative_cols (see render_narratives)."""
+    with span("Steps 10–13: Render Narratives", rows_in=len(findings)) as s:
+        text = render_narratives(findings, GroupKeys(weekly, ["Year","Week"]).table, narrative_cols)
+        weekly = weekly.merge(text, on=["Year","Week"], how="left")
+        s.rows_out = len(weekly)
+    return weekly
+
+
+def finalize_weekly(weekly: pd.DataFrame, **model_args) -> pd.DataFrame:
+    """
+    Steps 8–9 and 12 on a complete weekly frame; `model_args` go to
+    fit_expected_payments().
+    """
+    with span("Steps 8–9: Regression & Performance Classification", rows_in=len(weekly)) as s:
+        weekly = fit_expected_payments(weekly, **model_args)
+        s.rows_out = len(weekly)
+    with span("Step 12: Performance Flags", rows_in=len(weekly)) as s:
+        weekly = flag_performance(weekly)
+        s.rows_out = len(weekly)
+    return weekly
+
+
+def weekly_features(df: pd.DataFrame, inv: pd.DataFrame):
+    """Steps 5–7: `(weekly, grp)` as summarize_weeks(), with the invoice features joined on."""
+    with span("Steps 5–6: Weekly Summary & Averages", rows_in=len(df)) as s:
+        group_keys = GroupKeys(df)
+        weekly, grp = summarize_weeks(df, group_keys)
+        s.rows_out = len(weekly)
+    with span("Step 7: Invoice-Level Features", rows_in=len(inv)) as s:
+        weekly = weekly.join(invoice_features(inv, group_keys))
+        s.rows_out = len(weekly)
+    return weekly, grp
+
+
+def build_results(df: pd.DataFrame, inv: pd.DataFrame, baseline=BASELINE_WINDOW,
+                  **model_args):
+    """
+    Steps 5–13 over the full history of a prepared source frame:
+    `(weekly, findings)`, the weekly rows without narrative text and the
+    findings table of their narratives against `baseline` windows.
+    """
+    weekly, grp = weekly_features(df, inv)
+    with span("Steps 10–11: Narrative Diagnostics", rows_in=len(grp)) as s:
+        diag = diagnostic_findings(grp, group_baseline_rows(grp, baseline))
+        s.rows_out = len(diag)
+    with span("Step 13: Zero-Balance Collection Narrative", rows_in=len(grp)) as s:
+        zb_grp = grp[GROUP_KEYS + zb_metrics]
+        zb = zb_findings(zb_grp, zb_baseline_rows(zb_grp, baseline))
+        s.rows_out = len(zb)
+    return finalize_weekly(weekly, **model_args), concat_findings([diag, zb])
+
+
+def build_weekly(df: pd.DataFrame, inv: pd.DataFrame, baseline=BASELINE_WINDOW,
+                 **model_args) -> pd.DataFrame:
+    """build_results() with the narratives rendered onto the weekly rows."""
+    return attach_narratives(*build_results(df, inv, baseline, **model_args))
+
+
+# === Step 14: Export Validation & Final Export ===
+def findings_path(out_file: str) -> str:
+    """`<stem>_findings<suffix>` next to the results file `out_file`."""
+    suffix = SUFFIXES[export_format(out_file)]
+    return out_file[:-len(suffix)] + "_findings" + suffix
+
+
+def _weekly_target(path: str, findings: bool) -> ExportTarget:
+    columns = [c for c in required_cols if not (findings and c in narrative_cols)]
+    return ExportTarget(path, "weekly", columns, [segment_col])
+
+
+def weekly_export_spec(out_file: str, formats=None, findings: bool = False) -> list:
+    """
+    Step 14 targets: the validated export columns in each of `formats`
+    (EXPORT_FORMATS); with `findings`, the findings table replaces the
+    narrative text columns and is written to findings_path() in each format.
+    """
+    paths = format_paths(out_file, formats or EXPORT_FORMATS)
+    spec = [_weekly_target(path, findings) for path in paths]
+    if findings:
+        spec += [ExportTarget(findings_path(path), "findings") for path in paths]
+    return spec
+
+
+def export_frame(weekly: pd.DataFrame) -> pd.DataFrame:
+    findings = not any(c in weekly.columns for c in narrative_cols)
+    return select(weekly, _weekly_target("weekly.xlsx", findings))
+
+
+def query_path(out_file: str, name: str) -> str:
+    """
+    Where the query service's `name` file ("keyed" or "narratives") is kept
+    for the results file `out_file`: `<stem>_<name>` less any _NoPayer, as
+    zstd Arrow (gzipped CSV without pyarrow).
+    """
+    suffix = SUFFIXES[export_format(out_file)]
+    return out_file[:-len(suffix)].removesuffix("_NoPayer") + f"_{name}" + QUERY_SUFFIX
+
+
+def keyed_frame(weekly: pd.DataFrame) -> pd.DataFrame:
+    """
+    GROUP_KEYS and the numeric export_frame() columns, so results can be
+    looked up by payer and E/M group; text is served from narrative_frame()
+    or the findings table instead of being repeated on every row.
+    """
+    frame = export_frame(weekly)
+    numeric = frame.drop(columns=[k for k in GROUP_KEYS if k in frame.columns]).select_dtypes(["number", "bool"])
+    return pd.concat([weekly[GROUP_KEYS], numeric], axis=1)
+
+
+def narrative_frame(weekly: pd.DataFrame) -> pd.DataFrame:
+    """One row per (Year, Week) of `weekly` with its narrative_cols (see attach_narratives)."""
+    return weekly[["Year","Week"] + narrative_cols].drop_duplicates(["Year","Week"]).reset_index(drop=True)
+
+
+def query_frames(weekly: pd.DataFrame, out_file: str) -> dict:
+    """The query service's files for `weekly` exported as `out_file`: {path: frame}."""
+    frames = {query_path(out_file, "keyed"): keyed_frame(weekly)}
+    if all(c in weekly.columns for c in narrative_cols):
+        frames[query_path(out_file, "narratives")] = narrative_frame(weekly)
+    return frames
+
+
+def export_weekly(weekly: pd.DataFrame, out_file: str, formats=None,
+                  findings: pd.DataFrame = None) -> list:
+    """Step 14; pass the findings table of a build_results() run to export it instead of text."""
+    frames = {"weekly": weekly} if findings is None else {"weekly": weekly, "findings": findings}
+    return export(frames, weekly_export_spec(out_file, formats, findings is not None))
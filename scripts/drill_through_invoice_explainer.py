@@ -1,29 +1,10 @@
 # drill_through_invoice_explainer.py
+# Kept so `python drill_through_invoice_explainer.py` and `from drill_through_invoice_explainer
+# import DrillThroughExplainer` still work from scripts/, next to the data files; the code lives
+# in the rev_perf package (rev_perf/drill_through_invoice_explainer.py).
+import os
+import sys
 
-import pandas as pd
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-class DrillThroughExplainer:
-    """
-    Utility for drilling from summary-level metrics to invoice-level data.
-    """
-
-    def __init__(self, invoice_index_path: str):
-        self.df_inv = pd.read_csv(invoice_index_path)
-
-    def get_invoice_details(self, year: int, week: int, payer: str,
-                            group_em: str, group_em2: str) -> pd.DataFrame:
-        mask = (
-            (self.df_inv['Year'] == year) &
-            (self.df_inv['Week'] == week) &
-            (self.df_inv['Payer'] == payer) &
-            (self.df_inv['Group_EM'] == group_em) &
-            (self.df_inv['Group_EM2'] == group_em2)
-        )
-        return self.df_inv[mask]
-
-    def export_invoice_details(self, year: int, week: int, payer: str,
-                               group_em: str, group_em2: str,
-                               output_csv: str):
-        df_details = self.get_invoice_details(year, week, payer, group_em, group_em2)
-        df_details.to_csv(output_csv, index=False)
-        print(f"Exported {len(df_details)} invoices to {output_csv}")
+from rev_perf.drill_through_invoice_explainer import KEY_COLUMNS, DrillThroughExplainer  # noqa: E402,F401
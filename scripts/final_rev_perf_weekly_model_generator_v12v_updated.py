@@ -1,38 +1,12 @@
-# === final_rev_perf_weekly_model_generator_v12v_updated.py ===
+# final_rev_perf_weekly_model_generator_v12v_updated.py
+# Kept so `python final_rev_perf_weekly_model_generator_v12v_updated.py` still works from scripts/, next to
+# the data files; the code lives in the rev_perf package (rev_perf/final_rev_perf_weekly_model_generator_v12v_updated.py).
 import os
-import pandas as pd
+import sys
 
-# === Step 0: File Paths ===
-SOURCE_FILE = "v2 Rev Perf Report with Second Group Layer(1).xlsx"
-if not os.path.isfile(SOURCE_FILE):
-    raise FileNotFoundError(f"Error: File not found: {SOURCE_FILE}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# === Step 1: Read & Normalize Data ===
-df = pd.read_excel(SOURCE_FILE, sheet_name='Sheet 1')
-df = df.rename(columns={
-    'Year of Visit Service Date': 'Year',                         # Calendar year of visit
-    'ISO Week of Visit Service Date': 'Week',                    # ISO-standard week number
-    'Primary Financial Class': 'Payer',                          # Primary insurance class
-    'Chart E/M Code Grouping': 'Group_EM',                       # Primary E/M code bucket
-    'Chart E/M Code Second Layer': 'Group_EM2'                   # More granular E/M level
-})
-df['Year'] = df['Year'].astype(int)
-df['Week'] = df['Week'].str.replace('W', '').astype(int)
+from rev_perf.final_rev_perf_weekly_model_generator_v12v_updated import main  # noqa: E402
 
-# === Step 2: Aggregate Weekly Summary ===
-weekly_summary = (
-    df
-    .groupby(['Year', 'Week', 'Payer', 'Group_EM', 'Group_EM2'])
-    .agg({
-        'Charge Amount': 'sum',                     # Total billed charges
-        'Payment Amount*': 'sum',                   # Total payments collected
-        'Zero Balance Collection Rate': 'mean',     # Avg. zero-balance collection rate
-        'NRV Zero Balance*': 'sum',                 # Net Revenue collected from zero balances
-        'Visit Count': 'sum'                        # Count of visits
-    })
-    .reset_index()
-)
-
-# === Step 3: Export Weekly Summary ===
-weekly_summary.to_csv('weekly_summary_with_layer2.csv', index=False)
-print("Weekly summary with second E/M layer exported to weekly_summary_with_layer2.csv")
+if __name__ == "__main__":
+    main()
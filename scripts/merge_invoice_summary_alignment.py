@@ -1,18 +1,12 @@
 # merge_invoice_summary_alignment.py
+# Kept so `python merge_invoice_summary_alignment.py` still works from scripts/, next to
+# the data files; the code lives in the rev_perf package (rev_perf/merge_invoice_summary_alignment.py).
+import os
+import sys
 
-import pandas as pd
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Load inputs
-invoices  = pd.read_csv("invoice_level_index.csv")
-summaries = pd.read_csv("weekly_summary_with_layer2.csv")
+from rev_perf.merge_invoice_summary_alignment import main  # noqa: E402
 
-# Merge on five keys
-keys = ['Year','Week','Payer','Group_EM','Group_EM2']
-merged = invoices.merge(
-    summaries[keys + ['Payment Amount*']],
-    on=keys, how='left', suffixes=('','_Summary')
-)
-
-# Export final drill-aligned file
-merged.to_csv("invoice_with_weekly_summary_joined.csv", index=False)
-print("Merged invoice-to-summary output written to invoice_with_weekly_summary_joined.csv")
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import express from 'express';
+import fs from 'fs';
 import path from 'path';
 import { fileURLToPath } from 'url';
 
@@ -8,6 +9,23 @@ const __dirname = path.dirname(__filename);
 const app = express();
 const PORT = process.env.PORT || 3000;
 
+// Dashboard feed (rev_perf/dashboard_feed.py): serve the precompressed copy the
+// client accepts; hashed chunks never change, the manifest is always revalidated
+const FEED_ENCODINGS = [['br', '.br'], ['gzip', '.gz']];
+app.get('/data/feed/:file', (req, res, next) => {
+    const file = path.join(__dirname, 'data', 'feed', path.basename(req.params.file));
+    if (!file.endsWith('.json')) return next();
+    res.set('Cache-Control', req.params.file === 'manifest.json'
+        ? 'no-cache' : 'public, max-age=31536000, immutable');
+    res.vary('Accept-Encoding');
+    const match = FEED_ENCODINGS.find(([enc, suffix]) =>
+        req.acceptsEncodings(enc) === enc && fs.existsSync(file + suffix));
+    if (!match) return res.sendFile(file, err => err && next());
+    res.set('Content-Encoding', match[0]);
+    res.type('application/json');
+    res.sendFile(file + match[1], err => err && next());
+});
+
 // Serve static files from the current directory
 app.use(express.static(__dirname));
 
@@ -0,0 +1,55 @@
+# test_group_stats.py
+# QuantileSketch against the exact group_stats()
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rev_perf.group_stats import QuantileSketch, group_stats
+
+COLUMNS = {"median": ("X", "median"), "p10": ("X", "p10"), "p90": ("X", "p90"), "mad": ("X", "mad")}
+QUANTILES = ["median", "p10", "p90"]
+
+
+def _frame(n: int, groups: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"G": rng.integers(groups, size=n), "X": rng.lognormal(3, 1, n)})
+
+
+def _sketch(frame: pd.DataFrame, capacity: int, chunksize: int, seed: int = 0) -> QuantileSketch:
+    sketch = QuantileSketch(["G"], ["X"], capacity, seed)
+    for start in range(0, len(frame), chunksize):
+        sketch.update(frame.iloc[start:start + chunksize])
+    return sketch
+
+
+@pytest.mark.parametrize("chunksize", [100, 1_000, 20_000])
+def test_sketch_rank_error(chunksize):
+    """Sketch quantiles rank within 2.5 * total / capacity of the exact ones, for any batch size."""
+    capacity = 128
+    for seed in range(3):
+        frame = _frame(20_000, 3, seed)
+        approx = _sketch(frame, capacity, chunksize, seed).stats(COLUMNS).set_index("G")
+        exact = group_stats(frame, ["G"], COLUMNS).set_index("G")
+        for g, values in frame.groupby("G")["X"]:
+            values = np.sort(values.to_numpy())
+            bound = 2.5 * len(values) / capacity
+            for stat in QUANTILES:
+                error = abs(np.searchsorted(values, approx.loc[g, stat], side="right")
+                            - np.searchsorted(values, exact.loc[g, stat], side="right"))
+                assert error <= bound, (seed, g, stat, error, bound)
+
+
+def test_sketch_memory_is_bounded():
+    """Each group keeps fewer than 3 * capacity values however much it has seen."""
+    capacity = 64
+    sketch = _sketch(_frame(50_000, 4, 0), capacity, 700)
+    assert sketch._parts["X"].groupby("G").size().max() < 3 * capacity
+
+
+def test_sketch_is_exact_below_capacity():
+    """Groups that never overflow give exactly group_stats()."""
+    frame = _frame(1_000, 10, 0)
+    approx = _sketch(frame, 256, 97).stats(COLUMNS)
+    exact = group_stats(frame, ["G"], COLUMNS)
+    pd.testing.assert_frame_equal(approx.reset_index(drop=True), exact.reset_index(drop=True))
@@ -0,0 +1,82 @@
+# test_incremental_refresh.py
+# refresh_results over saved state against a full build_results run
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rev_perf import final_rev_perf_weekly_model_generator_v12v_updated as summary
+from rev_perf import interactive_benchmark_code_v2 as benchmark
+from rev_perf import merge_invoice_summary_alignment as alignment
+from rev_perf import synthetic_data
+from rev_perf.group_keys import GROUP_KEYS
+from rev_perf.incremental_refresh import refresh_results
+from rev_perf.source_cache import normalize_source
+from rev_perf.weekly_model import attach_narratives, build_results, invoice_cols, prepare_source
+
+WINDOWS = ["all", "trailing:4", "yoy"]
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    """A normalized two-year report and the merged invoices the model reads."""
+    invoices = synthetic_data.generate_invoices(years=2, weeks=8, payers=5, em_groups=3,
+                                                invoices_per_week=60, seed=0)
+    source = normalize_source(synthetic_data.report_layout(invoices))
+    tagged = benchmark.tag_invoices(synthetic_data.invoice_assignments(invoices))
+    weekly = summary.weekly_summary(source.copy())
+    merged = alignment.merge_alignment(tagged, weekly[alignment.keys + ["Payment Amount*"]])
+    return source, merged[invoice_cols]
+
+
+def _weeks(frame: pd.DataFrame) -> pd.MultiIndex:
+    return pd.MultiIndex.from_arrays([frame["Year"].astype(str), frame["Week"].astype(int)])
+
+
+def _without_last_week(source: pd.DataFrame, inv: pd.DataFrame):
+    last = _weeks(source).max()
+    return source[_weeks(source) != last], inv[_weeks(inv) != last]
+
+
+def _refresh(source, inv, state_dir, baseline):
+    return attach_narratives(*refresh_results(prepare_source(source.copy()), inv, state_dir, baseline))
+
+
+def _assert_matches_full(source, inv, refreshed, baseline):
+    full = attach_narratives(*build_results(prepare_source(source.copy()), inv, baseline))
+    full, refreshed = (f.astype({"Year": str}).sort_values(GROUP_KEYS, kind="mergesort")
+                       .reset_index(drop=True) for f in (full, refreshed))
+    assert list(refreshed.columns) == list(full.columns)
+    for col in full.columns:
+        if pd.api.types.is_numeric_dtype(full[col].dtype):
+            np.testing.assert_allclose(refreshed[col].to_numpy(dtype=float),
+                                       full[col].to_numpy(dtype=float), rtol=1e-9, err_msg=col)
+        else:
+            assert (refreshed[col].fillna("").astype(str) == full[col].fillna("").astype(str)).all(), col
+
+
+@pytest.mark.parametrize("baseline", WINDOWS)
+def test_new_week(inputs, tmp_path, baseline):
+    source, inv = inputs
+    _refresh(*_without_last_week(source, inv), tmp_path, baseline)
+    _assert_matches_full(source, inv, _refresh(source, inv, tmp_path, baseline), baseline)
+
+
+@pytest.mark.parametrize("baseline", WINDOWS)
+def test_replaced_week(inputs, tmp_path, baseline):
+    source, inv = inputs
+    _refresh(source, inv, tmp_path, baseline)
+    revised = source.copy()
+    week = _weeks(revised).unique()[3]
+    rows = np.flatnonzero(_weeks(revised) == week)[:5]
+    revised.iloc[rows, revised.columns.get_loc("Charge Amount")] += 50
+    revised.iloc[rows, revised.columns.get_loc("Payment Amount*")] *= 0.5
+    _assert_matches_full(revised, inv, _refresh(revised, inv, tmp_path, baseline), baseline)
+
+
+@pytest.mark.parametrize("baseline", WINDOWS[1:])
+def test_window_change(inputs, tmp_path, baseline):
+    """State saved for another baseline window is not reused."""
+    source, inv = inputs
+    _refresh(*_without_last_week(source, inv), tmp_path, "all")
+    _assert_matches_full(source, inv, _refresh(source, inv, tmp_path, baseline), baseline)
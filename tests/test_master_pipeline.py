@@ -0,0 +1,49 @@
+# test_master_pipeline.py
+# Stage code fingerprints must cover every package module a stage can run
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from rev_perf.master_pipeline import STAGES
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _loaded_files(modules: list) -> set:
+    # Package files loaded by importing `modules` in a fresh interpreter,
+    # less those `import rev_perf` loads by itself
+    code = (
+        "import importlib, json, sys\n"
+        "import rev_perf\n"
+        "base = set(sys.modules)\n"
+        f"for m in {modules!r}: importlib.import_module(m)\n"
+        "print(json.dumps(sorted(getattr(sys.modules[m], '__file__', None) or ''\n"
+        "                        for m in set(sys.modules) - base if m.startswith('rev_perf.'))))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True,
+                         check=True).stdout
+    return set(json.loads(out))
+
+
+@pytest.mark.parametrize("stage", STAGES, ids=lambda s: s.name)
+def test_stage_code_covers_its_imports(stage):
+    """Importing the modules in a stage's code list loads no package module missing from it."""
+    # master_pipeline.py is listed for the stage functions; it imports every stage's code
+    modules = [f"rev_perf.{os.path.splitext(os.path.basename(p))[0]}" for p in stage.code
+               if os.path.basename(p) != "master_pipeline.py"]
+    missing = _loaded_files(modules) - set(stage.code)
+    assert not missing, f"{stage.name} stage code is missing {sorted(missing)}"
+
+
+def test_stage_code_includes_indirect_imports():
+    """Modules reached only through other modules are fingerprinted with the stage."""
+    code = {s.name: {os.path.basename(p) for p in s.code} for s in STAGES}
+    assert {"regression.py", "baselines.py", "group_keys.py", "exporter.py",
+            "step_trace.py"} <= code["model"]
+    assert {"group_stats.py", "frame_store.py"} <= code["benchmark"]
+    for name in ("merge", "weekly_summary"):
+        assert {"frame_store.py", "partition_store.py"} <= code[name]
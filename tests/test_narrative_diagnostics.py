@@ -0,0 +1,141 @@
+# test_narrative_diagnostics.py
+# Vectorized Step 10–11 narratives against the iterrows loops they replaced
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rev_perf.metric_registry import increase_good, operational_metrics, revenue_cycle_metrics
+from rev_perf.narrative_diagnostics import melt_findings, narrative_findings, render_narratives
+from rev_perf.weekly_model import priority_payers
+
+OP = ("Operational - What Went Well", "Operational - What Can Be Improved")
+RC = ("Revenue Cycle - What Went Well", "Revenue Cycle - What Can Be Improved")
+
+
+# --- The v12w loops, with metrics visited in increase_good order rather than set order ---
+def _prioritized_top6(lst):
+    seen = {}
+    for pct, txt in lst:
+        key = txt.split("from avg")[0].strip()
+        payer_prefix = key.split("–")[0].strip().upper()
+        prio = priority_payers.index(payer_prefix) if payer_prefix in priority_payers else len(priority_payers)
+        if key not in seen or (prio, -pct) < seen[key][0]:
+            seen[key] = ((prio, -pct), txt)
+    return [v[1] for v in sorted(seen.values(), key=lambda x: x[0])[:6]]
+
+
+def _enforce_visit(lst):
+    v = [e for e in lst if "Visit Count" in e[1] and e[0] >= 5]
+    if not v:
+        return _prioritized_top6(lst)
+    best = max(v, key=lambda x: x[0])
+    rest = [e for e in lst if e[1] != best[1]]
+    return [best[1]] + _prioritized_top6(rest)[:5]
+
+
+def _iterrows_narratives(gw: pd.DataFrame, metrics, cols, select) -> pd.DataFrame:
+    records = []
+    for (yr, wk), sub in gw.groupby(["Year", "Week"]):
+        good, bad = [], []
+        for _, r in sub.iterrows():
+            for m in [m for m in increase_good if m in metrics and m in r.index]:
+                act, avg = r[m], r[f"{m}_Avg"]
+                if pd.isna(act) or pd.isna(avg) or avg == 0:
+                    continue
+                delta = act - avg
+                pct = abs(delta / avg) * 100
+                txt = f"{r['Payer']} – {r['Group_EM']} {m} {'increased' if delta>0 else 'decreased'} from avg {avg:.2f} to {act:.2f}"
+                inc_ok = (delta>0 and increase_good[m]) or (delta<0 and not increase_good[m])
+                if m == "Zero Balance - Collection * Charges" and avg < 0 and act >= 0:
+                    inc_ok = act == 0
+                (good if inc_ok else bad).append((pct, txt))
+        records.append({"Year": yr, "Week": wk,
+                        cols[0]: "; ".join(select(good)), cols[1]: "; ".join(select(bad))})
+    return pd.DataFrame(records)
+
+
+def _vectorized_narratives(gw: pd.DataFrame) -> pd.DataFrame:
+    findings, weeks = melt_findings(gw, operational_metrics | revenue_cycle_metrics,
+                                    increase_good, priority_payers)
+    op = narrative_findings(findings, weeks, operational_metrics, *OP, enforce_visit=True)
+    rc = narrative_findings(findings, weeks, revenue_cycle_metrics, *RC)
+    return pd.concat([render_narratives(op, weeks, OP), render_narratives(rc, weeks, RC)[list(RC)]], axis=1)
+
+
+def _fixed_week() -> pd.DataFrame:
+    """
+    One week with eleven good operational findings: a 6% Visit Count move from
+    a low-priority payer, BCBS keys repeated across Group_EM2 rows and two
+    BCBS Charge Amount findings tied at 10%.
+    """
+    rows = [
+        # Payer, Group_EM, Group_EM2, Visit Count, Charge Amount, Labs per Visit
+        ("MEDICARE", "New", "A", 106, 1010, 2.1),
+        ("BCBS", "New", "A", 103, 1100, 1.9),
+        ("BCBS", "Existing", "A", 99, 1100, 1.8),
+        ("BCBS", "New", "B", 98, 1050, 1.5),
+        ("AETNA", "New", "A", 97, 1500, 1.6),
+        ("OTHER – West", "New", "A", 101, 1300, 2.2),
+    ]
+    gw = pd.DataFrame(rows, columns=["Payer", "Group_EM", "Group_EM2",
+                                     "Visit Count", "Charge Amount", "Labs per Visit"])
+    gw.insert(0, "Week", 1)
+    gw.insert(0, "Year", "2025")
+    return gw.assign(**{"Visit Count_Avg": 100.0, "Charge Amount_Avg": 1000.0, "Labs per Visit_Avg": 2.0})
+
+
+def _random_weeks(seed: int) -> pd.DataFrame:
+    """Group-weeks whose moves repeat across rows, so (priority, pct) ties are common."""
+    rng = np.random.default_rng(seed)
+    payers = ["BCBS", "AETNA", "MEDICARE", "SELF PAY", "CIGNA – West", "OTHER"]
+    gw = pd.MultiIndex.from_product(
+        [["2024", "2025"], [1, 2, 3], payers, ["New", "Existing"], ["A", "B"]],
+        names=["Year", "Week", "Payer", "Group_EM", "Group_EM2"]
+    ).to_frame(index=False)
+    metrics = [m for m in increase_good if m in operational_metrics | revenue_cycle_metrics]
+    for m in metrics:
+        avg = rng.choice([-50.0, 0.0, 40.0, 100.0], len(gw), p=[0.1, 0.05, 0.35, 0.5])
+        act = avg * rng.choice([0.0, 0.9, 0.95, 1.0, 1.05, 1.1, 1.25, 2.0], len(gw))
+        act[rng.random(len(gw)) < 0.05] = np.nan
+        gw[m], gw[f"{m}_Avg"] = act, avg
+    return gw
+
+
+def test_fixed_week_narratives():
+    gw = _fixed_week()
+    out = _vectorized_narratives(gw)
+    assert out.loc[0, OP[0]].split("; ") == [
+        # enforce_visit: the largest Visit Count move of at least 5% leads
+        "MEDICARE – New Visit Count increased from avg 100.00 to 106.00",
+        # then payer priority; a repeated key keeps its strongest row and the
+        # 10% tie keeps the order the keys first appear in
+        "BCBS – New Charge Amount increased from avg 1000.00 to 1100.00",
+        "BCBS – Existing Charge Amount increased from avg 1000.00 to 1100.00",
+        "BCBS – New Visit Count increased from avg 100.00 to 103.00",
+        "AETNA – New Charge Amount increased from avg 1000.00 to 1500.00",
+        # top 6: the 1% MEDICARE and all OTHER – West findings are cut
+        "MEDICARE – New Labs per Visit increased from avg 2.00 to 2.10",
+    ]
+    assert out.loc[0, OP[1]].split("; ") == [
+        "BCBS – New Labs per Visit decreased from avg 2.00 to 1.50",
+        "BCBS – Existing Labs per Visit decreased from avg 2.00 to 1.80",
+        "BCBS – New Visit Count decreased from avg 100.00 to 98.00",
+        "BCBS – Existing Visit Count decreased from avg 100.00 to 99.00",
+        "AETNA – New Labs per Visit decreased from avg 2.00 to 1.60",
+        "AETNA – New Visit Count decreased from avg 100.00 to 97.00",
+    ]
+    assert out.loc[0, RC[0]] == "" and out.loc[0, RC[1]] == ""
+    expected = _iterrows_narratives(gw, operational_metrics, OP, _enforce_visit)
+    assert out[list(OP)].equals(expected[list(OP)])
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_iterrows_narratives(seed):
+    gw = _random_weeks(seed)
+    expected = _iterrows_narratives(gw, operational_metrics, OP, _enforce_visit).merge(
+        _iterrows_narratives(gw, revenue_cycle_metrics, RC, _prioritized_top6), on=["Year", "Week"])
+    actual = _vectorized_narratives(gw)
+    assert len(actual) == len(expected)
+    for col in OP + RC:
+        assert actual[col].tolist() == expected[col].tolist(), col
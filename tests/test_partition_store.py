@@ -0,0 +1,102 @@
+# test_partition_store.py
+# Year/Week datasets: predicate pruning, upserts and unchanged-week skips
+
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from rev_perf import partition_store  # noqa: E402
+from rev_perf.partition_store import load_manifest, partitions, read_dataset, write_dataset  # noqa: E402
+
+
+def _invoices() -> pd.DataFrame:
+    """Two years of three weeks; week 2 of 2025 only bills CIGNA and MEDICARE."""
+    rows = []
+    for year in ("2024", "2025"):
+        for week in (1, 2, 3):
+            payers = ["CIGNA", "MEDICARE"] if (year, week) == ("2025", 2) else ["AETNA", "BCBS"]
+            for i, payer in enumerate(payers):
+                rows.append({"Year": year, "Week": week, "Payer": payer, "Group_EM": "New",
+                             "Group_EM2": "A", "Invoice": f"{year}-{week}-{i}", "Charge": 100.0 * (i + 1)})
+    return pd.DataFrame(rows)
+
+
+def _files(path: str) -> dict:
+    return {(p["Year"], p["Week"]): p["files"] for p in load_manifest(path)["partitions"]}
+
+
+def _keys(parts: list) -> list:
+    return [(p["Year"], p["Week"]) for p in parts]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = str(tmp_path / "invoice_level_index.csv")
+    write_dataset(_invoices(), path)
+    return path
+
+
+def test_may_match_prunes_on_partition_keys(dataset):
+    assert _keys(partitions(dataset, {"Year": "2025"})) == [("2025", 1), ("2025", 2), ("2025", 3)]
+    assert _keys(partitions(dataset, {"Year": 2024, "Week": [1, 3]})) == [("2024", 1), ("2024", 3)]
+    assert partitions(dataset, {"Week": 9}) == []
+
+
+def test_may_match_prunes_on_payer_min_max(dataset):
+    # 2025 week 2 spans CIGNA..MEDICARE, every other week AETNA..BCBS
+    assert _keys(partitions(dataset, {"Payer": "MEDICARE"})) == [("2025", 2)]
+    assert _keys(partitions(dataset, {"Payer": "BANNER"})) == [
+        (y, w) for y in ("2024", "2025") for w in (1, 2, 3) if (y, w) != ("2025", 2)]
+    # Inside the min/max range is only a "may": CIGNA..MEDICARE admits HUMANA
+    assert _keys(partitions(dataset, {"Payer": "HUMANA"})) == [("2025", 2)]
+    assert partitions(dataset, {"Payer": ["ZETA", "ABC"]}) == []
+    assert partition_store._may_match({"Year": "2025", "Week": 2, "stats": {}}, {"Payer": ["ZETA"]})
+
+
+def test_read_dataset_opens_only_matching_partitions(dataset, tmp_path):
+    # Removing every other partition's files must not affect the filtered read
+    for key, files in _files(dataset).items():
+        if key != ("2025", 2):
+            for f in files:
+                (tmp_path / "invoice_level_index" / f).unlink()
+    out = read_dataset(dataset, columns=["Invoice", "Charge"], filters={"Payer": "CIGNA"})
+    assert out.to_dict("list") == {"Invoice": ["2025-2-0"], "Charge": [100.0]}
+
+
+def test_upsert_replaces_only_given_weeks(dataset):
+    before = _files(dataset)
+    week = _invoices().query("Year == '2025' and Week == 3").assign(Charge=1.0)
+    write_dataset(week, dataset, mode="upsert")
+    after = _files(dataset)
+    assert set(after) == set(before)
+    assert {k for k in after if after[k] != before[k]} == {("2025", 3)}
+    out = read_dataset(dataset)
+    assert (out.loc[(out["Year"] == "2025") & (out["Week"] == 3), "Charge"] == 1.0).all()
+    assert out.loc[out["Week"] != 3, "Charge"].tolist() == _invoices().query("Week != 3")["Charge"].tolist()
+    # Files of the replaced partition are removed from disk
+    root = partition_store.dataset_dir(dataset)
+    assert not any(os.path.isfile(os.path.join(root, f)) for f in before[("2025", 3)])
+
+
+def test_write_dataset_skips_unchanged_partitions(dataset, monkeypatch):
+    before = _files(dataset)
+    written = []
+    write_file = partition_store.PartitionWriter._write_file
+    monkeypatch.setattr(partition_store.PartitionWriter, "_write_file",
+                        lambda self, key, frame: written.append(key) or write_file(self, key, frame))
+
+    # Same content in another row order: nothing is rewritten
+    write_dataset(_invoices().iloc[::-1], dataset)
+    assert written == [] and _files(dataset) == before
+
+    # One changed week and one dropped week
+    frame = _invoices()
+    frame.loc[(frame["Year"] == "2024") & (frame["Week"] == 2), "Charge"] += 1
+    write_dataset(frame[(frame["Year"] != "2025") | (frame["Week"] != 1)], dataset)
+    after = _files(dataset)
+    assert written == [("2024", 2)]
+    assert set(after) == set(before) - {("2025", 1)}
+    assert {k for k in after if after[k] != before[k]} == {("2024", 2)}
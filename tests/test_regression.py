@@ -0,0 +1,78 @@
+# test_regression.py
+# fit_expected_payments against the sklearn pipeline it replaced
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rev_perf.metric_registry import revenue_cycle_metrics
+from rev_perf.regression import RegressionStats, partition_stats, window_stats
+from rev_perf.weekly_model import fit_expected_payments, model_feats, train_year
+
+sklearn = pytest.importorskip("sklearn")
+from sklearn.feature_selection import VarianceThreshold  # noqa: E402
+from sklearn.impute import SimpleImputer  # noqa: E402
+from sklearn.linear_model import LinearRegression  # noqa: E402
+from sklearn.pipeline import make_pipeline  # noqa: E402
+
+
+def _weekly(seed: int) -> pd.DataFrame:
+    """Group-weeks over two years with gaps, infinite ratios, self-pay rows and a constant feature."""
+    rng = np.random.default_rng(seed)
+    n = 600
+    weekly = pd.DataFrame({
+        "Year": rng.choice(["2024", train_year], n),
+        "Week": rng.integers(1, 53, n),
+        "Payer": rng.choice(["BCBS", "AETNA", "SELF PAY", "MEDICARE"], n),
+        "Group_EM": rng.choice(["Existing E/M Code", "New E/M Code"], n),
+        "Group_EM2": rng.choice(["A", "B", "C"], n),
+    })
+    scales = rng.lognormal(0, 3, len(model_feats))
+    X = rng.normal(size=(n, len(model_feats))) * scales
+    X[rng.random(X.shape) < 0.1] = np.nan
+    X[rng.random(n) < 0.02, model_feats.index("Payment_CV")] = np.inf
+    X[:, model_feats.index("% of Visits w Radiology")] = 0.25
+    weekly[model_feats] = X
+    coef = rng.normal(size=len(model_feats)) / scales
+    weekly["Payment Amount*"] = np.nan_to_num(X, posinf=0.0) @ coef + rng.normal(size=n)
+    return weekly
+
+
+def _sklearn_expected(weekly: pd.DataFrame) -> np.ndarray:
+    """SimpleImputer -> VarianceThreshold -> LinearRegression as standalone_pipeline fits it."""
+    X = weekly[model_feats].replace([np.inf, -np.inf], np.nan)
+    train = weekly["Year"] == train_year
+    X_train = X[train].copy()
+    self_pay = weekly.loc[train, "Payer"].str.upper() == "SELF PAY"
+    for col in revenue_cycle_metrics & set(model_feats):
+        X_train.loc[self_pay, col] = np.nan
+    pipeline = make_pipeline(
+        SimpleImputer(strategy="median"), VarianceThreshold(threshold=0.0), LinearRegression()
+    )
+    pipeline.fit(X_train.to_numpy(), weekly.loc[train, "Payment Amount*"].to_numpy())
+    return pipeline.predict(X.to_numpy())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_fit_expected_payments_matches_sklearn(seed):
+    weekly = _weekly(seed)
+    expected = _sklearn_expected(weekly)
+    actual = fit_expected_payments(weekly.copy())["Expected Payments"].to_numpy()
+    np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+
+def test_window_stats_matches_pooled_rows():
+    """Combining partitions equals the statistics of their rows taken together."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    X[rng.random(X.shape) < 0.2] = np.nan
+    y = rng.normal(size=300)
+    keys = pd.DataFrame({"Year": "2025", "Week": rng.integers(1, 20, 300)})
+    total = window_stats(partition_stats(X, y, keys), [("2025", w) for w in range(1, 20)])
+    order = np.argsort(keys["Week"].to_numpy(), kind="stable")
+    pooled = RegressionStats.from_rows(X[order], y[order])
+    assert total.n == pooled.n
+    for name in ("sy", "sx", "n_obs", "sxy", "sy_miss", "sxx", "sx_miss", "n_miss"):
+        np.testing.assert_allclose(getattr(total, name), getattr(pooled, name))
+    for a, b in zip(total.values, pooled.values):
+        np.testing.assert_array_equal(a, b)
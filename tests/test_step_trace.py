@@ -0,0 +1,46 @@
+# test_step_trace.py
+# Span peaks are per span only while no other thread has a span open
+
+import threading
+
+from rev_perf.step_trace import Tracer
+
+
+def _records(tracer: Tracer) -> dict:
+    return {r["name"]: r for r in tracer.records}
+
+
+def test_single_thread_spans_record_peaks():
+    tracer = Tracer(mode="1")
+    with tracer.span("outer"):
+        with tracer.span("inner"):
+            data = bytearray(8 << 20)
+        del data
+    records = _records(tracer)
+    assert records["inner"]["peak_rss_mb"] is not None
+    assert records["outer"]["peak_rss_mb"] >= records["inner"]["peak_rss_mb"]
+
+
+def test_overlapping_thread_spans_record_null_peaks():
+    tracer = Tracer(mode="1")
+    started, release = threading.Event(), threading.Event()
+
+    def other():
+        with tracer.span("other thread"):
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    started.wait(5)
+    with tracer.span("main thread"):
+        pass
+    release.set()
+    thread.join()
+    with tracer.span("after"):
+        pass
+
+    records = _records(tracer)
+    assert records["main thread"]["peak_rss_mb"] is None
+    assert records["other thread"]["peak_rss_mb"] is None
+    assert records["after"]["peak_rss_mb"] is not None